@@ -0,0 +1,122 @@
+# ARQUIVO: core/ajax_client.py
+from dataclasses import dataclass
+from core.page_scan import scan_of
+from core.metrics import metrics
+
+# Chamadas AJAX do jogo (game.php?screen=...&ajaxaction=...). Cada endpoint do
+# catálogo diz a tela, a ação e de qual tela o navegador faz a chamada (Referer).
+# O AjaxClient monta a requisição (headers AJAX e token 'h' na URL e no corpo,
+# como o TribalWars.post do jogo), usa o JSON que a varredura da resposta já
+# decodificou (response.scan.json) e devolve um AjaxResult. O game_data que vem
+# junto já foi aplicado ao client.village pelo próprio GameClient.
+
+@dataclass(slots=True)
+class Endpoint:
+    screen: str
+    action: str
+    param: str = "ajaxaction"   # 'ajaxaction' ou 'ajax' (popups)
+    referer: str = ""           # tela de origem (vazio = a própria)
+
+ENDPOINTS = {
+    "upgrade_building": Endpoint("main", "upgrade_building"),
+    "send_squads": Endpoint("scavenge_api", "send_squads", referer="place"),
+    "start_unlock": Endpoint("scavenge_api", "start_unlock", referer="place"),
+    "research": Endpoint("smith", "research"),
+    "daily_bonus": Endpoint("daily_bonus", "open"),
+    "quest_complete": Endpoint("api", "quest_complete", referer="overview"),
+    "quest_popup": Endpoint("new_quests", "quest_popup", param="ajax", referer="overview"),
+    "claim_reward": Endpoint("new_quests", "claim_reward", param="ajax", referer="overview"),
+    "consume_item": Endpoint("inventory", "consume"),
+}
+
+@dataclass(slots=True)
+class AjaxResult:
+    """
+    outcome: 'ok' (JSON sem erro), 'error' (o jogo recusou, motivo em 'error'),
+    'unknown' (HTTP 200 sem JSON: a ação pode ter sido aceita, não repetir às
+    cegas) ou 'failed' (sem resposta ou HTTP de erro).
+    """
+    outcome: str
+    error: str = ""
+    data: object = None         # JSON decodificado
+    status: int | None = None   # HTTP
+    page: object = None         # resposta HTTP (para quem lê o HTML de data['response'])
+
+    @property
+    def ok(self):
+        return self.outcome == "ok"
+
+    @property
+    def response(self):
+        """data['response'] quando for um objeto ({} caso contrário)."""
+        inner = self.data.get('response') if isinstance(self.data, dict) else None
+        return inner if isinstance(inner, dict) else {}
+
+    def flag(self, key):
+        """True se data[key] ou data['response'][key] for verdadeiro (ex: 'success')."""
+        return bool(self.response.get(key) or (isinstance(self.data, dict) and self.data.get(key)))
+
+def _error_text(data):
+    error = data.get('error') if isinstance(data, dict) else None
+    if isinstance(error, list):
+        return "; ".join(str(e) for e in error if e)
+    return str(error) if error else ""
+
+class AjaxClient:
+    """Camada AJAX do GameClient (client.ajax)."""
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, name, village_id, data=None, **params):
+        """(tela, corpo, params, headers) do endpoint, prontos para safe_post/safe_get."""
+        ep = ENDPOINTS[name]
+        client = self.client
+        query = {"village": village_id, ep.param: ep.action, **params}
+        if client.csrf_token:
+            query["h"] = client.csrf_token
+        headers = {
+            "X-Requested-With": "XMLHttpRequest",
+            "TribalWars-Ajax": "1",
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Referer": f"{client.base_url}/game.php?village={village_id}&screen={ep.referer or ep.screen}",
+        }
+        return ep.screen, dict(data or {}), query, headers
+
+    def post(self, name, village_id, data=None, **params):
+        """POST no endpoint (o safe_post põe o 'h' no corpo). Devolve AjaxResult."""
+        screen, body, query, headers = self.request(name, village_id, data, **params)
+        return self.result(name, self.client.safe_post(screen, body, params=query, extra_headers=headers))
+
+    def get(self, name, village_id, **params):
+        """GET no endpoint (ex: popups 'ajax=...'). Devolve AjaxResult."""
+        screen, _, query, headers = self.request(name, village_id, **params)
+        return self.result(name, self.client.safe_get(screen, params=query, extra_headers=headers))
+
+    def result(self, name, resp):
+        """Classifica a resposta (também usado pelo AsyncGameClient, que faz o envio com await)."""
+        if resp is None:
+            result = AjaxResult("failed", "sem resposta")
+        elif resp.status_code != 200:
+            result = AjaxResult("failed", f"HTTP {resp.status_code}", status=resp.status_code, page=resp)
+        else:
+            data = scan_of(resp).json
+            if data is None:
+                result = AjaxResult("unknown", status=200, page=resp)
+            else:
+                error = _error_text(data)
+                result = AjaxResult("error" if error else "ok", error, data, 200, resp)
+
+        if result.outcome != "ok":
+            ep = ENDPOINTS[name]
+            metrics.incr(f"{ep.screen}/{ep.action}", self.client.proxy_label, f"ajax_{result.outcome}")
+        return result
+
+class AsyncAjaxClient(AjaxClient):
+    """client.ajax do AsyncGameClient: mesmas chamadas, com 'await' (safe_get/safe_post são corrotinas)."""
+    async def post(self, name, village_id, data=None, **params):
+        screen, body, query, headers = self.request(name, village_id, data, **params)
+        return self.result(name, await self.client.safe_post(screen, body, params=query, extra_headers=headers))
+
+    async def get(self, name, village_id, **params):
+        screen, _, query, headers = self.request(name, village_id, **params)
+        return self.result(name, await self.client.safe_get(screen, params=query, extra_headers=headers))
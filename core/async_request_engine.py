@@ -0,0 +1,330 @@
+# ARQUIVO: core/async_request_engine.py
+import asyncio
+import time
+import threading
+from curl_cffi.requests import AsyncSession
+from core.request_engine import GameClient
+from core.request_pacer import request_pacer
+from core.fleet_scheduler import Stopped, stop_requested, current_stop
+from core.metrics import metrics
+from core.page_scan import HeaderWatch
+from core.ajax_client import AsyncAjaxClient
+
+class AsyncGameClient(GameClient):
+    """
+    Versão asyncio do GameClient (mesma interface, métodos com 'await').
+    Usa curl_cffi AsyncSession e pausas não-bloqueantes, permitindo que um único
+    event loop conduza centenas de contas sem uma thread por conta.
+    Cookies, headers, proxy e extração de CSRF são herdados do GameClient.
+    """
+
+    def __init__(self, account_data):
+        super().__init__(account_data)
+        self.ajax = AsyncAjaxClient(self) # await client.ajax.post(...)
+
+    def _create_session(self):
+        # Impersonate Chrome 120 para bypass de fingerprint
+        return AsyncSession(impersonate="chrome120")
+
+    async def _send(self, method, url, head_only=False, **kwargs):
+        # AsyncSession já é segura dentro do event loop, não precisa de lock
+        self.last_used = time.time()
+        self.page_cache.invalidate_url(method, url)
+        started = time.perf_counter()
+        try:
+            if head_only:
+                response = await self._read_head(await getattr(self.session, method)(url, stream=True, **kwargs))
+            else:
+                response = await getattr(self.session, method)(url, **kwargs)
+        except Exception:
+            self._record(url, started, None)
+            raise
+        self._record(url, started, response)
+        return response
+
+    async def _read_head(self, response):
+        """Como GameClient._read_head, lendo o stream com aiter_content."""
+        watch = HeaderWatch()
+        async for chunk in response.aiter_content():
+            if watch.feed(chunk):
+                await response.aclose()
+                response.partial = True
+                break
+        response.content = bytes(watch.buffer)
+        return response
+
+    async def _pace(self, kind):
+        delay = request_pacer.reserve(self.account.get('id'), self.account.get('proxy_id'), kind)
+        if not await self._pause(delay):
+            raise Stopped("conta parada")
+
+    async def _pause(self, seconds):
+        """
+        Versão asyncio do fleet_scheduler.pause(): dorme 'seconds' ou até a conta
+        do ciclo ser parada (o loop herda o current_stop do worker). False se foi
+        interrompido. O Event de parada é threading.Event: a espera nele roda no
+        executor do loop, em corrida com o asyncio.sleep.
+        """
+        stop = current_stop.get()
+        if stop is None:
+            if seconds > 0: await asyncio.sleep(seconds)
+            return True
+        if stop.is_set(): return False
+        if seconds > 0:
+            sleeper = asyncio.ensure_future(asyncio.sleep(seconds))
+            watcher = asyncio.get_running_loop().run_in_executor(None, stop.wait, seconds)
+            await asyncio.wait((sleeper, watcher), return_when=asyncio.FIRST_COMPLETED)
+            sleeper.cancel()
+            watcher.cancel() # Se já estava rodando, termina sozinho no fim do 'seconds'
+        return not stop.is_set()
+
+    async def close(self):
+        await self.session.close()
+
+    async def ensure_connection(self):
+        """Verifica conexão com 3 tentativas antes de desistir."""
+        self.security_alert = None
+        check_url = self._build_url("overview")
+        headers_game = self._game_headers(f"{self.base_url}/game.php")
+
+        max_retries = 3
+
+        for attempt in range(1, max_retries + 1):
+            if stop_requested(): return False # Conta parada: não insiste na reconexão
+            try:
+                response = await self._send("get", check_url, headers=headers_game, timeout=20)
+
+                if self.world_id not in response.url:
+                    print(f"[ENGINE] ⚠️ Redirecionado incorretamente. Tentativa {attempt}/{max_retries}...")
+                    if await self._reenter_world(): return True
+                    if not await self._pause(2): return False
+                    continue
+
+                if self._is_session_lost(response):
+                    print(f"[ENGINE] ⚠️ Sessão expirada. Tentando recuperar ({attempt}/{max_retries})...")
+                    if await self._reenter_world(): return True
+                    if not await self._pause(2): return False
+                    continue
+
+                if "game.php" in response.url:
+                    self._process_response(response)
+                    self.page_cache.put("overview", None, response)
+                    self.last_connected = time.time()
+                    return True
+
+                if await self._reenter_world(): return True
+
+            except Exception as e:
+                print(f"[ENGINE] ❌ Erro de conexão na tentativa {attempt}: {e}")
+                if not await self._pause(3): return False
+
+        return False
+
+    async def _reenter_world(self):
+        """Reconexão via Lobby com simulação de clique humano."""
+        print(f"[ENGINE] Tentando recuperar sessão via Lobby...")
+        metrics.incr("reenter", self.proxy_label, "reentries")
+
+        try:
+            resp_lobby = await self._send("get", self.lobby_url, headers=self._lobby_headers())
+
+            if "login.php" in resp_lobby.url:
+                print(f"[ENGINE] ❌ SESSÃO INVÁLIDA. Necessário login manual.")
+                return False
+
+            self._process_response(resp_lobby, lobby=True)
+
+            final_url = self._find_world_link(resp_lobby.text)
+
+            if final_url:
+                await self._pace("reenter")
+
+                resp_enter = await self._send("get", final_url, headers=self._enter_headers(resp_lobby.url))
+
+                if "game.php" in resp_enter.url:
+                    print(f"[ENGINE] ✅ Sessão recuperada com sucesso!")
+                    self._process_response(resp_enter)
+                    self._clear_session_alert()
+                    self.last_connected = time.time()
+                    return True
+                else:
+                    print(f"[ENGINE] ❌ Falha na recuperação automática.")
+            else:
+                print(f"[ENGINE] ❌ Mundo {self.world_id} não encontrado no Lobby.")
+
+            return False
+
+        except Exception as e:
+            print(f"[ENGINE ERROR] Erro no re-login: {e}")
+            return False
+
+    async def safe_get(self, screen, params=None, extra_headers=None, fresh=False, head_only=False):
+        if self._blocked(screen): return None
+        cached = None if fresh else self.page_cache.get(screen, params)
+        if cached is not None:
+            return cached
+
+        url = self._build_url(screen, params)
+        headers_req = self._game_headers(f"{self.base_url}/game.php", extra_headers)
+
+        try:
+            await self._pace("get")
+            response = await self._send("get", url, head_only, headers=headers_req, timeout=20)
+
+            if self._is_session_lost(response):
+                print("[ENGINE] Sessão caiu durante GET. Recuperando...")
+                if await self._reenter_world():
+                    self.update_account_session()
+                    response = self._process_response(await self._send("get", url, head_only, headers=headers_req, timeout=20))
+                    if not head_only: self.page_cache.put(screen, params, response)
+                    return response
+                return None
+
+            self._process_response(response)
+            if not head_only: self.page_cache.put(screen, params, response)
+            return response
+        except Exception as e:
+            print(f"[ENGINE ERROR] GET {screen}: {e}")
+            return None
+
+    async def safe_get_absolute(self, full_url):
+        if self._blocked(full_url): return None
+        full_url = self._absolute_url(full_url)
+        headers_req = self._game_headers(f"{self.base_url}/game.php?screen=main")
+
+        try:
+            await self._pace("absolute")
+            response = await self._send("get", full_url, headers=headers_req, timeout=20)
+
+            if self._is_session_lost(response):
+                print("[ENGINE] Sessão caiu durante GET Absoluto. Recuperando...")
+                if await self._reenter_world():
+                    self.update_account_session()
+                    return self._process_response(await self._send("get", full_url, headers=headers_req, timeout=20))
+                return None
+
+            self._process_response(response)
+            return response
+        except Exception as e:
+            print(f"[ENGINE ERROR] Absolute GET Crash: {e}")
+            return None
+
+    async def safe_post(self, screen, data, params=None, extra_headers=None):
+        if self._blocked(screen): return None
+        url = self._build_url(screen, params)
+
+        if self.csrf_token:
+            data['h'] = self.csrf_token
+
+        headers_req = self._game_headers(f"{self.base_url}/game.php", extra_headers)
+
+        try:
+            await self._pace("post")
+            response = await self._send("post", url, data=data, headers=headers_req)
+            self._process_response(response)
+            return response
+        except Exception as e:
+            print(f"[ENGINE ERROR] POST {screen}: {e}")
+            return None
+
+
+def _prefetch_twin(client):
+    """
+    AsyncGameClient gêmeo do cliente, criado uma vez e guardado nele: a
+    AsyncSession (conexões TLS abertas), o proxy e o event loop próprio são
+    reaproveitados de um ciclo para o outro. A cada prefetch ele recebe os
+    cookies, headers e CSRF vivos do cliente síncrono (os de acc['session']
+    podem estar velhos depois de um _reenter_world).
+    """
+    twin = getattr(client, '_prefetch_twin', None)
+    if twin is None:
+        twin = AsyncGameClient(client.account)
+        twin.loop = asyncio.new_event_loop() # A AsyncSession fica presa ao loop em que foi usada
+        twin.run_lock = threading.Lock()
+        twin.retired = False
+        client._prefetch_twin = twin
+
+    twin.account = client.account
+    twin.session.cookies.clear()
+    for cookie in client.session.cookies.jar:
+        twin.session.cookies.jar.set_cookie(cookie)
+    twin.headers = dict(client.headers)
+    twin.csrf_token = client.csrf_token
+    twin.security_alert = client.security_alert
+    return twin
+
+def _close_twin(twin):
+    # Chamado com twin.run_lock em mãos; pode ser chamado duas vezes
+    if twin.loop.is_closed(): return
+    try:
+        twin.loop.run_until_complete(twin.close())
+        twin.loop.run_until_complete(twin.loop.shutdown_default_executor())
+    except Exception as e:
+        print(f"[ENGINE ERROR] Fechando o prefetch: {e}")
+    finally:
+        twin.loop.close()
+
+def close_prefetch_twin(client):
+    """
+    Fecha a AsyncSession e o event loop do gêmeo de prefetch do cliente (se
+    houver). Sem bloquear: se um prefetch estiver rodando, ele mesmo fecha o
+    gêmeo ao terminar.
+    """
+    twin = getattr(client, '_prefetch_twin', None)
+    if twin is None: return
+    client._prefetch_twin = None
+    twin.retired = True
+    if twin.run_lock.acquire(blocking=False):
+        try:
+            _close_twin(twin)
+        finally:
+            twin.run_lock.release()
+
+def prefetch_pages(client, requests):
+    """
+    Baixa várias telas de uma vez para um GameClient síncrono.
+    Cada requisição ainda reserva o seu horário no request_pacer (mesma vaga da
+    conta), então os envios continuam espaçados: o ganho é só sobrepor a
+    latência de rede, porque cada GET sai no seu horário sem esperar a resposta
+    do anterior. As respostas, já varridas, entram no page_cache do cliente:
+    o safe_get de cada manager passa a ser um acerto de cache.
+    requests: lista de (screen, params). Retorna quantas telas foram carregadas.
+    """
+    if not requests: return 0
+    if getattr(client.session, 'offline', False): return 0 # Cassette em replay: segue o fluxo normal
+
+    async def run(twin):
+        # Só leitura: GETs de tela (fresh: o cache do gêmeo não é usado)
+        return await asyncio.gather(*(twin.safe_get(screen, params, fresh=True) for screen, params in requests))
+
+    try:
+        twin = _prefetch_twin(client)
+        with twin.run_lock:
+            try:
+                responses = twin.loop.run_until_complete(run(twin))
+            finally:
+                twin.page_cache.clear()
+                # Cookies renovados nas respostas voltam para o cliente
+                for cookie in twin.session.cookies.jar:
+                    client.session.cookies.jar.set_cookie(cookie)
+        # Aposentado durante o prefetch (close_prefetch_twin não pegou o lock)
+        if twin.retired and twin.run_lock.acquire(blocking=False):
+            try:
+                _close_twin(twin)
+            finally:
+                twin.run_lock.release()
+    except Exception as e:
+        print(f"[ENGINE ERROR] Prefetch: {e}")
+        return 0
+
+    loaded = 0
+    for (screen, params), response in zip(requests, responses):
+        if response is None: continue
+        scan = getattr(response, 'scan', None)
+        if scan:
+            if scan.security: client._flag_security(scan.security, response.url)
+            client._set_csrf(scan.csrf, response.url)
+            client._merge_state(scan, response.url)
+        client.page_cache.put(screen, params, response)
+        loaded += 1
+    return loaded
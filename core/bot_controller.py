@@ -3,8 +3,12 @@ import random
 import threading
 from datetime import datetime, timedelta
 from core.account_manager import account_manager
-from core.request_engine import GameClient
+from core.client_pool import client_pool
+from core.fleet_scheduler import fleet_scheduler, current_stop
+from core.async_request_engine import prefetch_pages
+from core import module_due
 from core.game_parser import GameParser
+from core.page_model import current_village
 from core.settings_manager import global_settings
 
 # --- MANAGERS ---
@@ -14,9 +18,24 @@ from core.features.recruit_manager import RecruitManager
 from core.features.scavenge_manager import ScavengeManager 
 from core.features.research_manager import ResearchManager
 
+def plan_sleep(wake_hints, now=None):
+    """
+    Segundos até o próximo ciclo e o motivo. wake_hints: (epoch, motivo) dos
+    módulos (retorno da coleta, fim de construção, recursos para o alvo).
+    Acorda no mais cedo deles, limitado a [min_interval, max_interval]; sem
+    nenhum, sorteia no intervalo como antes. Soma a folga humana de 15-59s.
+    """
+    now = now or time.time()
+    low = global_settings.get("min_interval") * 60
+    high = global_settings.get("max_interval") * 60
+    jitter = random.randint(15, 59)
+    if not wake_hints:
+        return random.randint(low, high) + jitter, None
+    when, reason = min(wake_hints)
+    return int(min(max(when - now, low), high)) + jitter, reason
+
 class BotController:
     def __init__(self):
-        self.active_threads = {}
         self.ui_callbacks = {}
 
     def start_cycle(self, account_id, log_callback=None):
@@ -27,7 +46,7 @@ class BotController:
         # 2. Se veio do reinício automático (sem callback), recupera da memória
         elif account_id in self.ui_callbacks:
             log_callback = self.ui_callbacks[account_id]
-        if account_id in self.active_threads and self.active_threads[account_id].is_alive(): 
+        if fleet_scheduler.is_active(account_id):
             return 
         
         acc = self._get_account(account_id)
@@ -35,12 +54,12 @@ class BotController:
         
         acc['logs'] = [] 
         acc['status'] = 'running'
+        module_due.reset(acc) # Reinício: todos os módulos conferem a tela de novo
         acc['cycle_state'] = 'starting'
         account_manager.save()
         
-        t = threading.Thread(target=self._worker, args=(account_id, log_callback), daemon=True)
-        self.active_threads[account_id] = t
-        t.start()
+        # Os ciclos rodam no pool do fleet_scheduler (sem uma thread por conta)
+        fleet_scheduler.schedule(account_id, lambda: self._worker(account_id, log_callback))
 
     def stop_cycle(self, account_id):
         acc = self._get_account(account_id)
@@ -49,7 +68,36 @@ class BotController:
             acc['cycle_state'] = 'stopped'
             account_manager.save()
 
-    def _worker(self, account_id, log_callback):
+        # Conta dormindo: sai da agenda na hora. Um ciclo em andamento recebe a
+        # parada pelo Event da conta: a pausa ou requisição seguinte é cancelada
+        # e o ciclo termina (avisando no próprio log).
+        if fleet_scheduler.cancel(account_id) and not fleet_scheduler.is_active(account_id):
+            if acc: acc['last_activity'], acc['last_activity_type'] = "🛑 Bot parou.", "error"
+            callback = self.ui_callbacks.get(account_id)
+            if callback: callback(account_id, "🛑 Bot parou.", "error")
+
+    def shutdown(self, timeout=25):
+        """
+        Fechamento do programa: para todos os ciclos (em andamento e agendados)
+        e espera as threads da agenda por no máximo 'timeout' segundos.
+        """
+        for acc in account_manager.accounts:
+            if acc.get('status') == 'running':
+                acc['status'] = 'stopped'
+                acc['cycle_state'] = 'stopped'
+        finished = fleet_scheduler.shutdown(timeout)
+        account_manager.save()
+        return finished
+
+    def _worker(self, account_id, log_callback, first=True, steps=None):
+        """
+        Um ciclo da conta, executado por um worker do fleet_scheduler. Ao
+        terminar, agenda o próximo (após o intervalo sorteado ou, em caso de
+        erro/sessão renovada, logo em seguida).
+        O ciclo é um gerador que para em cada pausa humana entre fases e
+        módulos: a pausa vira uma entrada na agenda e o worker fica livre até
+        ela vencer (steps: o ciclo em andamento, retomado pela agenda).
+        """
         def log(msg, type="info"):
             if log_callback: log_callback(account_id, msg, type)
             acc = self._get_account(account_id)
@@ -59,180 +107,254 @@ class BotController:
         
         def fmt(num): return f"{num:,}".replace(",", ".")
 
+        def handle_alert():
+            """
+            Captcha/sessão expirada vistos pelo GameClient em QUALQUER resposta
+            do ciclo (train, scavenge_api...). 'stop' = parar, 'retry' = sessão
+            renovada, recomeçar o ciclo; None = nada pendente.
+            """
+            alert = client.security_alert
+            if not alert: return None
+            verdict, where = alert
+            if verdict == 'captcha':
+                log(f"⛔ CAPTCHA DETECTADO ({where})! Parando bot.", "error")
+                acc['status'] = 'stopped'
+                acc['cycle_state'] = 'captcha'
+                account_manager.save()
+                return "stop"
+
+            log(f"⚠️ Sessão expirou ({where}). Tentando renovar...", "warn")
+            if client.ensure_connection():
+                client.update_account_session()
+                account_manager.save()
+                log("✅ Sessão renovada com sucesso.", "success")
+                return "retry"
+            log("❌ Falha ao renovar sessão. Parando.", "error")
+            acc['status'] = 'stopped'
+            return "stop"
+
+        # Parada da conta (stop_cycle/shutdown): setada pelo fleet_scheduler
+        stop = current_stop.get() or threading.Event()
+        def stopped():
+            return stop.is_set() or acc['status'] != 'running'
+
         acc = self._get_account(account_id)
-        log("🚀 === INICIANDO CICLO ===", "info")
+        if first: log("🚀 === INICIANDO CICLO ===", "info")
+        next_in = None # Segundos até o próximo ciclo (None = bot parou)
+        resumed = False # Ciclo continua numa entrada da agenda (pausa humana)
         
         try:
-            log("🌐 Conectando ao servidor...", "warn")
-            client = GameClient(acc)
-            
-            # Inicializa Managers
-            rewards_mgr = RewardManager(client, log)
-            build_mgr = BuildManager(client, log)
-            recruit_mgr = RecruitManager(client, log)
-            scavenge_mgr = ScavengeManager(client, log) 
-            research_mgr = ResearchManager(client, log) 
-
-            acc['cycle_state'] = 'checking'
-            
-            if not client.ensure_connection():
-                log("❌ Falha crítica: Não foi possível conectar.", "error")
-                acc['status'] = 'stopped'
-                acc['cycle_state'] = 'error'
-                account_manager.save()
-                return
+            if steps is None:
+                if first: log("🌐 Conectando ao servidor...", "warn")
+                acc['cycle_state'] = 'checking'
+
+                # Cliente compartilhado (já conectado e com cookies sincronizados)
+                client = client_pool.get(acc)
+                if not client:
+                    log("❌ Falha crítica: Não foi possível conectar.", "error")
+                    acc['status'] = 'stopped'
+                    acc['cycle_state'] = 'error'
+                    account_manager.save()
+                    return
             
-            # Sincroniza cookies
-            client.update_account_session()
-            account_manager.save()
+                if first: account_manager.save()
+
+                # Inicializa Managers
+                rewards_mgr = RewardManager(client, log)
+                build_mgr = BuildManager(client, log)
+                recruit_mgr = RecruitManager(client, log)
+                scavenge_mgr = ScavengeManager(client, log) 
+                research_mgr = ResearchManager(client, log) 
             
-            log("✅ Conectado com sucesso.", "success")
+                if first: log("✅ Conectado com sucesso.", "success")
 
-            while acc['status'] == 'running':
-                acc = self._get_account(account_id)
-                if acc['status'] != 'running': break
+                def cycle():
+                    """
+                    Fases do ciclo. Cede (yield) os segundos de cada pausa humana;
+                    retorna em quantos segundos roda o próximo (None = parar).
+                    """
+                    nonlocal acc
+                    acc = self._get_account(account_id)
+                    if stopped(): return None
 
-                acc['cycle_state'] = 'checking'
-                log("🔄 -----------------------------------------", "info")
-                log("🔄 Iniciando análise da aldeia...", "info")
+                    acc['cycle_state'] = 'checking'
+                    log("🔄 -----------------------------------------", "info")
+                    log("🔄 Iniciando análise da aldeia...", "info")
                 
-                # 1. Overview
-                t_start = time.time()
-                resp = client.safe_get("overview")
-                if not resp:
-                    log("❌ Erro de rede ao carregar Overview.", "error")
-                    time.sleep(10)
-                    continue
-                log(f"📡 Overview carregado em {time.time()-t_start:.2f}s", "info")
-
-                parser = GameParser(resp.text)
+                    # 1. Overview
+                    t_start = time.time()
+                    resp = client.safe_get("overview")
+                    if not resp:
+                        if stopped(): return None
+                        alert = handle_alert() # Requisição bloqueada por captcha pendente?
+                        if alert == "stop": return None
+                        if alert == "retry": return 0
+                        log("❌ Erro de rede ao carregar Overview.", "error")
+                        return 10
+                    log(f"📡 Overview carregado em {time.time()-t_start:.2f}s", "info")
+
+                    parser = GameParser(resp.text, scan=getattr(resp, "scan", None))
                 
-                # 2. Segurança
-                sec = parser.check_security()
-                if sec == 'captcha':
-                    log("⛔ CAPTCHA DETECTADO! Parando bot.", "error")
-                    acc['status'] = 'stopped'
-                    acc['cycle_state'] = 'captcha'
-                    account_manager.save()
-                    break
-                elif sec == 'session_expired':
-                    log("⚠️ Sessão expirou. Tentando renovar...", "warn")
-                    if client.ensure_connection(): 
-                        client.update_account_session()
-                        account_manager.save()
-                        log("✅ Sessão renovada com sucesso.", "success")
-                        continue
-                    else: 
-                        log("❌ Falha ao renovar sessão. Parando.", "error")
-                        acc['status'] = 'stopped'
-                        break
-
-                game_data = parser.get_game_data_from_json()
-                if not game_data:
-                    log("⚠️ Erro ao ler dados do jogo (JSON não encontrado).", "warn")
-                    time.sleep(5)
-                    continue
-
-                # Log de Recursos Inicial
-                log(f"💰 Recursos Atuais: 🌲{fmt(game_data['wood'])} 🧱{fmt(game_data['stone'])} ⛏️{fmt(game_data['iron'])}", "info")
+                    # 2. Segurança (varredura do GameClient em cada resposta)
+                    alert = handle_alert()
+                    if alert == "stop": return None
+                    if alert == "retry": return 0
+
+                    # Estado tipado da aldeia, compartilhado pelos managers no ciclo. É o
+                    # mesmo objeto que o GameClient atualiza com o game_data de cada resposta
+                    # (sem game_data no overview, cai na leitura do HTML)
+                    village = client.village if client.village and client.village.village_id else current_village(resp, parser)
+                    if not village:
+                        log("⚠️ Erro ao ler dados do jogo (JSON não encontrado).", "warn")
+                        return 5
+
+                    # Log de Recursos Inicial
+                    log(f"💰 Recursos Atuais: 🌲{fmt(village.wood)} 🧱{fmt(village.stone)} ⛏️{fmt(village.iron)}", "info")
                 
-                # --- 1. RECOMPENSAS (PRIORIDADE) ---
-                log("🎁 [FASE 1] Verificando Recompensas...", "info")
+                    # --- 1. RECOMPENSAS (PRIORIDADE) ---
+                    log("🎁 [FASE 1] Verificando Recompensas...", "info")
                 
-                if rewards_mgr.handle_daily_bonus(parser):
-                    log("✅ Bônus diário processado.", "success")
-                else:
-                    log("ℹ️ Sem bônus diário pendente.", "info")
+                    if rewards_mgr.handle_daily_bonus(parser, village):
+                        log("✅ Bônus diário processado.", "success")
+                    else:
+                        log("ℹ️ Sem bônus diário pendente.", "info")
                 
-                time.sleep(random.uniform(0.8, 1.5)) 
+                    yield client.space("phase")
 
-                if game_data:
-                    rewards_mgr.handle_new_quests(parser, game_data)
-                    time.sleep(random.uniform(1.2, 2.0))
+                    if village:
+                        rewards_mgr.handle_new_quests(parser, village)
+                        yield client.space("phase_quests")
 
-                # --- 2. AÇÕES DE GASTO (ORDEM ALEATÓRIA) ---
-                if game_data:
-                    log("🎲 [FASE 2] Sorteando ordem das tarefas...", "info")
-                    
-                    tasks = [
-                        {"name": "Construção",   "func": build_mgr.execute},
-                        {"name": "Recrutamento", "func": recruit_mgr.execute},
-                        {"name": "Coleta",       "func": scavenge_mgr.execute},
-                        {"name": "Pesquisa",     "func": research_mgr.execute}
-                    ]
+                    alert = handle_alert()
+                    if alert == "stop": return None
+                    if alert == "retry": return 0
+
+                    # --- 2. AÇÕES DE GASTO (ORDEM ALEATÓRIA) ---
+                    if village:
+                        log("🎲 [FASE 2] Sorteando ordem das tarefas...", "info")
                     
-                    random.shuffle(tasks)
+                        tasks = [
+                            {"key": "build",    "name": "Construção",   "mgr": build_mgr,    "func": build_mgr.execute},
+                            {"key": "recruit",  "name": "Recrutamento", "mgr": recruit_mgr,  "func": recruit_mgr.execute},
+                            {"key": "scavenge", "name": "Coleta",       "mgr": scavenge_mgr, "func": scavenge_mgr.execute},
+                            {"key": "research", "name": "Pesquisa",     "mgr": research_mgr, "func": research_mgr.execute}
+                        ]
+
+                        # Módulos que avisaram que não há nada útil antes de certo horário
+                        # (coleta fora, fila cheia, sem recursos...) nem abrem a tela
+                        now = time.time()
+                        for task in [t for t in tasks if module_due.pending(acc, t['key'], now)]:
+                            when, reason = module_due.pending(acc, task['key'], now)
+                            log(f"⏭️ {task['name']} em espera até {datetime.fromtimestamp(when).strftime('%H:%M:%S')} ({reason}).", "info")
+                            tasks.remove(task)
+
+                        random.shuffle(tasks)
                     
-                    # Log da ordem sorteada para você saber o que ele vai fazer
-                    order_names = [t['name'] for t in tasks]
-                    log(f"📋 Ordem do Ciclo: {' -> '.join(order_names)}", "warn")
+                        # Log da ordem sorteada para você saber o que ele vai fazer
+                        order_names = [t['name'] for t in tasks]
+                        log(f"📋 Ordem do Ciclo: {' -> '.join(order_names)}", "warn")
 
-                    for i, task in enumerate(tasks):
-                        if acc['status'] != 'running': break
+                        # Prefetch (opcional): baixa em paralelo as telas que os módulos vão abrir.
+                        # Elas ficam no cache do cliente até a primeira ação (POST) do ciclo.
+                        if global_settings.get("prefetch_screens"):
+                            page_requests = [t['mgr'].page_request(acc, village) for t in tasks]
+                            page_requests = [r for r in page_requests if r]
+                            t_start = time.time()
+                            loaded = prefetch_pages(client, page_requests)
+                            log(f"📡 {loaded}/{len(page_requests)} telas pré-carregadas em {time.time()-t_start:.2f}s", "info")
+
+                        for i, task in enumerate(tasks):
+                            if stopped(): break
                         
-                        # Log antes de começar
-                        log(f"▶️ [{i+1}/3] Iniciando módulo: {task['name']}", "info")
+                            # Log antes de começar
+                            log(f"▶️ [{i+1}/{len(tasks)}] Iniciando módulo: {task['name']}", "info")
                         
-                        try:
-                            task['func'](acc, game_data)
-                        except Exception as e_task:
-                            log(f"❌ Erro no módulo {task['name']}: {e_task}", "error")
+                            try:
+                                task['func'](acc, village)
+                                module_due.record(acc, task['key'], task['mgr'].wake_at)
+                            except Exception as e_task:
+                                module_due.record(acc, task['key'], None)
+                                log(f"❌ Erro no módulo {task['name']}: {e_task}", "error")
+
+                            # Captcha na resposta de train/scavenge_api/...: para na hora
+                            alert = handle_alert()
+                            if alert: break
                         
-                        # Pausa humana com log
-                        if i < len(tasks) - 1: # Não pausa no último
-                            pause = random.uniform(2.5, 5.5)
-                            log(f"⏳ Pausa humana de {pause:.1f}s antes da próxima tarefa...", "info")
-                            time.sleep(pause)
-
-                # 5. FINALIZAÇÃO E RELATÓRIO
-                log("🏁 [FASE 3] Finalizando ciclo e atualizando dados...", "info")
-                time.sleep(1) 
-                
-                resp = client.safe_get("overview") # Atualiza dados finais
-                if resp:
-                    parser = GameParser(resp.text)
-                    game_data = parser.get_game_data_from_json()
-                                          
-                    if game_data:
-                        acc['resources'] = {
-                            'wood': game_data['wood'], 
-                            'stone': game_data['stone'], 
-                            'iron': game_data['iron']
-                        }
-                        acc['storage'] = game_data['storage']
-                        acc['population'] = {
-                            'current': game_data['pop_current'], 
-                            'max': game_data['pop_max']
-                        }
-                        acc['points'] = parser.get_points()
-                        acc['incomings'] = parser.get_incoming_attacks()
+                            # Pausa humana com log (aplicada na próxima requisição)
+                            if i < len(tasks) - 1: # Não pausa no último
+                                pause = client.space("task")
+                                log(f"⏳ Pausa humana de {pause:.1f}s antes da próxima tarefa...", "info")
+                                yield pause
+
+                    if alert == "stop" or stopped(): return None
+                    if alert == "retry": return 0
+
+                    # 5. FINALIZAÇÃO E RELATÓRIO
+                    log("🏁 [FASE 3] Finalizando ciclo e atualizando dados...", "info")
+
+                    # As respostas AJAX do ciclo já trouxeram o game_data atualizado: o
+                    # overview final só é baixado se esse estado estiver velho
+                    state_age = client.state_age()
+                    max_age = global_settings.get("state_max_age")
+                    if state_age is not None and max_age and state_age <= max_age and client.village.points is not None:
+                        village = client.village
+                        points, incomings = village.points, village.incomings or 0
+                        log(f"📦 Dados atualizados pelo próprio ciclo há {state_age:.0f}s (overview final dispensado).", "info")
+                    else:
+                        yield client.space("phase_final")
+                        village = None
+                        resp = client.safe_get("overview", head_only=True) # Só o cabeçalho: game_data, pontos e ataques
+                        if resp:
+                            parser = GameParser(resp.text, scan=getattr(resp, "scan", None))
+                            village = current_village(resp, parser)
+                            points, incomings = parser.get_points(), parser.get_incoming_attacks()
+
+                    if village:
+                            acc['resources'] = village.resources()
+                            acc['storage'] = village.storage
+                            acc['population'] = {
+                                'current': village.pop_current, 
+                                'max': village.pop_max
+                            }
+                            acc['points'] = points
+                            acc['incomings'] = incomings
                         
-                        log(f"📊 Status Final: População {game_data['pop_current']}/{game_data['pop_max']} | Armazém: {game_data['storage']}", "info")
+                            log(f"📊 Status Final: População {village.pop_current}/{village.pop_max} | Armazém: {village.storage}", "info")
                         
-                        if acc['incomings'] > 0: 
-                             log(f"⚔️ PERIGO: {acc['incomings']} ATAQUES A CAMINHO!", "error")
-                        else:
-                             log("🛡️ Nenhum ataque detectado.", "success")
+                            if acc['incomings'] > 0: 
+                                 log(f"⚔️ PERIGO: {acc['incomings']} ATAQUES A CAMINHO!", "error")
+                            else:
+                                 log("🛡️ Nenhum ataque detectado.", "success")
                         
-                        account_manager.save()
+                            account_manager.save()
 
-                # 6. SLEEP (DORMIR)
-                acc['last_cycle'] = time.strftime("%H:%M:%S")
-                acc['cycle_state'] = 'verified'
-                
-                min_min = global_settings.get("min_interval")
-                max_min = global_settings.get("max_interval")
+                    # 6. SLEEP (DORMIR)
+                    client.page_cache.clear() # Nada do ciclo atual vale para o próximo
+                    acc['last_cycle'] = time.strftime("%H:%M:%S")
+                    acc['cycle_state'] = 'verified'
                 
-                total_sleep = random.randint(min_min*60, max_min*60) + random.randint(15, 59)
-                wake_time = (datetime.now() + timedelta(seconds=total_sleep)).strftime("%H:%M:%S")
+                    # Próximo momento útil segundo os módulos, inclusive os que ficaram
+                    # em espera neste ciclo (ou sorteio no intervalo)
+                    total_sleep, reason = plan_sleep(module_due.wake_hints(acc))
+                    wake_time = (datetime.now() + timedelta(seconds=total_sleep)).strftime("%H:%M:%S")
 
-                log(f"💤 Ciclo concluído com sucesso.", "success")
-                log(f"⏲️ Dormindo {total_sleep}s (Próxima execução: {wake_time})", "warn")
-            
-                # Loop de espera visual
-                for _ in range(total_sleep):
-                    if acc['status'] != 'running': break
-                    time.sleep(1)
+                    log(f"💤 Ciclo concluído com sucesso.", "success")
+                    log(f"⏲️ Dormindo {total_sleep}s (Próxima execução: {wake_time}{f' - {reason}' if reason else ''})", "warn")
+                    return total_sleep
+
+                steps = cycle()
+
+            # Roda até a próxima pausa: o resto do ciclo volta pela agenda
+            if acc and acc['status'] == 'running' and not stop.is_set():
+                try:
+                    pause = next(steps)
+                except StopIteration as done:
+                    next_in = done.value
+                else:
+                    resumed = True
+                    fleet_scheduler.schedule(account_id, lambda: self._worker(account_id, log_callback, first=False, steps=steps), pause)
+            else:
+                steps.close() # Parada durante a pausa
 
         except Exception as e:
             log(f"🔥 Crash Crítico no Controller: {e}", "error")
@@ -241,8 +363,14 @@ class BotController:
             import traceback
             traceback.print_exc() 
         finally:
-            log("🛑 Bot parou.", "error")
-            account_manager.save()
+            # Próximo ciclo na agenda (stop_cycle nesse meio tempo também o cancela)
+            if resumed:
+                pass # O resto do ciclo já está na agenda
+            elif next_in is not None and acc and acc['status'] == 'running' and not stop.is_set():
+                fleet_scheduler.schedule(account_id, lambda: self._worker(account_id, log_callback, first=False), next_in)
+            else:
+                log("🛑 Bot parou.", "error")
+                account_manager.save()
 
     def _get_account(self, aid):
         return next((a for a in account_manager.accounts if a['id'] == aid), None)
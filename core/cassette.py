@@ -0,0 +1,160 @@
+# ARQUIVO: core/cassette.py
+import os
+import json
+import time
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode, urlunsplit
+from curl_cffi.requests import Cookies
+
+# Campos voláteis ignorados na hora de casar uma requisição com a gravação
+VOLATILE_FIELDS = {"h", "client_time", "_"}
+
+def request_key(method, url, data=None):
+    """Chave determinística (método + URL + corpo) sem tokens e timestamps."""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k not in VOLATILE_FIELDS]
+    clean_url = urlunsplit(("", "", parts.path, urlencode(sorted(query)), ""))
+    body = sorted((str(k), str(v)) for k, v in (data or {}).items() if k not in VOLATILE_FIELDS)
+    return f"{method.upper()} {clean_url} {json.dumps(body)}"
+
+class CassetteResponse:
+    """Resposta reconstruída da gravação (mesma interface usada pelos managers)."""
+    def __init__(self, entry):
+        self.url = entry['final_url']
+        self.status_code = entry['status']
+        self.headers = entry.get('headers', {})
+        self.text = entry['body']
+        self.content = self.text.encode('utf-8')
+        self.redirect_count = 1 if entry['final_url'] != entry['url'] else 0
+
+    def json(self):
+        return json.loads(self.text)
+
+class Cassette:
+    """
+    Arquivo .jsonl com pares requisição/resposta.
+    mode='record' grava o tráfego real; mode='replay' serve as respostas sem rede.
+    """
+    def __init__(self, path, mode):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Modo de cassette inválido: {mode}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._cursor = {}
+
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette não encontrada: {self.path}")
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip(): continue
+                entry = json.loads(line)
+                self._entries.setdefault(entry['key'], []).append(entry)
+
+    def record(self, method, url, data, response):
+        entry = {
+            "key": request_key(method, url, data),
+            "method": method.upper(),
+            "url": url,
+            "data": data or {},
+            "status": response.status_code,
+            "final_url": response.url,
+            "headers": {"content-type": response.headers.get("content-type", "")},
+            "body": response.text,
+            "recorded_at": time.time()
+        }
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def play(self, method, url, data=None):
+        """
+        Devolve as respostas na ordem gravada; ao esgotar, repete a última
+        (ex: o bot pede 'overview' mais vezes do que na gravação).
+        """
+        key = request_key(method, url, data)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise LookupError(f"[CASSETTE] Requisição não gravada: {key}")
+            idx = self._cursor.get(key, 0)
+            self._cursor[key] = idx + 1
+            return CassetteResponse(entries[min(idx, len(entries) - 1)])
+
+class RecordingSession:
+    """Repassa tudo para a sessão real e grava cada GET/POST na cassette."""
+    def __init__(self, session, cassette):
+        self._session = session
+        self._cassette = cassette
+
+    def get(self, url, **kwargs):
+        kwargs.pop('stream', None) # A gravação guarda a página inteira (GET head_only incluso)
+        response = self._session.get(url, **kwargs)
+        self._cassette.record("GET", url, None, response)
+        return response
+
+    def post(self, url, data=None, **kwargs):
+        response = self._session.post(url, data=data, **kwargs)
+        self._cassette.record("POST", url, data, response)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def __setattr__(self, name, value):
+        # Ex: GameClient define session.proxies -> vai para a sessão real
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._session, name, value)
+
+class ReplaySession:
+    """Substitui a sessão HTTP: nenhuma conexão é aberta."""
+    offline = True
+
+    def __init__(self, cassette):
+        self._cassette = cassette
+        self.cookies = Cookies()
+        self.headers = {}
+        self.proxies = {}
+
+    def get(self, url, **kwargs):
+        return self._cassette.play("GET", url)
+
+    def post(self, url, data=None, **kwargs):
+        return self._cassette.play("POST", url, data)
+
+    def close(self):
+        pass
+
+# --- CASSETTE ATIVA (processo inteiro) ---
+_active = None
+
+def use_cassette(path, mode):
+    """Ativa a gravação/reprodução para todos os GameClients criados a partir daqui."""
+    global _active
+    _active = Cassette(path, mode)
+    return _active
+
+def eject_cassette():
+    global _active
+    _active = None
+
+def wrap_session(session):
+    """Chamado pelo GameClient ao criar a sessão."""
+    if not _active:
+        return session
+    if _active.mode == "record":
+        return RecordingSession(session, _active)
+    return ReplaySession(_active)
+
+# Ativação por variável de ambiente: CONTROLBOT_CASSETTE=record:caminho.jsonl | replay:caminho.jsonl
+_env = os.environ.get("CONTROLBOT_CASSETTE")
+if _env and ":" in _env:
+    _mode, _path = _env.split(":", 1)
+    use_cassette(_path, _mode)
@@ -0,0 +1,96 @@
+# ARQUIVO: core/client_pool.py
+import time
+import threading
+from core.request_engine import GameClient
+from core.async_request_engine import close_prefetch_twin
+from core.settings_manager import global_settings
+
+class ClientPool:
+    """
+    Registro global de GameClients, um por conta.
+    Reaproveita sessão, cookies, CSRF e conexões TLS já abertas entre os módulos
+    (bot, cluster, etc.) e descarta clientes ociosos após o TTL configurado.
+    """
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, account_data, connect=True):
+        """
+        Retorna um GameClient vivo para a conta.
+        connect=True garante a sessão autenticada, mas só repete o ensure_connection
+        se a última confirmação for mais antiga que 'client_revalidate' segundos
+        (ou se o cliente tiver um alerta de segurança pendente). A revalidação é
+        serializada por cliente: quem chega durante a de outro chamador espera e
+        aproveita o resultado, sem reentrar no mundo de novo.
+        Retorna None se a conexão falhar.
+        """
+        self._evict_idle()
+
+        aid = account_data['id']
+        with self._lock:
+            client = self._clients.get(aid)
+
+            # Proxy trocado na conta = cliente antigo não serve mais
+            if client and client.account.get('proxy_id') != account_data.get('proxy_id'):
+                self._drop(aid)
+                client = None
+
+            if not client:
+                client = GameClient(account_data)
+                client.connect_lock = threading.Lock()
+                self._clients[aid] = client
+
+            client.account = account_data
+            client.last_used = time.time()
+
+        if connect:
+            revalidate = global_settings.get("client_revalidate")
+            with client.connect_lock:
+                with self._lock:
+                    # Descartado por outro chamador cuja revalidação falhou
+                    if self._clients.get(aid) is not client: return None
+                if client.security_alert or time.time() - client.last_connected > revalidate:
+                    if not client.ensure_connection():
+                        self._discard_client(aid, client)
+                        return None
+                    client.update_account_session()
+
+        return client
+
+    def discard(self, account_id):
+        """Remove o cliente da conta (ex: sessão inválida, conta parada)."""
+        with self._lock:
+            self._drop(account_id)
+
+    def _discard_client(self, account_id, client):
+        # Só remove se o registro ainda for este cliente (não um mais novo)
+        with self._lock:
+            if self._clients.get(account_id) is client:
+                self._drop(account_id)
+
+    def clear(self):
+        with self._lock:
+            for aid in list(self._clients.keys()):
+                self._drop(aid)
+
+    def _evict_idle(self):
+        ttl = global_settings.get("client_idle_ttl")
+        now = time.time()
+        with self._lock:
+            for aid, client in list(self._clients.items()):
+                if now - client.last_used > ttl:
+                    self._drop(aid)
+
+    def _drop(self, account_id):
+        # Não fecha a sessão: quem ainda segura a referência continua funcionando.
+        # Os cookies voltam para a conta antes de soltar o cliente. O gêmeo de
+        # prefetch (event loop + AsyncSession próprios) é fechado: se for
+        # preciso de novo, o prefetch cria outro.
+        client = self._clients.pop(account_id, None)
+        if client:
+            client.update_account_session()
+            close_prefetch_twin(client)
+
+# Instância global
+client_pool = ClientPool()
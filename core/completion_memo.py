@@ -0,0 +1,32 @@
+# ARQUIVO: core/completion_memo.py
+import json
+import hashlib
+
+# Memória do que já está feito em cada conta (acc['completion_memo']), para
+# os módulos sem nada a fazer nem abrirem a tela:
+#   research: tecnologias da lista vistas como pesquisadas
+#   recruit:  metas de tropas atingidas, as tropas e a população nesse momento
+#             (vale por 'module_idle_recheck': a população das construções
+#             pode esconder uma perda pequena)
+#   build:    quantos itens do começo da fila do modelo já estão construídos
+# Cada memória guarda a assinatura da configuração do módulo (modelo de
+# construção, metas, lista de pesquisa): trocou a configuração, a memória zera.
+# Regressões observadas (população ou pontos caindo) são conferidas pelo
+# próprio manager, que chama forget().
+
+def _signature(config):
+    data = json.dumps(config, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:12]
+
+def get(acc, module, config):
+    """Memória do módulo na conta (dict gravado com a conta); vazia se a configuração mudou."""
+    memos = acc.setdefault('completion_memo', {})
+    sig = _signature(config)
+    memo = memos.get(module)
+    if not memo or memo.get('sig') != sig:
+        memo = memos[module] = {'sig': sig}
+    return memo
+
+def forget(acc, module):
+    """Descarta a memória do módulo (regressão observada: tudo é conferido de novo)."""
+    (acc.get('completion_memo') or {}).pop(module, None)
@@ -1,7 +1,15 @@
 import time
 import re
-from bs4 import BeautifulSoup
-from core.request_engine import GameClient
+from html import unescape
+from core.client_pool import client_pool
+from core.page_extract import fields_of
+
+# Células e links das linhas de convite
+_CELL = re.compile(r'<td[^>]*>(.*?)</td>', re.DOTALL)
+_LINK = re.compile(r'<a\b([^>]*)>(.*?)</a>', re.DOTALL)
+_HREF = re.compile(r'href=["\']([^"\']*)["\']')
+_TAG = re.compile(r'<[^>]+>')
+_BUDDY_ID = re.compile(r'buddy_id=(\d+)')
 
 class ClusterAccepter:
     def __init__(self, log_func):
@@ -12,19 +20,20 @@ class ClusterAccepter:
         Aceita convites de amizade pendentes na conta Master ou General.
         """
         try:
-            client = GameClient(account_data)
-            if not client.ensure_connection():
+            client = client_pool.get(account_data)
+            if not client:
                 self.log(f"Falha ao conectar na conta {account_data['username']}", "error")
                 return {"success": False, "accepted": 0, "failed": 0}
 
             # 1. Acessa tela de amigos
-            resp = client.safe_get("buddies")
+            # fresh: os convites chegam por ações de outras contas (fora do cache desta)
+            resp = client.safe_get("buddies", fresh=True)
             if not resp:
                 self.log(f"Falha ao acessar tela de amigos", "error")
                 return {"success": False, "accepted": 0, "failed": 0}
 
             # 2. Extrai os convites pendentes
-            pending_invites = self._extract_pending_invites(resp.text)
+            pending_invites = self._extract_pending_invites(resp)
             
             if not pending_invites:
                 self.log(f"✅ Nenhum convite pendente para {account_data['username']}", "success")
@@ -68,12 +77,16 @@ class ClusterAccepter:
                         continue
                     
                     # 5. Validação Robusta: Verifica se sumiu da lista de pendentes
-                    time.sleep(2) # Pausa para o servidor processar a mudança
-                    resp_check = client.safe_get("buddies")
+                    # O aceite redireciona de volta para a tela de amigos: reaproveita essa página
+                    if "screen=buddies" in resp_accept.url and "action=" not in resp_accept.url:
+                        resp_check = resp_accept
+                    else:
+                        client.space("cluster_accept_check") # Pausa para o servidor processar a mudança
+                        resp_check = client.safe_get("buddies", fresh=True)
                     
                     if resp_check:
                         # Extrai a lista de novo e vê se o ID ainda está lá
-                        check_list = self._extract_pending_invites(resp_check.text)
+                        check_list = self._extract_pending_invites(resp_check)
                         is_still_pending = any(inv['buddy_id'] == invite['buddy_id'] for inv in check_list)
                         
                         if not is_still_pending:
@@ -85,7 +98,7 @@ class ClusterAccepter:
                     
                     # Pausa entre aceites para evitar detecção
                     if idx < len(pending_invites):
-                        time.sleep(1.5)
+                        client.space("cluster_accept")
 
                 except Exception as e:
                     self.log(f"❌ [{idx}] Erro ao aceitar {invite['name']}: {e}", "error")
@@ -98,51 +111,44 @@ class ClusterAccepter:
             self.log(f"Erro crítico no Accepter ({account_data['username']}): {e}", "error")
             return {"success": False, "accepted": 0, "failed": 0}
 
-    def _extract_pending_invites(self, html):
+    def _extract_pending_invites(self, response):
         """
-        Extrai os convites pendentes da página de amigos usando BeautifulSoup.
+        Extrai os convites pendentes da página de amigos (spec "buddies" de
+        core/page_extract.py: linhas da tabela depois de "Convites em aberto").
         """
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            invites = []
-            
-            # Encontra o cabeçalho "Convites em aberto"
-            h3_tag = soup.find('h3', string=lambda t: t and 'Convites em aberto' in t)
-            if not h3_tag:
-                return []
-            
-            table = h3_tag.find_next('table', class_='vis')
-            if not table:
+            section = fields_of(response, "buddies")["invites"]
+            if not section:
                 return []
-            
-            rows = table.find_all('tr')[1:] # Pula o cabeçalho da tabela
-            
-            for row in rows:
-                cells = row.find_all('td')
-                if len(cells) < 2: continue
-                
+
+            invites = []
+            for row in section["rows"]:
+                cells = _CELL.findall(row)
+                if len(cells) < 2: continue  # Cabeçalho (<th>) ou linha vazia
+
                 # Nome do Player
-                name_link = cells[0].find('a')
+                name_link = _LINK.search(cells[0])
                 if not name_link: continue
-                player_name = name_link.text.strip()
-                
-                # Link de Aceitar
-                accept_link = cells[1].find('a', class_='btn-confirm-yes')
-                if not accept_link:
-                    # Tenta achar qualquer link que tenha approve_buddy
-                    accept_link = cells[1].find('a', href=re.compile(r'action=approve_buddy'))
-                
-                if accept_link:
-                    href = accept_link.get('href', '')
-                    buddy_id_match = re.search(r'buddy_id=(\d+)', href)
-                    
+                player_name = unescape(_TAG.sub("", name_link.group(2))).strip()
+
+                # Link de Aceitar (botão de confirmar ou qualquer link com approve_buddy)
+                links = _LINK.findall(cells[1])
+                accept_attrs = next((a for a, _ in links if "btn-confirm-yes" in a), None)
+                if accept_attrs is None:
+                    accept_attrs = next((a for a, _ in links if "action=approve_buddy" in a), None)
+
+                if accept_attrs:
+                    href_match = _HREF.search(accept_attrs)
+                    href = unescape(href_match.group(1)) if href_match else ''
+                    buddy_id_match = _BUDDY_ID.search(href)
+
                     if buddy_id_match:
                         invites.append({
                             "name": player_name,
                             "buddy_id": buddy_id_match.group(1),
                             "href": href
                         })
-            
+
             return invites
         except Exception as e:
             print(f"Erro ao extrair convites: {e}")
@@ -5,7 +5,7 @@ from core.features.cluster.inviter import ClusterInviter
 from core.features.cluster.accepter import ClusterAccepter
 from core.features.cluster.calculator import cluster_calculator
 from core.features.cluster.realocator import cluster_realocator
-from core.request_engine import GameClient
+from core.client_pool import client_pool
 
 class ClusterController:
     def __init__(self):
@@ -157,9 +157,10 @@ class ClusterController:
         Versão corrigida para lidar com quebras de linha e link de info_player.
         """
         try:
-            from core.request_engine import GameClient
-            client = GameClient(account)
-            resp = client.safe_get("buddies")
+            # Cliente compartilhado: chamado em loop na trava de segurança.
+            # fresh: o aceite vem de OUTRA conta, o cache desta não fica sabendo
+            client = client_pool.get(account, connect=False)
+            resp = client.safe_get("buddies", fresh=True)
             if not resp: return None
             
             # O HTML do jogo coloca o nome assim:
@@ -1,6 +1,6 @@
 import time
 import re
-from core.request_engine import GameClient 
+from core.client_pool import client_pool
 
 class ClusterInviter:
     def __init__(self, log_func):
@@ -12,13 +12,14 @@ class ClusterInviter:
         Extremamente simples - é um POST com name + CSRF.
         """
         try:
-            client = GameClient(account_data)
-            if not client.ensure_connection():
+            client = client_pool.get(account_data)
+            if not client:
                 self.log(f"Falha ao conectar na conta {account_data['username']}", "error")
                 return False
 
             # 1. Acessa tela de amigos para sincronizar sessão e obter village_id
-            resp = client.safe_get("buddies")
+            # fresh: convites/amizades mudam por ações de outras contas (fora do cache desta)
+            resp = client.safe_get("buddies", fresh=True)
             if not resp:
                 self.log(f"Falha ao acessar tela de amigos", "error")
                 return False
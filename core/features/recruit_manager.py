@@ -1,45 +1,90 @@
 import time
-import re
-import json
 from core.settings_manager import global_settings
+from core.page_model import village_state, unit_catalog
+from core.module_due import idle_until
+from core import completion_memo
 
 class RecruitManager:
     def __init__(self, client, log_func):
         self.client = client
         self.log = log_func
-
-    def execute(self, acc, game_data):
+        self.wake_at = None # (epoch, motivo): quando vale a pena voltar (BotController)
+        self._met = None # (atingidas, aviso para o log) da memória, avaliado uma vez por ciclo
+
+    def page_request(self, acc, village):
+        """Tela que o execute vai precisar (para o prefetch do BotController)."""
+        if not acc.get('recruit_targets') or self._targets_met(acc, village): return None
+        return ("train", {"village": village.village_id})
+
+    def _targets_met(self, acc, village):
+        """
+        Metas já atingidas segundo a memória da conta. Avaliado uma vez por
+        ciclo (page_request e execute usam o mesmo resultado); o aviso do
+        motivo fica para o execute registrar.
+        """
+        if self._met is None:
+            self._met = self._check_memo(acc, village)
+        return self._met[0]
+
+    def _check_memo(self, acc, village):
+        """
+        (atingidas, aviso). Se a população caiu desde então (tropas perdidas ou
+        dispensadas), esquece a memória e confere a tela. A população também
+        sobe com as construções e pode esconder uma perda menor: por isso a
+        memória vale só 'module_idle_recheck' segundos, e depois disso a tela
+        train é lida de novo (e a memória regravada).
+        """
+        memo = completion_memo.get(acc, "recruit", acc.get('recruit_targets', {}))
+        if 'met_pop' not in memo: return False, None
+        if village.pop_current < memo['met_pop']:
+            completion_memo.forget(acc, "recruit")
+            return False, (f"📉 [Recruit] População caiu ({memo['met_pop']} -> {village.pop_current}). Conferindo as metas...", "warn")
+        recheck = global_settings.get("module_idle_recheck")
+        if not recheck or time.time() - memo.get('at', 0) >= recheck:
+            troops = ", ".join(f"{u}:{q}" for u, q in memo.get('troops', {}).items())
+            return False, (f"🔁 [Recruit] Reconferindo as metas (última contagem: {troops or '-'}).", "info")
+        return True, None
+
+    def execute(self, acc, village):
+        self.wake_at = None
         # 1. Verifica se tem metas configuradas
         targets = acc.get('recruit_targets', {})
         if not targets:
             return
 
+        met = self._targets_met(acc, village)
+        note = self._met[1]
+        self._met = None # O próximo ciclo avalia a memória de novo
+        if note: self.log(*note)
+        if met:
+            self.log("✅ [Recruit] Metas de tropas já atingidas.", "info")
+            self.wake_at = idle_until("metas de recrutamento atingidas")
+            return
+
         # 2. Acessa a tela de recrutamento
         self.log("⚔️ [Recruit] Verificando quartéis...", "info")
-        resp = self.client.safe_get("train", params={"village": game_data['village_id']})
+        resp = self.client.safe_get("train", params={"village": village.village_id})
         if not resp: return
 
-        html = resp.text
+        # 3. Modelo da tela (montado uma vez por resposta)
+        # Atualiza recursos e populaçao
+        village.refresh(village_state(resp))
         
-        # 3. Extração Cirúrgica de Dados (Regex/JSON)
-        # Atualiza recursos, populaçao e pega o CSRF token
-        self._update_game_data(acc, game_data, html)
-        
-        # Lê os custos exatos deste mundo (evita erros com arqueiros/paladinos)
-        unit_costs = self._extract_unit_costs(html)
-        if not unit_costs:
+        # Custos exatos deste mundo (evita erros com arqueiros/paladinos), tropas e filas
+        catalog = unit_catalog(resp)
+        if not catalog:
             self.log("❌ [Recruit] Não foi possível ler os custos das unidades.", "error")
             return
+        unit_costs = catalog.costs
 
-        # Lê quantas tropas já temos
-        current_troops = self._extract_current_troops(html)
-        
-        # Lê o tamanho das filas (Quartel, Estábulo, Oficina)
-        queues = self._extract_queue_counts(html)
+        # Quantas tropas já temos e o tamanho das filas (Quartel, Estábulo, Oficina)
+        current_troops = catalog.troops
+        queues = catalog.queues
 
         # 4. Planejamento do Recrutamento
         units_to_recruit = []
         active_buildings = set()
+        all_met = True
 
         # CLONE a fila atual para um contador local (simulação)
         # Isso garante que se adicionarmos uma ordem agora, o próximo loop já sabe
@@ -68,6 +113,7 @@ class RecruitManager:
             needed = target_total - have
 
             if needed > 0:
+                all_met = False
                 building = UNIT_BUILDING_MAP.get(unit_id, 'barracks')
                 
                 # --- CORREÇÃO AQUI ---
@@ -93,15 +139,25 @@ class RecruitManager:
                 # "Fingimos" que a fila aumentou para a próxima iteração
                 virtual_queues[building] += 1 
 
+        if not all_met:
+            completion_memo.forget(acc, "recruit") # Alguma meta voltou a faltar
+
         if not units_to_recruit:
+            if all_met:
+                self.log("✅ [Recruit] Todas as metas de tropas atingidas.", "info")
+                self.wake_at = idle_until("metas de recrutamento atingidas")
+                memo = completion_memo.get(acc, "recruit", targets)
+                memo['met_pop'] = village.pop_current
+                memo['troops'] = {u: current_troops.get(u, 0) for u in targets}
+                memo['at'] = time.time()
             return
 
         # 5. Orçamento e Rateio
         # Divide os recursos disponíveis entre os prédios ativos
-        avail_wood = game_data['wood']
-        avail_stone = game_data['stone']
-        avail_iron = game_data['iron']
-        avail_pop = game_data['pop_max'] - game_data['pop_current']
+        avail_wood = village.wood
+        avail_stone = village.stone
+        avail_iron = village.iron
+        avail_pop = village.pop_max - village.pop_current
 
         # Se houver construção pendente no Main, reserva 25% (Opcional)
         if global_settings.get("reserve_for_building", True) and acc.get('build_queue'):
@@ -153,135 +209,20 @@ class RecruitManager:
         # 7. Envio (POST)
         if payload:
             self.log(f"⚔️ [Recruit] Treinando: {', '.join(log_msgs)}", "warn")
-            self._send_recruit_request(game_data, payload)
+            self._send_recruit_request(village, payload)
         else:
             self.log("ℹ️ [Recruit] Sem recursos ou população suficiente.", "info")
 
-    # =========================================================================
-    # PARSERS (REGEX/JSON) - BLINDADOS
-    # =========================================================================
-
-    def _update_game_data(self, acc, game_data, html):
-        """Lê recursos e CSRF token diretamente do HTML"""
-        # CSRF Token
-        csrf_match = re.search(r"var csrf_token = '(['\w]+)';", html)
-        if csrf_match:
-            game_data['csrf'] = csrf_match.group(1)
-
-        # Resources (TribalWars.updateGameData)
-        def get_val(key):
-            m = re.search(f'"{key}":([\d\.]+)', html)
-            return int(float(m.group(1))) if m else 0
-
-        # Tentativa de ler do updateGameData que é mais seguro
-        if "TribalWars.updateGameData" in html:
-            game_data['wood'] = get_val('wood')
-            game_data['stone'] = get_val('stone')
-            game_data['iron'] = get_val('iron')
-            game_data['pop_current'] = get_val('pop')
-            game_data['pop_max'] = get_val('pop_max')
-
-    def _extract_unit_costs(self, html):
-        """Lê custos e verifica se a unidade está PESQUISADA/DISPONÍVEL"""
-        costs = {}
-        
-        # Encontra o bloco JS das unidades
-        block_match = re.search(r'unit_managers\.units\s*=\s*\{(.*?)\};', html, re.DOTALL)
-        if not block_match:
-            return None
-        
-        block = block_match.group(1)
-        
-        # Itera sobre cada unidade
-        unit_pattern = re.compile(r'(?P<unit>\w+):\s*\{(.*?)\}', re.DOTALL)
-        
-        for match in unit_pattern.finditer(block):
-            u_name = match.group('unit')
-            props = match.group(2)
-            
-            # 1. VERIFICAÇÃO DE REQUISITOS (NOVO)
-            # Procura por "requirements_met": true ou false
-            req_match = re.search(r'requirements_met:\s*(true|false)', props)
-            if req_match and req_match.group(1) == 'false':
-                # Se não estiver pesquisada ou faltar edifício, ignora essa unidade
-                # self.log(f"Unidade {u_name} ignorada (não pesquisada).", "debug")
-                continue
-
-            # 2. Extração de Custos
-            def get_prop(p_name):
-                m = re.search(rf"{p_name}:\s*(\d+)", props)
-                return int(m.group(1)) if m else 0
-            
-            costs[u_name] = {
-                'wood': get_prop('wood'),
-                'stone': get_prop('stone'),
-                'iron': get_prop('iron'),
-                'pop': get_prop('pop')
-            }
-        
-        return costs
-
-    def _extract_current_troops(self, html):
-        """Lê a quantidade atual de tropas dos links 'set_max'"""
-        # Padrão: <a id="spear_0_a" ...>(123)</a>
-        troops = {}
-        pattern = re.compile(r'id="(\w+)_0_a"[^>]*>\((\d+)\)<')
-        
-        for match in pattern.finditer(html):
-            unit = match.group(1)
-            count = int(match.group(2))
-            troops[unit] = count
-            
-        return troops
+    def _send_recruit_request(self, village, payload):
+        if not self.client.csrf_token: return
 
-    def _extract_queue_counts(self, html):
-        """Conta ordens TOTAIS (Ativa + Fila de Espera) para cada edifício"""
-        queues = {'barracks': 0, 'stable': 0, 'garage': 0}
-        
-        for building in queues.keys():
-            # Procura o container da fila deste edifício
-            # Ex: id="trainqueue_wrap_barracks"
-            start_marker = f'id="trainqueue_wrap_{building}"'
-            start_idx = html.find(start_marker)
-            
-            if start_idx != -1:
-                # Pega o conteúdo até o fim da tabela
-                end_idx = html.find('</table>', start_idx)
-                if end_idx != -1:
-                    block = html[start_idx:end_idx]
-                    
-                    # 1. Conta as ordens em ESPERA (IDs trainorder_X)
-                    queued = block.count('id="trainorder_')
-                    
-                    # 2. Conta a ordem ATIVA (classe "lit")
-                    # O jogo usa <tr class="lit"> para a unidade treinando agora
-                    # Verificamos class="lit" com aspas para não confundir com lit-item
-                    active = 1 if 'class="lit"' in block or "class='lit'" in block else 0
-                    
-                    queues[building] = queued + active
-
-        return queues
-
-    def _send_recruit_request(self, game_data, payload):
-        csrf = game_data.get('csrf')
-        if not csrf: return
-
-        # URL correta de recrutamento (action=train)
-        url = f"game.php?village={game_data['village_id']}&screen=train&action=train&mode=train"
-        
-        # Adiciona o token ao payload e query params
-        payload['h'] = csrf
-        
-        # Ajuste de URL completa
-        full_url = f"{self.client.base_url}/{url}"
-        
-        # Headers essenciais
-        headers = self.client.headers.copy()
-        headers["Referer"] = f"{self.client.base_url}/game.php?village={game_data['village_id']}&screen=train"
+        # URL correta de recrutamento (action=train); o safe_post adiciona o token 'h'
+        params = {"village": village.village_id, "action": "train", "mode": "train"}
+        headers = {"Referer": f"{self.client.base_url}/game.php?village={village.village_id}&screen=train"}
 
-        try:
-            self.client.session.post(full_url, data=payload, headers=headers)
+        resp = self.client.safe_post("train", payload, params=params, extra_headers=headers)
+        if resp is not None:
             self.log("✅ [Recruit] Requisição enviada com sucesso.", "success")
-            time.sleep(1) # Delay leve
-        except Exception as e:
-            self.log(f"❌ [Recruit] Falha de conexão: {e}", "error")
\ No newline at end of file
+            self.client.space("recruit") # Delay leve
+        else:
+            self.log(f"❌ [Recruit] Falha de conexão.", "error")
@@ -1,14 +1,18 @@
 import time
-import random
 import re
-import json
 from core.settings_manager import global_settings
+from core.page_scan import scan_of
+from core.page_model import village_state
+from core.page_extract import fields_of
+from core.module_due import idle_until
+from core import completion_memo
 
 class ResearchManager:
     def __init__(self, bot_controller, log_func=None):
         self.bot = bot_controller
         self.external_log = log_func
         self.running = False
+        self.wake_at = None # (epoch, motivo): quando vale a pena voltar (BotController)
 
         # Mapa para corrigir nomes caso o usuário coloque em PT-BR
         self.name_map = {
@@ -26,15 +30,23 @@ class ResearchManager:
         else:
             print(f"[Pesquisa] {msg}")
 
-    def execute(self, acc, game_data):
-        # 1. Obter Lista de Prioridade Original
+    def page_request(self, acc, village):
+        """Tela que o execute vai precisar (para o prefetch do BotController)."""
+        if not village.village_id: return None
+        priority_list = self._priority_list(acc)
+        if not priority_list or self._all_researched(acc, priority_list): return None
+        return ("smith", {"village": village.village_id})
+
+    def _all_researched(self, acc, priority_list):
+        """True se a memória da conta já viu toda a lista pesquisada (sem abrir o Ferreiro)."""
+        done = completion_memo.get(acc, "research", priority_list).get('techs', [])
+        return all(tech_id in done for tech_id in priority_list)
+
+    def _priority_list(self, acc):
+        """Lista de prioridade (global ou da conta) traduzida para os ids do jogo."""
         raw_priority = global_settings.get("research_priority", [])
         if not raw_priority:
             raw_priority = acc.get('research_priority', [])
-        
-        if not raw_priority:
-            self.log("Lista de prioridade vazia!", "warning")
-            return
 
         # --- LÓGICA DE TRADUÇÃO INTERNA ---
         priority_list = []
@@ -48,99 +60,78 @@ class ResearchManager:
                 # Fallback: se não tiver parêntese, usa o mapa de nomes PT-BR
                 clean_item = item.lower().strip()
                 priority_list.append(self.name_map.get(clean_item, clean_item))
+        return priority_list
 
-        # Dados básicos da aldeia
-        village_id = None
-        
-        if isinstance(game_data, dict):
-            # Formato 1: {'village': {'id': ...}}
-            if 'village' in game_data and isinstance(game_data['village'], dict):
-                village_id = game_data['village'].get('id')
-            # Formato 2: {'id': ...} (direto)
-            elif 'id' in game_data:
-                village_id = game_data.get('id')
-            # Formato 3: procura em acc
-            elif 'village_id' in game_data:
-                village_id = game_data.get('village_id')
-        
-        # Último recurso: tenta pegar de acc
-        if not village_id and isinstance(acc, dict):
-            village_id = acc.get('village_id') or acc.get('id')
+    def execute(self, acc, village):
+        self.wake_at = None
+        # 1. Obter Lista de Prioridade (ids internos)
+        priority_list = self._priority_list(acc)
+        if not priority_list:
+            self.log("Lista de prioridade vazia!", "warning")
+            return
+
+        # Tecnologias já vistas pesquisadas (nível não regride): lista toda feita, nem abre a tela
+        if self._all_researched(acc, priority_list):
+            self.log("✅ Todas as tecnologias da lista já pesquisadas.", "info")
+            self.wake_at = idle_until("pesquisas concluídas")
+            return
+        done = completion_memo.get(acc, "research", priority_list).setdefault('techs', [])
+
+        # Dados básicos da aldeia (VillageState do ciclo)
+        village_id = village.village_id
         
         if not village_id:
-            self.log(f"Village ID não encontrado! game_data: {list(game_data.keys()) if isinstance(game_data, dict) else type(game_data)}", "error")
-            self.log(f"acc: {list(acc.keys()) if isinstance(acc, dict) else type(acc)}", "error")
+            self.log(f"Village ID não encontrado! (origem: {village.source or '-'})", "error")
             return
         
-        village_id = int(village_id)
-        
-        # 2. CORREÇÃO: Garantir que base_url termina com /
-        base_url = self.bot.base_url
-        if not base_url.endswith('/'):
-            base_url += '/'
-        
         # 3. Acessa a página (GET)
-        url = f"{base_url}game.php?village={village_id}&screen=smith"
-        
-        try:
-            response = self.bot.session.get(url, timeout=15)
-            html = response.text
-        except Exception as e:
-            self.log(f"❌ Erro de conexão: {e}", "error")
+        response = self.bot.safe_get("smith", params={"village": village_id})
+        if not response:
+            self.log("❌ Erro de conexão ao abrir o Ferreiro", "error")
             return
+        html = response.text
 
-        # 4. Extração de CSRF Token
-        csrf_token = None
-        # Tenta pegar da variável JS direta
-        match_csrf = re.search(r"var csrf_token = '([a-f0-9]+)';", html)
-        if match_csrf:
-            csrf_token = match_csrf.group(1)
-        else:
-            # Fallback: tenta TribalWars.updateGameData
-            match_csrf_json = re.search(r'"csrf"\s*:\s*"([a-f0-9]+)"', html)
-            if match_csrf_json:
-                csrf_token = match_csrf_json.group(1)
+        # 4. CSRF Token e Recursos (varredura única do GameClient)
+        scan = scan_of(response)
+        csrf_token = scan.csrf
         
         if not csrf_token:
             self.log("Token CSRF não encontrado!", "error")
             return
 
-        # 5. Extração de Recursos
-        current_wood, current_stone, current_iron = 0, 0, 0
-        
-        match_gd = re.search(r'TribalWars\.updateGameData\(({.*?})\);', html, re.DOTALL)
-        if match_gd:
-            try:
-                gd_json = json.loads(match_gd.group(1))
-                current_wood = int(gd_json.get('village', {}).get('wood', 0))
-                current_stone = int(gd_json.get('village', {}).get('stone', 0))
-                current_iron = int(gd_json.get('village', {}).get('iron', 0))
-            except Exception as e:
-                self.log(f"Erro ao ler recursos do JSON: {e}", "error")
-                return
-        else:
+        # 5. Recursos (modelo da resposta, montado uma vez)
+        if not scan.game_data:
             self.log("Game data não encontrado", "error")
             return
 
+        village.refresh(village_state(response))
+        current_wood = village.wood
+        current_stone = village.stone
+        current_iron = village.iron
+
         # 6. Extração de Tecnologias Disponíveis
         available_techs = {}
-        match_tech = re.search(r'BuildingSmith\.techs\s*=\s*({.*?});', html, re.DOTALL)
+        tech_data = fields_of(response, "smith")["techs"]
         
-        if match_tech:
-            try:
-                tech_data = json.loads(match_tech.group(1))
-                available_techs = tech_data.get("available", {})
-            except Exception as e:
-                self.log(f"Erro ao ler JSON de tecnologias: {e}", "error")
-                return
+        if isinstance(tech_data, dict):
+            available_techs = tech_data.get("available", {})
+        elif "BuildingSmith.techs" in html:
+            self.log(f"Erro ao ler JSON de tecnologias", "error")
+            return
         else:
             self.log("Nenhuma tecnologia disponível ou Ferreiro não existe", "warning")
             return
 
         # 7. Loop de Tentativa de Pesquisa
         self.log(f"📋 Verificando {len(priority_list)} tecnologia(s) na lista", "info")
+        researched = 0
+        etas = [] # Quando a produção cobre cada tecnologia barrada só por recursos
         
         for tech_id in priority_list:
+            if tech_id in done:
+                researched += 1
+                continue
+
             tech_info = available_techs.get(tech_id)
             
             if not tech_info:
@@ -153,6 +144,8 @@ class ResearchManager:
                 if lvl >= 1:
                     tech_name = tech_info.get('name', tech_id)
                     self.log(f"✅ {tech_name} já pesquisado (nível {lvl})", "info")
+                    researched += 1
+                    done.append(tech_id)
                     continue
             except:
                 pass
@@ -203,6 +196,8 @@ class ResearchManager:
                         res_faltam.append(f"⛏️ {req_iron - current_iron}")
                     
                     if res_faltam:
+                        eta = village.affordable_at(tech_info)
+                        if eta: etas.append(eta)
                         self.log(f"⏳ {tech_name}: recursos insuficientes - faltam {' | '.join(res_faltam)}", "warn")
                         continue
                 
@@ -236,6 +231,8 @@ class ResearchManager:
                         if current_iron < req_iron:
                             res_faltam.append(f"⛏️ {req_iron - current_iron}")
                         
+                        eta = village.affordable_at(tech_info)
+                        if eta: etas.append(eta)
                         if res_faltam:
                             self.log(f"⏳ {tech_name}: recursos insuficientes - faltam {' | '.join(res_faltam)}", "warn")
                         else:
@@ -249,54 +246,31 @@ class ResearchManager:
             tech_name = tech_info.get('name', tech_id)
             self.log(f"🎯 Próxima prioridade: {tech_name}", "info")
 
-            # PESQUISA!
-            action_url = f"{base_url}game.php?village={village_id}&screen=smith&ajaxaction=research"
-            
-            payload = {
-                "tech_id": tech_id,
-                "source": str(village_id),
-                "h": csrf_token
-            }
-            
-            headers = {
-                'X-Requested-With': 'XMLHttpRequest',
-                'Referer': url,
-                'User-Agent': self.bot.session.headers.get('User-Agent', '')
-            }
+            # PESQUISA! (client.ajax: passa pelo ritmo, telemetria e invalida o cache de telas)
+            payload = {"tech_id": tech_id, "source": str(village_id)}
 
             try:
-                r = self.bot.session.post(action_url, data=payload, headers=headers, timeout=10)
-                
-                if r.status_code == 200:
-                    try:
-                        resp_json = r.json()
-                        
-                        # Verifica se há erro explícito
-                        if "error" in resp_json:
-                            self.log(f"❌ Erro: {resp_json['error']}", "error")
-                            return
-                        
-                        # Se tem game_data ou response, pesquisa foi aceita
-                        if "game_data" in resp_json or "response" in resp_json:
-                            self.log(f"✅ Pesquisa iniciada com sucesso", "success")
-                            time.sleep(random.uniform(0.5, 1.5))
-                            return
-                        
-                        # Fallback: se chegou aqui com 200, aceita como sucesso
-                        self.log(f"✅ Pesquisa enviada", "success")
-                        return
-                        
-                    except json.JSONDecodeError:
-                        # Se não é JSON mas retornou 200, provavelmente funcionou
-                        self.log(f"✅ Pesquisa iniciada", "success")
-                        return
+                result = self.bot.ajax.post("research", village_id, payload)
+
+                if result.ok:
+                    self.log(f"✅ Pesquisa iniciada com sucesso", "success")
+                    self.bot.space("research")
+                elif result.outcome == "error":
+                    self.log(f"❌ Erro: {result.error}", "error")
+                elif result.outcome == "unknown":
+                    # Não é JSON mas retornou 200, provavelmente funcionou
+                    self.log(f"✅ Pesquisa iniciada", "success")
                 else:
-                    self.log(f"❌ Erro HTTP {r.status_code}", "error")
-                    
+                    self.log(f"❌ Erro na requisição de pesquisa ({result.error})", "error")
+
             except Exception as e:
                 self.log(f"❌ Erro na requisição: {e}", "error")
             
             return
 
         # Se chegou aqui, todas já foram pesquisadas
-        self.log("✅ Todas as tecnologias da lista já foram Verificadas", "info")
\ No newline at end of file
+        self.log("✅ Todas as tecnologias da lista já foram Verificadas", "info")
+        if researched == len(priority_list):
+            self.wake_at = idle_until("pesquisas concluídas")
+        elif etas:
+            self.wake_at = (min(etas), "recursos para pesquisar")
\ No newline at end of file
@@ -1,7 +1,7 @@
 import time
 import math
-import json
-import random
+from core.page_model import village_state, scavenge_state
+from core.module_due import idle_until
 
 # Pesos para equalizar o tempo de retorno (15-6-3-2)
 SCAVENGE_WEIGHTS = { 1: 15, 2: 6, 3: 3, 4: 2 }
@@ -16,23 +16,30 @@ class ScavengeManager:
     def __init__(self, client, log_func):
         self.client = client
         self.log = log_func
+        self.wake_at = None # (epoch, motivo): quando vale a pena voltar (BotController)
 
-    def execute(self, acc, game_data):
-        village_id = game_data.get('village_id')
+    def page_request(self, acc, village):
+        """Tela que o execute vai precisar (para o prefetch do BotController)."""
+        if not village.village_id: return None
+        return ("place", {"mode": "scavenge", "village": village.village_id})
+
+    def execute(self, acc, village):
+        self.wake_at = None
+        village_id = village.village_id
         if not village_id: return
 
         # 1. Acessa a tela
         resp = self.client.safe_get("place", params={"mode": "scavenge", "village": village_id})
         if not resp: return
 
-        from core.game_parser import GameParser
-        parser = GameParser(resp.text)
-        scavenge_data = parser.get_scavenge_data()
+        village.refresh(village_state(resp))
+        scavenge_data = scavenge_state(resp)
         
         # 2. Verifica erro de leitura
         if not scavenge_data:
             if "ScavengeScreen" not in resp.text:
                 self.log("ℹ️ Mundo sem coleta disponível.", "info")
+                self.wake_at = idle_until("mundo sem coleta")
             else:
                 self.log("⚠️ Erro ao ler dados de coleta.", "error")
             return
@@ -42,7 +49,7 @@ class ScavengeManager:
             levels_info = {}
             active_end_times = [] # Lista de todos os horários de fim (retorno ou desbloqueio)
 
-            for key, lvl in scavenge_data['levels'].items():
+            for key, lvl in scavenge_data.levels.items():
                 status = "idle" 
                 end_time = None
                 
@@ -81,7 +88,7 @@ class ScavengeManager:
         # A alteração crítica foi apenas no bloco try/except acima.
         
         # 3. Verifica Desbloqueios e Monta Lista de Disponíveis
-        levels = scavenge_data['levels']
+        levels = scavenge_data.levels
         unlocked_ids = [] 
         
         for key in sorted(levels.keys(), key=lambda x: int(x)):
@@ -90,16 +97,12 @@ class ScavengeManager:
                 if lvl.get('unlock_time'): break 
                 
                 cost = lvl['unlock_cost']
-                if (game_data['wood'] >= cost['wood'] and 
-                    game_data['stone'] >= cost['stone'] and 
-                    game_data['iron'] >= cost['iron']):
+                if village.can_afford(cost):
                     
                     self.log(f"🔓 Desbloqueando Nível {key}...", "warn")
                     if self._unlock_option(lvl['id'], village_id):
-                        game_data['wood'] -= cost['wood']
-                        game_data['stone'] -= cost['stone']
-                        game_data['iron'] -= cost['iron']
-                        time.sleep(1)
+                        village.spend(cost, "scavenge_api/start_unlock")
+                        self.client.space("scavenge_unlock")
                     break 
                 else:
                     break 
@@ -110,13 +113,16 @@ class ScavengeManager:
 
         busy_levels = [id for id in unlocked_ids if levels[str(id)]['scavenging_squad']]
         if len(busy_levels) > 0:
+            # Só reenvia com todos os níveis livres: acorda quando o último voltar
+            max_return = (acc.get('scavenge_data') or {}).get('max_return')
+            if max_return: self.wake_at = (max_return, "retorno da coleta")
             if len(busy_levels) == len(unlocked_ids):
                 self.log("✅ Coletas em andamento.", "success")
             else:
                 self.log(f"⏳ Aguardando retorno ({len(busy_levels)}/{len(unlocked_ids)} ocupados).", "info")
             return
 
-        home_units = scavenge_data.get('home_units', {})
+        home_units = scavenge_data.home_units
         world_units = list(home_units.keys())
         
         available_troops = {}
@@ -170,16 +176,24 @@ class ScavengeManager:
             self.log("ℹ️ Tropas insuficientes para o mínimo.", "info")
             return
 
-        for opt_id, troops in final_distribution.items():
-            if not troops: continue
-            
-            post_data = {}
-            if self.client.csrf_token:
-                post_data['h'] = self.client.csrf_token
-
+        # 4. Envia todos os esquadrões da aldeia em UMA requisição (squad_requests[n])
+        squads = [(village_id, opt_id, troops) for opt_id, troops in final_distribution.items() if troops]
+        self.send_squads(squads, world_units)
+        self.client.space("scavenge_squad")
+
+    def send_squads(self, squads, world_units):
+        """
+        Envia vários esquadrões (de uma ou mais aldeias) num único POST send_squads.
+        squads: lista de (village_id, option_id, {unidade: qtd}).
+        Retorna a quantidade de esquadrões aceitos pelo servidor.
+        """
+        if not squads: return 0
+
+        post_data = {}
+        for idx, (village_id, opt_id, troops) in enumerate(squads):
             carry_max = sum(troops[u] * UNIT_CARRY.get(u, 0) for u in troops)
             
-            prefix = "squad_requests[0]"
+            prefix = f"squad_requests[{idx}]"
             
             post_data[f"{prefix}[village_id]"] = str(village_id)
             post_data[f"{prefix}[option_id]"] = str(opt_id)
@@ -194,57 +208,34 @@ class ScavengeManager:
             
             self.log(f"🪓 Nv{opt_id}: Enviando {','.join(troop_log)}...", "info")
 
-            params = {
-                "village": village_id,
-                "screen": "scavenge_api",
-                "ajaxaction": "send_squads"
-            }
-            extra_headers = {"X-Requested-With": "XMLHttpRequest", "TribalWars-Ajax": "1"}
-
-            resp = self.client.safe_post("scavenge_api", post_data, params=params, extra_headers=extra_headers)
-            
-            success = False
-            if resp and resp.status_code == 200:
-                try:
-                    rjson = resp.json()
-                    if rjson.get('error'):
-                         self.log(f"❌ Erro Nv{opt_id}: {rjson.get('error')}", "error")
-                    else:
-                        squad_res = rjson.get('squad_responses', [])
-                        if squad_res and squad_res[0].get('success'):
-                            success = True
-                        elif '"success":true' in json.dumps(rjson) or '"success": true' in json.dumps(rjson):
-                            success = True
-                        
-                        if success:
-                            self.log(f"✅ Nv{opt_id} enviado com sucesso.", "success")
-                        else:
-                            self.log(f"⚠️ Nv{opt_id} resposta: {rjson}", "warn")
-                except:
-                    self.log(f"❌ Erro JSON Nv{opt_id}", "error")
+        result = self.client.ajax.post("send_squads", squads[0][0], post_data)
+
+        if result.outcome == "failed":
+            self.log(f"❌ Falha HTTP no envio da coleta ({result.error})", "error")
+            return 0
+        if result.outcome == "unknown":
+            self.log(f"❌ Erro JSON no envio da coleta", "error")
+            return 0
+        if result.outcome == "error":
+            self.log(f"❌ Erro na coleta: {result.error}", "error")
+            return 0
+
+        # Uma resposta por entrada, na mesma ordem do squad_requests[n]
+        rjson = result.data
+        squad_res = rjson.get('squad_responses', []) if isinstance(rjson, dict) else []
+        if not squad_res and result.flag('success'):
+            squad_res = [{"success": True}] * len(squads)
+
+        sent = 0
+        for idx, (village_id, opt_id, troops) in enumerate(squads):
+            entry = squad_res[idx] if idx < len(squad_res) else None
+            if entry and entry.get('success'):
+                sent += 1
+                self.log(f"✅ Nv{opt_id} enviado com sucesso.", "success")
             else:
-                self.log(f"❌ Falha HTTP Nv{opt_id}", "error")
-
-            time.sleep(random.uniform(0.8, 1.5))
+                self.log(f"⚠️ Nv{opt_id} resposta: {entry if entry else rjson}", "warn")
+        return sent
 
     def _unlock_option(self, option_id, village_id):
-        params = {
-            "village": village_id, 
-            "screen": "scavenge_api",
-            "ajaxaction": "start_unlock"
-        }
-        data = {
-            "village_id": village_id,
-            "option_id": option_id
-        }
-        if self.client.csrf_token:
-            data['h'] = self.client.csrf_token
-
-        extra_headers = {"X-Requested-With": "XMLHttpRequest", "TribalWars-Ajax": "1"}
-        
-        resp = self.client.safe_post("scavenge_api", data, params=params, extra_headers=extra_headers)
-        if resp and resp.status_code == 200:
-            try:
-                if not resp.json().get('error'): return True
-            except: pass
-        return False
\ No newline at end of file
+        data = {"village_id": village_id, "option_id": option_id}
+        return self.client.ajax.post("start_unlock", village_id, data).ok
\ No newline at end of file
@@ -0,0 +1,200 @@
+# ARQUIVO: core/fleet_scheduler.py
+import time
+import heapq
+import queue
+import itertools
+import threading
+import contextvars
+from core.settings_manager import global_settings
+
+# Token de parada da conta cujo ciclo está rodando nesta thread (Event setado
+# por cancel/shutdown). O worker o define antes de chamar a tarefa; as pausas do
+# GameClient (ritmo, novas tentativas) dormem nele e acordam na hora da parada.
+current_stop = contextvars.ContextVar("current_stop", default=None)
+
+class Stopped(Exception):
+    """A conta foi parada: a pausa/requisição em andamento foi interrompida."""
+
+def stop_requested():
+    """True se a conta do ciclo atual (desta thread) foi parada."""
+    stop = current_stop.get()
+    return stop is not None and stop.is_set()
+
+def pause(seconds):
+    """Dorme 'seconds' ou até a conta do ciclo atual ser parada. False se foi interrompido."""
+    stop = current_stop.get()
+    if stop is None:
+        time.sleep(seconds)
+        return True
+    return not stop.wait(seconds)
+
+class FleetScheduler:
+    """
+    Agenda central da frota: heap de [horário, seq, conta, tarefa, ativa]
+    servido por um pool fixo de workers ('scheduler_workers').
+    Uma única thread despachante dorme até a próxima entrada vencer (ou até
+    chegar uma entrada mais cedo); contas dormindo entre ciclos não ocupam
+    thread nenhuma. Cada conta tem no máximo uma entrada: agendar de novo
+    substitui a anterior e cancel() a desativa direto (remoção preguiçosa do heap).
+    Cada conta tem também um Event de parada (current_stop durante a tarefa):
+    cancel() o seta e o ciclo em andamento para na próxima pausa ou requisição.
+    Workers ociosos ficam bloqueados na fila; shutdown() os acorda com um
+    sentinela, sem nenhuma verificação periódica.
+
+    Limite de vazão: as pausas humanas entre fases e módulos devolvem o worker
+    (o BotController reagenda o resto do ciclo), mas o espaçamento entre as
+    requisições de um módulo (request_pacer.wait, ~1,2s por GET com as regras
+    padrão) ainda segura a thread. Com ~10 requisições por ciclo isso dá ~12s
+    de worker por ciclo, e a frota fica em no máximo
+    scheduler_max_workers / 12 ciclos por segundo (~5/s com 64). Por isso o
+    pool começa com 'scheduler_workers' e cresce sob demanda: se uma entrada
+    vence sem worker livre, nasce mais um, até 'scheduler_max_workers'.
+    """
+    def __init__(self, workers=None, max_workers=None):
+        self.workers = workers
+        self.max_workers = max_workers
+        self._pending = 0       # entradas na fila dos workers ainda não pegas
+        self._busy = 0          # workers executando uma tarefa
+        self._heap = []
+        self._entries = {}      # conta -> entrada pendente (no heap ou na fila dos workers)
+        self._running = {}      # conta -> tarefas em execução (a tarefa pode se reagendar)
+        self._stops = {}        # conta -> Event de parada (trocado a cada cancel)
+        self._ready = queue.Queue()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def schedule(self, account_id, task, delay=0):
+        """Agenda (ou reagenda) a tarefa da conta para daqui a 'delay' segundos."""
+        with self._cond:
+            if self._closed:
+                print(f"[SCHEDULER] Agenda encerrada: conta {account_id} não foi agendada.")
+                return
+            self._cancel(account_id)
+            entry = [time.time() + max(0, delay), next(self._seq), account_id, task, True]
+            self._entries[account_id] = entry
+            heapq.heappush(self._heap, entry)
+            self._start()
+            self._cond.notify()
+
+    def cancel(self, account_id):
+        """
+        Desativa a próxima execução da conta e sinaliza a parada da que estiver
+        rodando (Event da conta). True se havia uma execução agendada.
+        """
+        with self._cond:
+            stop = self._stops.pop(account_id, None)
+            if stop: stop.set()
+            return self._cancel(account_id)
+
+    def shutdown(self, timeout=25):
+        """
+        Encerra a frota: esvazia a agenda, para os ciclos em andamento e encerra
+        despachante e workers. Espera no máximo 'timeout' segundos (uma
+        requisição HTTP já enviada vai até o próprio timeout, 20s). True se
+        todas as threads terminaram.
+        """
+        with self._cond:
+            self._closed = True
+            for entry in self._entries.values(): entry[4] = False
+            self._entries.clear()
+            self._heap.clear()
+            for stop in self._stops.values(): stop.set()
+            self._stops.clear()
+            threads, self._threads = self._threads, []
+            self._cond.notify_all()
+        for _ in threads[1:]:
+            self._ready.put(None) # Um sentinela por worker
+
+        deadline = time.monotonic() + timeout
+        for t in threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        alive = [t.name for t in threads if t.is_alive()]
+        if alive: print(f"[SCHEDULER] Encerramento: {len(alive)} thread(s) ainda ocupada(s) após {timeout}s")
+        return not alive
+
+    def is_active(self, account_id):
+        """True se a conta tem execução agendada ou em andamento."""
+        with self._cond:
+            return account_id in self._entries or account_id in self._running
+
+    def due_in(self, account_id):
+        """Segundos até a próxima execução da conta (None se não houver)."""
+        with self._cond:
+            entry = self._entries.get(account_id)
+            return max(0.0, entry[0] - time.time()) if entry else None
+
+    def _cancel(self, account_id):
+        entry = self._entries.pop(account_id, None)
+        if entry: entry[4] = False
+        return entry is not None
+
+    def _start(self):
+        if self._threads: return
+        workers = self.workers or global_settings.get("scheduler_workers")
+        dispatcher = threading.Thread(target=self._dispatch, name="scheduler", daemon=True)
+        self._threads.append(dispatcher)
+        dispatcher.start()
+        for _ in range(workers):
+            self._spawn_worker()
+
+    def _spawn_worker(self):
+        # Chamado com self._cond em mãos (ou antes de a agenda começar)
+        worker = threading.Thread(target=self._work, name=f"scheduler-{len(self._threads) - 1}", daemon=True)
+        self._threads.append(worker)
+        worker.start()
+
+    def _claim_worker(self):
+        """Conta a entrada que vai para a fila; sem worker livre para ela, cria um (até o teto)."""
+        workers = len(self._threads) - 1
+        limit = max(self.max_workers or global_settings.get("scheduler_max_workers"), self.workers or 0)
+        if workers - self._busy - self._pending <= 0 and workers < limit:
+            self._spawn_worker()
+        self._pending += 1
+
+    def _dispatch(self):
+        """Move para a fila dos workers as entradas que venceram."""
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed: return
+                    while self._heap and not self._heap[0][4]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.time()
+                    if wait <= 0: break
+                    self._cond.wait(wait)
+                entry = heapq.heappop(self._heap)
+                self._claim_worker()
+            self._ready.put(entry)
+
+    def _work(self):
+        while True:
+            entry = self._ready.get()
+            if entry is None: return # shutdown()
+            _, _, account_id, task, _ = entry
+            with self._cond:
+                self._pending -= 1
+                if not entry[4]: continue # Cancelada enquanto esperava um worker livre
+                self._busy += 1
+                del self._entries[account_id]
+                self._running[account_id] = self._running.get(account_id, 0) + 1
+                stop = self._stops.setdefault(account_id, threading.Event())
+            token = current_stop.set(stop)
+            try:
+                task()
+            except Exception as e:
+                print(f"[SCHEDULER] Erro na tarefa da conta {account_id}: {e}")
+            finally:
+                current_stop.reset(token)
+                with self._cond:
+                    self._busy -= 1 # Livre de novo (volta a bloquear na fila)
+                with self._cond:
+                    left = self._running.pop(account_id) - 1
+                    if left: self._running[account_id] = left
+
+# Instância global
+fleet_scheduler = FleetScheduler()
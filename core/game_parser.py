@@ -1,11 +1,170 @@
 from bs4 import BeautifulSoup
 import re
+import sys
 import json
+from core.page_scan import flatten_game_data, extract_json, scan_security
+from core.page_extract import extract_text
+from core.settings_manager import global_settings
+
+# Parsers em C (opcionais). Sem eles, o GameParser usa o BeautifulSoup puro.
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# --- BACKENDS DE HTML ---
+# O GameParser usa só um pedaço da API do BeautifulSoup: find, find_all,
+# find_parent, get e text. Os adaptadores abaixo expõem esse mesmo pedaço
+# sobre o selectolax (Lexbor) e o lxml. A paridade entre eles é conferida por
+# tools/parser_parity.py.
+
+def _css(name=None, id=None, class_=None):
+    selector = name or "*"
+    if id: selector += f'[id="{id}"]'
+    if class_: selector += f'[class~="{class_}"]'
+    return selector
+
+class LexborNode:
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    def find(self, name=None, id=None, class_=None):
+        found = self.node.css_first(_css(name, id, class_))
+        return LexborNode(found) if found is not None else None
+
+    def find_all(self, name=None, id=None, class_=None):
+        return [LexborNode(n) for n in self.node.css(_css(name, id, class_))]
+
+    def find_parent(self, name):
+        parent = self.node.parent
+        while parent is not None:
+            if parent.tag == name: return LexborNode(parent)
+            parent = parent.parent
+        return None
+
+    def get(self, attr, default=None):
+        value = self.node.attributes.get(attr)
+        if value is None: return default
+        return value.split() if attr == "class" else value
+
+    @property
+    def text(self):
+        return self.node.text(deep=True)
+
+class LxmlNode:
+    __slots__ = ("node", "is_root")
+
+    def __init__(self, node, is_root=False):
+        self.node = node
+        self.is_root = is_root
+
+    def _xpath(self, name, id, class_):
+        # Na raiz o próprio <html> também conta (igual ao BeautifulSoup)
+        path = f"{'descendant-or-self' if self.is_root else 'descendant'}::{name or '*'}"
+        if id: path += f'[@id="{id}"]'
+        if class_: path += f'[contains(concat(" ", normalize-space(@class), " "), " {class_} ")]'
+        return path
+
+    def find(self, name=None, id=None, class_=None):
+        found = self.node.xpath(self._xpath(name, id, class_) + "[1]")
+        return LxmlNode(found[0]) if found else None
+
+    def find_all(self, name=None, id=None, class_=None):
+        return [LxmlNode(n) for n in self.node.xpath(self._xpath(name, id, class_))]
+
+    def find_parent(self, name):
+        for parent in self.node.iterancestors(name):
+            return LxmlNode(parent)
+        return None
+
+    def get(self, attr, default=None):
+        value = self.node.get(attr)
+        if value is None: return default
+        return value.split() if attr == "class" else value
+
+    @property
+    def text(self):
+        return self.node.text_content()
+
+def _lexbor_soup(html):
+    return LexborNode(LexborHTMLParser(html).root)
+
+def _lxml_soup(html):
+    return LxmlNode(lxml_html.document_fromstring(html), is_root=True)
+
+def _bs4_soup(html):
+    return BeautifulSoup(html, 'html.parser')
+
+HTML_BACKENDS = {"bs4": _bs4_soup}
+if LexborHTMLParser: HTML_BACKENDS["selectolax"] = _lexbor_soup
+if lxml_html: HTML_BACKENDS["lxml"] = _lxml_soup
+
+def make_soup(html, backend=None):
+    """
+    Monta a árvore com o backend pedido ('html_backend' nas configurações).
+    'auto' escolhe o mais rápido instalado: selectolax > lxml > bs4.
+    Se o parser em C recusar o documento, cai para o bs4.
+    """
+    backend = backend or global_settings.get("html_backend") or "auto"
+    if backend == "auto":
+        backend = next(b for b in ("selectolax", "lxml", "bs4") if b in HTML_BACKENDS)
+
+    builder = HTML_BACKENDS.get(backend, _bs4_soup)
+    try:
+        return builder(html)
+    except Exception:
+        return _bs4_soup(html)
 
 class GameParser:
-    def __init__(self, html_content):
-        self.soup = BeautifulSoup(html_content, 'html.parser')
+    # Métodos que precisam da árvore HTML. Todos os outros trabalham só
+    # sobre o texto (regex/JSON) e não montam o DOM.
+    DOM_METHODS = frozenset({
+        "get_building_queue_count", "get_village_data",
+        "get_points", "get_incoming_attacks", "get_troop_data", "get_train_form_action"
+    })
+
+    def __init__(self, html_content, scan=None, backend=None, dom=True):
+        """
+        dom=False: a chamada declara que só usa extrações de texto/JSON
+        (ex: coleta, popups de recompensa). Se algum método de DOM_METHODS for
+        usado mesmo assim, o DOM é montado e um aviso é impresso.
+        """
         self.html = html_content
+        # Varredura única já feita pelo GameClient (response.scan), se disponível
+        self.scan = scan
+        self.backend = backend
+        self.dom = dom
+        self._soup = None
+        self._fields = {}
+
+    @property
+    def soup(self):
+        """Árvore HTML montada só no primeiro uso (e reaproveitada depois)."""
+        if self._soup is None:
+            caller = sys._getframe(1).f_code.co_name
+            if caller not in self.DOM_METHODS:
+                print(f"[PARSER] ⚠️ {caller} montou o DOM, mas não está em GameParser.DOM_METHODS")
+            elif not self.dom:
+                print(f"[PARSER] ⚠️ {caller} precisa do DOM, mas o GameParser foi criado com dom=False")
+            self._soup = make_soup(self.html, self.backend)
+        return self._soup
+
+    def fields(self, screen):
+        """Campos da spec da tela (core/page_extract.py): uma busca por campo, com o tempo de cada campo no metrics."""
+        if self.scan is not None:
+            if screen not in self.scan.fields:
+                self.scan.fields[screen] = extract_text(self.html, screen)
+            return self.scan.fields[screen]
+        if screen not in self._fields:
+            self._fields[screen] = extract_text(self.html, screen)
+        return self._fields[screen]
 
     def get_building_queue_count(self, building_name):
         """Conta ordens (Unidade ativa + Fila de espera) baseado no HTML fornecido."""
@@ -37,101 +196,40 @@ class GameParser:
     
     # --- SEGURANÇA E LOGIN ---
     def check_security(self):
-        # 1. Detecção por Classes CSS do Bloqueio (O mais comum hoje)
-        if self.soup.find(class_="bot-protection-row") or "bot-protection-row" in self.html:
-            return 'captcha'
-            
-        if self.soup.find(class_="bot-protection-blur") or "bot-protection-blur" in self.html:
-            return 'captcha'
-
-        # 2. Detecção por Texto Visível (Caso mudem o CSS)
-        if "Proteção contra Bots" in self.html or "Inicia a verificação" in self.html:
-            return 'captcha'
-
-        # 3. Detecção por Atributo no Body (Modo Forçado)
-        # O jogo marca o body com data-bot-protect="forced" quando o captcha está ativo
-        body = self.soup.find("body")
-        if body and body.get("data-bot-protect") == "forced":
-            return 'captcha'
-
-        # 4. Detecção de Recaptcha Genérico ou Antigo (Mantido por segurança)
-        if self.soup.find(id="bot_check") or "g-recaptcha" in self.html or "recaptcha-token" in self.html:
-            return 'captcha'
-
-        # 5. Verificação de Sessão Expirada
-        if "sso/login" in str(self.soup) or self.soup.find("form", id="login_form"):
-            return 'session_expired'
-            
-        return None
+        """
+        'captcha', 'session_expired' ou None. Usa o veredito do GameClient
+        (calculado sobre os bytes de cada resposta) ou o mesmo scanner de
+        marcadores sobre o texto, sem montar o DOM.
+        """
+        if self.scan is not None:
+            return self.scan.security
+        return scan_security(self.html)
 
     # --- BÔNUS DIÁRIO ---
     def check_daily_bonus(self):
-        if "DailyBonus.showDialog" in self.html: return True
-        if "DailyBonus.init" in self.html: return True
-        if "mode=daily_bonus" in self.html: return True
-        return False
+        return self.fields("overview")["daily_bonus"]
 
     def get_daily_bonus_day(self):
-        try:
-            pattern = r'"day"\s*:\s*(\d+)\s*,\s*"is_locked"\s*:\s*false\s*,\s*"is_collected"\s*:\s*false'
-            match = re.search(pattern, self.html)
-            if match: return match.group(1)
-        except: pass
-        return None
+        return self.fields("daily_bonus")["day"]
 
     # --- UTILITÁRIOS JSON ---
     def _extract_json_payload(self, start_marker, source=None):
-        text_to_search = source if source else self.html
-        start_idx = text_to_search.find(start_marker)
-        if start_idx == -1: return None
-        
-        subset = text_to_search[start_idx:]
-        match = re.search(r'[\[\{]', subset)
-        if not match: return None
-        
-        json_start = start_idx + match.start()
-        opening_char = text_to_search[json_start]
-        closing_char = '}' if opening_char == '{' else ']'
-        
-        brace_count = 0
-        json_str = ""
-        started = False
-        
-        for i in range(json_start, len(text_to_search)):
-            char = text_to_search[i]
-            if char == opening_char:
-                brace_count += 1
-                started = True
-            elif char == closing_char:
-                brace_count -= 1
-            
-            json_str += char
-            
-            if started and brace_count == 0:
-                break
-        
-        try: 
-            return json.loads(json_str)
-        except: 
-            return None
+        # Passada linear com raw_decode (core/page_scan.py), ciente de strings JSON
+        return extract_json(source if source else self.html, start_marker)
 
     # --- DADOS PRINCIPAIS DO JOGO ---
     def get_game_data_from_json(self):
-        data = {
-            'wood': 0, 'stone': 0, 'iron': 0, 'storage': 0, 
-            'pop_current': 0, 'pop_max': 0, 'village_id': None,
-            'buildings': {}
-        }
-        
-        game_data = None
+        # 1. Varredura única do GameClient (já decodificada)
+        game_data = self.scan.game_data if self.scan is not None else None
 
-        try:
-            full_json = json.loads(self.html)
-            if 'game_data' in full_json:
-                game_data = full_json['game_data']
-            elif 'response' in full_json and 'game_data' in full_json['response']:
-                game_data = full_json['response']['game_data']
-        except: pass
+        if not game_data:
+            try:
+                full_json = json.loads(self.html)
+                if 'game_data' in full_json:
+                    game_data = full_json['game_data']
+                elif 'response' in full_json and 'game_data' in full_json['response']:
+                    game_data = full_json['response']['game_data']
+            except: pass
 
         if not game_data:
             game_data = self._extract_json_payload('TribalWars.updateGameData')
@@ -145,22 +243,7 @@ class GameParser:
 
         if game_data:
             try:
-                village = game_data.get('village', game_data) 
-                
-                data['wood'] = int(float(village.get('wood', 0)))
-                data['stone'] = int(float(village.get('stone', 0)))
-                data['iron'] = int(float(village.get('iron', 0)))
-                data['storage'] = int(float(village.get('storage_max', 0)))
-                data['pop_current'] = int(float(village.get('pop', 0)))
-                data['pop_max'] = int(float(village.get('pop_max', 0)))
-                data['village_id'] = int(village.get('id', 0))
-                
-                raw_buildings = village.get('buildings', {})
-                for b_name, b_level in raw_buildings.items():
-                    try: data['buildings'][b_name] = int(b_level)
-                    except: data['buildings'][b_name] = 0
-                
-                return data
+                return flatten_game_data(game_data)
             except Exception as e:
                 print(f"Erro parser game_data: {e}")
                 pass
@@ -205,27 +288,13 @@ class GameParser:
     # --- MISSÕES PRINCIPAIS (Quests) ---
     def get_quests(self):
         """
-        Retorna IDs das missões principais prontas para completar.
-        Usa Regex para ser mais robusto na extração do JSON de Quests.setQuestData.
+        Retorna IDs das missões principais prontas para completar
+        (JSON de Quests.setQuestData, lido pela spec do overview).
         """
         completable_quests = []
-        quests_data = None
+        quests_data = self.fields("overview")["quests"]
 
-        # 1. Tenta extrair usando Regex (Mais seguro)
-        try:
-            # Procura por Quests.setQuestData({...});
-            pattern = r'Quests\.setQuestData\s*\(\s*(\{.*?\})\s*\);'
-            match = re.search(pattern, self.html, re.DOTALL)
-            if match:
-                quests_data = json.loads(match.group(1))
-        except: 
-            pass
-
-        # 2. Fallback: Extrator antigo
-        if not quests_data:
-            quests_data = self._extract_json_payload('Quests.setQuestData')
-
-        if quests_data:
+        if isinstance(quests_data, dict):
             for qid, qdata in quests_data.items():
                 if isinstance(qdata, dict):
                     # Critérios para Missão Completa
@@ -242,7 +311,7 @@ class GameParser:
                     if is_finished and not is_closed:
                         completable_quests.append(str(qid))
         
-        return list(set(completable_quests))
+        return list(dict.fromkeys(completable_quests))
 
     # --- RECOMPENSAS (RewardSystem) ---
     def get_new_quest_rewards(self):
@@ -355,8 +424,9 @@ class GameParser:
     # --- COLETA (SCAVENGER) ---
     def get_scavenge_data(self):
         try:
-            village_data = self._extract_json_payload('var village =')
-            global_options = self._extract_json_payload('new ScavengeScreen(')
+            place = self.fields("place")
+            village_data = place["village"]
+            global_options = place["options"]
 
             if not village_data or not global_options:
                 return None
@@ -0,0 +1,174 @@
+# ARQUIVO: core/metrics.py
+import os
+import json
+import time
+import threading
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+from core.security import get_app_path
+
+# Limites (segundos) dos baldes do histograma de latência
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+# Quantas amostras recentes guardar por chave (para os percentis)
+SAMPLE_WINDOW = 512
+
+METRICS_FILE = os.path.join(get_app_path(), "metrics.json")
+
+def endpoint_key(url):
+    """
+    Converte a URL em chave de tela: 'overview', 'main/upgrade_building',
+    'scavenge_api/send_squads', 'place/scavenge', 'lobby'...
+    """
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    screen = query.get('screen', [None])[0]
+    if not screen:
+        if "/play/" in parts.path: return "reenter"
+        if parts.path.endswith("game.php"): return "game"
+        return "lobby"
+
+    action = None
+    for k in ('ajaxaction', 'ajax', 'action', 'mode'):
+        if k in query:
+            action = query[k][0]
+            break
+    return f"{screen}/{action}" if action else screen
+
+class RequestStats:
+    """Contadores de uma chave (tela ou proxy)."""
+    __slots__ = ("count", "errors", "bytes", "redirects", "reentries", "csrf_refreshes",
+                 "cache_hits", "cache_misses", "ajax_error", "ajax_unknown", "ajax_failed",
+                 "status", "buckets", "samples", "last_at")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.redirects = 0
+        self.reentries = 0
+        self.csrf_refreshes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.ajax_error = 0     # AJAX recusado pelo jogo (core/ajax_client.py)
+        self.ajax_unknown = 0   # AJAX com HTTP 200 sem JSON
+        self.ajax_failed = 0    # AJAX sem resposta / HTTP de erro
+        self.status = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+        self.last_at = None
+
+    def add(self, latency, size, status, redirected):
+        self.count += 1
+        self.bytes += size
+        self.last_at = time.time()
+        if redirected: self.redirects += 1
+        if status is not None:
+            self.status[str(status)] = self.status.get(str(status), 0) + 1
+        self.samples.append(latency)
+
+        idx = len(LATENCY_BUCKETS)
+        for i, limit in enumerate(LATENCY_BUCKETS):
+            if latency <= limit:
+                idx = i
+                break
+        self.buckets[idx] += 1
+
+    def percentile(self, pct):
+        if not self.samples: return None
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return round(ordered[idx], 3)
+
+    def to_dict(self):
+        labels = [f"<={b}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "bytes_total": self.bytes,
+            "bytes_avg": int(self.bytes / self.count) if self.count else 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "histogram": dict(zip(labels, self.buckets)),
+            "status": dict(self.status),
+            "redirects": self.redirects,
+            "reentries": self.reentries,
+            "csrf_refreshes": self.csrf_refreshes,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "ajax_error": self.ajax_error,
+            "ajax_unknown": self.ajax_unknown,
+            "ajax_failed": self.ajax_failed,
+            "last_at": self.last_at
+        }
+
+class MetricsRegistry:
+    """
+    Telemetria em memória das requisições do GameClient,
+    agregada por tela/ajaxaction e por proxy.
+    """
+    def __init__(self):
+        self._screens = {}
+        self._proxies = {}
+        self._fields = {}   # tela -> campo -> [extrações, segundos] (core/page_extract.py)
+        self._lock = threading.Lock()
+
+    def _stats(self, table, key):
+        stats = table.get(key)
+        if not stats:
+            stats = table[key] = RequestStats()
+        return stats
+
+    def record(self, url, proxy, latency, size=0, status=None, redirected=False, error=False):
+        key = endpoint_key(url)
+        with self._lock:
+            for stats in (self._stats(self._screens, key), self._stats(self._proxies, proxy)):
+                if error:
+                    stats.errors += 1
+                else:
+                    stats.add(latency, size, status, redirected)
+
+    def incr(self, screen, proxy, counter):
+        """Contadores avulsos: 'reentries', 'csrf_refreshes', 'cache_hits', 'cache_misses', 'ajax_*'."""
+        with self._lock:
+            for stats in (self._stats(self._screens, screen), self._stats(self._proxies, proxy)):
+                setattr(stats, counter, getattr(stats, counter) + 1)
+
+    def record_fields(self, screen, timings):
+        """Tempo gasto por campo numa extração das specs de tela."""
+        with self._lock:
+            table = self._fields.setdefault(screen, {})
+            for name, secs in timings.items():
+                entry = table.setdefault(name, [0, 0.0])
+                entry[0] += 1
+                entry[1] += secs
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "generated_at": time.time(),
+                "screens": {k: v.to_dict() for k, v in self._screens.items()},
+                "proxies": {k: v.to_dict() for k, v in self._proxies.items()},
+                "fields": {
+                    screen: {name: {"count": n, "ms_total": round(secs * 1000, 3), "ms_avg": round(secs * 1000 / n, 3)}
+                             for name, (n, secs) in table.items()}
+                    for screen, table in self._fields.items()
+                }
+            }
+
+    def dump_json(self, path=None):
+        """Salva o snapshot em JSON (padrão: metrics.json na pasta do app)."""
+        path = path or METRICS_FILE
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=4)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._screens.clear()
+            self._proxies.clear()
+            self._fields.clear()
+
+# Instância global
+metrics = MetricsRegistry()
@@ -0,0 +1,36 @@
+# ARQUIVO: core/module_due.py
+import time
+from core.settings_manager import global_settings
+
+# Próxima execução útil de cada módulo do ciclo, guardada na conta
+# (acc['module_due'] = {"build": [epoch, motivo], ...}). Depois de rodar, o
+# módulo deixa em mgr.wake_at quando vale a pena voltar (coleta retorna, fila
+# de construção libera, recursos chegam, nada mais a fazer); até lá o
+# BotController nem abre a tela dele. Sem wake_at, o módulo roda no próximo ciclo.
+
+def pending(acc, key, now=None):
+    """(epoch, motivo) se o módulo ainda não venceu; None se deve rodar."""
+    due = (acc.get('module_due') or {}).get(key)
+    if due and due[0] > (now or time.time()):
+        return tuple(due)
+    return None
+
+def record(acc, key, wake_at):
+    """Guarda o wake_at que o módulo deixou ao terminar (None = roda no próximo ciclo)."""
+    due = acc.setdefault('module_due', {})
+    if wake_at: due[key] = [wake_at[0], wake_at[1]]
+    else: due.pop(key, None)
+
+def wake_hints(acc, now=None):
+    """Horários ainda no futuro de todos os módulos (inclusive os pulados neste ciclo)."""
+    now = now or time.time()
+    return [tuple(d) for d in (acc.get('module_due') or {}).values() if d[0] > now]
+
+def reset(acc):
+    """Esquece os horários (conta reiniciada: todos os módulos conferem a tela)."""
+    acc.pop('module_due', None)
+
+def idle_until(reason, now=None):
+    """wake_at de um módulo sem nada a fazer: confere de novo após 'module_idle_recheck'."""
+    recheck = global_settings.get("module_idle_recheck")
+    return ((now or time.time()) + recheck, reason) if recheck else None
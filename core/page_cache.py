@@ -0,0 +1,86 @@
+# ARQUIVO: core/page_cache.py
+import time
+import threading
+from urllib.parse import urlsplit, parse_qs
+from core.settings_manager import global_settings
+from core.metrics import metrics
+
+# Parâmetros que indicam ação (mudam estado no servidor): nunca cacheados
+ACTION_PARAMS = ('action', 'ajaxaction')
+
+# Ações que só afetam a própria tela. Qualquer outra ação (construir, recrutar,
+# coletar, pesquisar, recompensas...) mexe em recursos/população, que aparecem
+# no game_data de TODAS as telas, então limpa o cache inteiro da conta.
+RELATED_SCREENS = {
+    "buddies": ("buddies",),
+}
+
+def cache_key(screen, params=None):
+    """Chave (tela, aldeia, demais parâmetros ordenados)."""
+    params = dict(params or {})
+    village = params.pop('village', None)
+    return (screen, str(village) if village is not None else None, tuple(sorted((k, str(v)) for k, v in params.items())))
+
+def is_action(params):
+    return bool(params) and any(k in params for k in ACTION_PARAMS)
+
+class PageCache:
+    """
+    Cache curto (por ciclo) das respostas GET de um GameClient.
+    Evita baixar de novo a mesma tela dentro do TTL (ex: overview do
+    ensure_connection reaproveitado pelo worker) e é invalidado por
+    qualquer POST/ação na tela relacionada.
+    """
+    def __init__(self, proxy_label="direct"):
+        self.proxy_label = proxy_label
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, screen, params=None):
+        ttl = global_settings.get("page_cache_ttl")
+        if not ttl or is_action(params):
+            return None
+
+        key = cache_key(screen, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[0] <= ttl:
+                metrics.incr(screen, self.proxy_label, "cache_hits")
+                return entry[1]
+            self._entries.pop(key, None)
+
+        metrics.incr(screen, self.proxy_label, "cache_misses")
+        return None
+
+    def put(self, screen, params, response):
+        if is_action(params) or response is None:
+            return
+        now = time.time()
+        ttl = global_settings.get("page_cache_ttl")
+        with self._lock:
+            # Não segura páginas vencidas na memória
+            for key, entry in list(self._entries.items()):
+                if now - entry[0] > ttl:
+                    del self._entries[key]
+            self._entries[cache_key(screen, params)] = (now, response)
+
+    def invalidate(self, screen=None):
+        """Remove as telas afetadas por uma ação em 'screen' (None = tudo)."""
+        related = RELATED_SCREENS.get(screen)
+        with self._lock:
+            if not related:
+                self._entries.clear()
+                return
+            for key in list(self._entries.keys()):
+                if key[0] in related:
+                    del self._entries[key]
+
+    def invalidate_url(self, method, url):
+        """Chamado pelo GameClient a cada requisição: POST ou ação na URL invalidam."""
+        query = parse_qs(urlsplit(url).query)
+        if method == "post" or is_action(query):
+            self.invalidate(query.get('screen', [None])[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
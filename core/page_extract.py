@@ -0,0 +1,172 @@
+# ARQUIVO: core/page_extract.py
+import re
+import time
+from dataclasses import dataclass, field
+from core.page_scan import scan_of, js_source_at, _decoder, _OPENING
+from core.metrics import metrics
+
+# Extração declarativa por tela. Cada tela lista os campos que o bot lê dela
+# (JSON atribuído em JS, JSON depois de um marcador, regex, marcador simples
+# ou trecho com contagens). As expressões são compiladas uma vez, o resultado
+# fica memorizado na resposta (todos os consumidores da tela leem a mesma
+# extração) e o tempo de cada campo vai para o metrics.
+#
+# Cada campo localiza sua âncora com a busca mais barata do CPython: regex com
+# prefixo literal (busca rápida do sre) ou str.find. Juntar todas as âncoras
+# numa alternância única sai MAIS caro aqui: o sre perde a busca pelo prefixo
+# e testa a expressão em cada posição (~1,5-9 ms contra ~0,15 ms em 185 KB).
+
+@dataclass(slots=True)
+class FieldSpec:
+    name: str
+    kind: str           # 'json_var' | 'json_after' | 'js_var' | 'regex' | 'flag' | 'section'
+    anchor: str = ""    # expressão que localiza o campo (começa por um literal)
+    literals: tuple = ()  # flag: marcadores procurados com 'in'
+    many: bool = False  # regex: todas as ocorrências (senão só a primeira)
+    end: str = ""       # section: onde o trecho termina
+    counts: dict = field(default_factory=dict)  # section: nome -> literais contados no trecho
+    rows: str = ""      # section: regex cujas ocorrências no trecho são devolvidas
+
+def json_var(name, var):
+    """JSON atribuído em JS: 'BuildingSmith.techs = {...};'."""
+    return FieldSpec(name, "json_var", rf"{re.escape(var)}\s*=\s*(?=[\[\{{])")
+
+def json_after(name, marker):
+    """Primeiro objeto/array JSON depois do marcador: 'new ScavengeScreen({...'."""
+    return FieldSpec(name, "json_after", re.escape(marker))
+
+def js_var(name, var):
+    """Objeto JS atribuído: dict se for JSON válido, senão o trecho '{...}' (chaves sem aspas)."""
+    return FieldSpec(name, "js_var", rf"{re.escape(var)}\s*=\s*(?=\{{)")
+
+def regex(name, pattern, many=False):
+    """Grupos da regex (valor único se houver um grupo, True se nenhum)."""
+    return FieldSpec(name, "regex", pattern, many=many)
+
+def flag(name, *literals):
+    """True se qualquer um dos literais aparecer."""
+    return FieldSpec(name, "flag", literals=literals)
+
+def section(name, start, end, counts=None, rows=""):
+    """
+    Trecho de 'start' até 'end'. Se 'start' tiver um grupo, o valor é um dict
+    chave -> resultado (primeira ocorrência de cada chave); senão, só a primeira.
+    """
+    return FieldSpec(name, "section", start, end=end, counts=counts or {}, rows=rows)
+
+class ScreenSpec:
+    """Campos de uma tela, com as expressões já compiladas."""
+    def __init__(self, screen, fields):
+        self.screen = screen
+        self.fields = fields
+        self._anchors = {f.name: re.compile(f.anchor) for f in fields if f.anchor}
+        self._rows = {f.name: re.compile(f.rows, re.DOTALL) for f in fields if f.rows}
+
+    def run(self, text):
+        """Lê todos os campos. Devolve (valores, segundos por campo)."""
+        values = {}
+        timings = {}
+        for spec in self.fields:
+            t0 = time.perf_counter()
+            values[spec.name] = self._take(spec, text)
+            timings[spec.name] = time.perf_counter() - t0
+        return values, timings
+
+    def _take(self, spec, text):
+        kind = spec.kind
+        if kind == "flag":
+            return any(l in text for l in spec.literals)
+
+        anchor = self._anchors[spec.name]
+        if kind == "regex":
+            if spec.many: return [_groups(m) for m in anchor.finditer(text)]
+            m = anchor.search(text)
+            return _groups(m) if m else None
+
+        if kind == "section":
+            if not anchor.groups:
+                m = anchor.search(text)
+                return self._section(spec, text, m) if m else None
+            found = {}
+            for m in anchor.finditer(text):
+                if m.group(1) not in found:
+                    block = self._section(spec, text, m)
+                    if block is not None: found[m.group(1)] = block
+            return found
+
+        m = anchor.search(text)
+        if not m: return None
+        if kind == "json_after":
+            opening = _OPENING.search(text, m.end())
+            return _decode(text, opening.start()) if opening else None
+        decoded = _decode(text, m.end())
+        if kind == "js_var" and decoded is None:
+            return js_source_at(text, m.end())
+        return decoded
+
+    def _section(self, spec, text, m):
+        end_idx = text.find(spec.end, m.end())
+        if end_idx == -1: return None
+        block = text[m.end():end_idx]
+        result = {name: sum(block.count(l) for l in literals) for name, literals in spec.counts.items()}
+        if spec.name in self._rows:
+            result["rows"] = self._rows[spec.name].findall(block)
+        return result
+
+def _decode(text, idx):
+    try:
+        return _decoder.raw_decode(text, idx)[0]
+    except ValueError:
+        return None
+
+def _groups(m):
+    if not m.re.groups: return True
+    return m.group(1) if m.re.groups == 1 else m.groups()
+
+# --- SPECS DAS TELAS ---
+
+SCREENS = {
+    "overview": ScreenSpec("overview", [
+        json_after("quests", "Quests.setQuestData"),
+        flag("daily_bonus", "DailyBonus.showDialog", "DailyBonus.init", "mode=daily_bonus"),
+    ]),
+    "daily_bonus": ScreenSpec("daily_bonus", [
+        regex("day", r'"day"\s*:\s*(\d+)\s*,\s*"is_locked"\s*:\s*false\s*,\s*"is_collected"\s*:\s*false'),
+    ]),
+    "main": ScreenSpec("main", [
+        json_var("buildings", "BuildingMain.buildings"),
+        flag("premium", '"Premium":{"possible":true,"active":true}'),
+        section("build_ends", r'id="build_queue"', "</table>", rows=r'data-endtime="(\d+)"'),
+    ]),
+    "train": ScreenSpec("train", [
+        js_var("units", "unit_managers.units"),
+        regex("troops", r'id="(\w+)_0_a"[^>]*>\((\d+)\)<', many=True),
+        section("queues", r'id="trainqueue_wrap_(\w+)"', "</table>", counts={
+            "orders": ('id="trainorder_',),
+            "active": ('class="lit"', "class='lit'"),
+        }),
+    ]),
+    "smith": ScreenSpec("smith", [
+        json_var("techs", "BuildingSmith.techs"),
+    ]),
+    "place": ScreenSpec("place", [
+        json_after("village", "var village ="),
+        json_after("options", "new ScavengeScreen("),
+    ]),
+    "buddies": ScreenSpec("buddies", [
+        section("invites", r"Convites em aberto", "</table>", rows=r"<tr[^>]*>(.*?)</tr>"),
+    ]),
+}
+
+def extract_text(text, screen):
+    """Campos da tela 'screen' lidos do texto (tempos por campo vão para o metrics)."""
+    values, timings = SCREENS[screen].run(text or "")
+    metrics.record_fields(screen, timings)
+    return values
+
+def fields_of(response, screen):
+    """Como extract_text, mas memorizado na resposta (response.scan.fields)."""
+    scan = scan_of(response)
+    if screen not in scan.fields:
+        scan.fields[screen] = extract_text(response.text, screen)
+    return scan.fields[screen]
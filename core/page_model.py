@@ -0,0 +1,263 @@
+# ARQUIVO: core/page_model.py
+import re
+import time
+from dataclasses import dataclass, field, replace
+from core.page_scan import scan_of
+from core.page_extract import fields_of
+from core.metrics import endpoint_key
+
+# Modelo tipado das telas do jogo, montado UMA vez por resposta (memorizado em
+# response.scan.models) e repassado aos managers no lugar do dicionário game_data.
+# Cada objeto guarda de qual resposta veio ('source' = tela/ação) e quando ('at').
+
+# game_data['village'] -> campo do VillageState (valores parciais das respostas AJAX)
+_VILLAGE_KEYS = (('id', 'village_id'), ('wood', 'wood'), ('stone', 'stone'), ('iron', 'iron'),
+                 ('storage_max', 'storage'), ('pop', 'pop_current'), ('pop_max', 'pop_max'))
+
+@dataclass(slots=True)
+class VillageState:
+    """Recursos, população e edifícios da aldeia (TribalWars.updateGameData)."""
+    village_id: int = 0
+    wood: int = 0
+    stone: int = 0
+    iron: int = 0
+    storage: int = 0
+    pop_current: int = 0
+    pop_max: int = 0
+    buildings: dict = field(default_factory=dict)
+    wood_prod: float = 0.0       # produção por segundo
+    stone_prod: float = 0.0
+    iron_prod: float = 0.0
+    points: int | None = None    # game_data['player'] (None = ainda não lido)
+    incomings: int | None = None
+    source: str = ""
+    at: float = 0.0
+
+    @classmethod
+    def from_flat(cls, data, source, at=None):
+        """A partir do dicionário plano (flatten_game_data / GameParser)."""
+        return cls(
+            village_id=data.get('village_id', 0),
+            wood=data.get('wood', 0), stone=data.get('stone', 0), iron=data.get('iron', 0),
+            storage=data.get('storage', 0),
+            pop_current=data.get('pop_current', 0), pop_max=data.get('pop_max', 0),
+            buildings=data.get('buildings', {}),
+            wood_prod=data.get('wood_prod', 0.0), stone_prod=data.get('stone_prod', 0.0),
+            iron_prod=data.get('iron_prod', 0.0),
+            source=source, at=at or time.time()
+        )
+
+    def copy(self):
+        """Cópia para o ciclo (a original fica memorizada na resposta)."""
+        return replace(self)
+
+    def refresh(self, newer):
+        """Adota os valores de uma leitura mais recente (ex: a tela do manager)."""
+        if newer is None or newer.at < self.at: return
+        self.wood, self.stone, self.iron = newer.wood, newer.stone, newer.iron
+        self.storage, self.pop_current, self.pop_max = newer.storage, newer.pop_current, newer.pop_max
+        if newer.buildings: self.buildings = newer.buildings
+        if newer.wood_prod or newer.stone_prod or newer.iron_prod:
+            self.wood_prod, self.stone_prod, self.iron_prod = newer.wood_prod, newer.stone_prod, newer.iron_prod
+        self.source, self.at = newer.source, newer.at
+
+    def merge(self, game_data, source, at):
+        """
+        Aplica um game_data completo ou parcial (ex: resposta AJAX de
+        upgrade_building/send_squads): só as chaves presentes mudam.
+        Ignora leituras mais velhas que o estado. Retorna True se aplicou.
+        """
+        if at < self.at: return False
+        village = game_data.get('village', game_data)
+        if not isinstance(village, dict): return False
+
+        for key, attr in _VILLAGE_KEYS:
+            if village.get(key) is not None:
+                try: setattr(self, attr, int(float(village[key])))
+                except (TypeError, ValueError): pass
+        if isinstance(village.get('buildings'), dict):
+            self.buildings = {b: int(l) if str(l).isdigit() else 0 for b, l in village['buildings'].items()}
+        for key in ('wood_prod', 'stone_prod', 'iron_prod'):
+            if village.get(key) is not None:
+                try: setattr(self, key, float(village[key]))
+                except (TypeError, ValueError): pass
+
+        player = game_data.get('player')
+        if isinstance(player, dict):
+            for key in ('points', 'incomings'):
+                if player.get(key) is not None:
+                    try: setattr(self, key, int(float(player[key])))
+                    except (TypeError, ValueError): pass
+
+        self.source, self.at = source, at
+        return True
+
+    def can_afford(self, cost):
+        return self.wood >= cost['wood'] and self.stone >= cost['stone'] and self.iron >= cost['iron']
+
+    def spend(self, cost, reason):
+        """Desconta localmente o que acabou de ser gasto (até a próxima leitura)."""
+        self.wood -= cost.get('wood', 0)
+        self.stone -= cost.get('stone', 0)
+        self.iron -= cost.get('iron', 0)
+        self.source, self.at = reason, time.time()
+
+    def resources(self):
+        return {'wood': self.wood, 'stone': self.stone, 'iron': self.iron}
+
+    def affordable_at(self, cost):
+        """
+        Horário (epoch) em que a produção cobre 'cost', contando a partir da
+        leitura ('at'). None se já dá para pagar, se o custo passa do armazém
+        ou se a aldeia não produz o recurso que falta.
+        """
+        wait = 0.0
+        for res in ('wood', 'stone', 'iron'):
+            amount = int(cost.get(res, 0) or 0)
+            missing = amount - getattr(self, res)
+            if missing <= 0: continue
+            prod = getattr(self, f'{res}_prod')
+            if prod <= 0 or amount > self.storage: return None
+            wait = max(wait, missing / prod)
+        return self.at + wait if wait else None
+
+@dataclass(slots=True)
+class BuildQueue:
+    """Tela main: fila de construção e dados de cada edifício (BuildingMain.buildings)."""
+    order_count: int = 0
+    premium: bool = False
+    buildings: dict = field(default_factory=dict)
+    finish_times: list = field(default_factory=list)  # fim de cada ordem da fila (epoch)
+    source: str = ""
+    at: float = 0.0
+
+    @property
+    def max_queue(self):
+        return 5 if self.premium else 2
+
+@dataclass(slots=True)
+class UnitCatalog:
+    """Tela train: custos das unidades liberadas, tropas atuais e filas por edifício."""
+    costs: dict = field(default_factory=dict)
+    troops: dict = field(default_factory=dict)
+    queues: dict = field(default_factory=dict)
+    source: str = ""
+    at: float = 0.0
+
+@dataclass(slots=True)
+class ScavengeState:
+    """Tela place&mode=scavenge: níveis de coleta e tropas em casa."""
+    levels: dict = field(default_factory=dict)
+    home_units: dict = field(default_factory=dict)
+    has_rally_point: bool = False
+    source: str = ""
+    at: float = 0.0
+
+# --- CONSTRUÇÃO (memorizada por resposta) ---
+
+def _memo(response, kind, build):
+    scan = scan_of(response)
+    if kind not in scan.models:
+        scan.models[kind] = build(scan, response.text, endpoint_key(response.url), scan.at)
+    return scan.models[kind]
+
+def village_state(response):
+    """VillageState da resposta, ou None se ela não trouxer game_data."""
+    def build(scan, html, source, at):
+        return VillageState.from_flat(scan.village(), source, at) if scan.game_data else None
+    return _memo(response, "village", build)
+
+def current_village(response, parser):
+    """
+    VillageState do ciclo a partir do overview (cópia própria, pode ser alterada).
+    Sem game_data na resposta, cai na leitura do HTML pelo GameParser.
+    """
+    state = village_state(response)
+    if state is None:
+        data = parser.get_game_data_from_json()
+        if not data: return None
+        return VillageState.from_flat(data, endpoint_key(response.url), scan_of(response).at)
+    return state.copy()
+
+def build_queue(response):
+    def build(scan, html, source, at):
+        fields = fields_of(response, "main")
+        buildings = fields["buildings"]
+        ends = fields["build_ends"]
+        return BuildQueue(
+            order_count=scan.order_count or 0,
+            premium=fields["premium"],
+            buildings=buildings if isinstance(buildings, dict) else {},
+            finish_times=sorted(int(t) for t in ends["rows"]) if ends else [],
+            source=source, at=at
+        )
+    return _memo(response, "build_queue", build)
+
+def unit_catalog(response):
+    """UnitCatalog da tela train, ou None se os custos não puderem ser lidos."""
+    def build(scan, html, source, at):
+        fields = fields_of(response, "train")
+        costs = _unit_costs(fields["units"])
+        if not costs: return None
+        return UnitCatalog(costs=costs, troops=_current_troops(fields["troops"]),
+                           queues=_queue_counts(fields["queues"]), source=source, at=at)
+    return _memo(response, "unit_catalog", build)
+
+def scavenge_state(response):
+    """ScavengeState da tela de coleta, ou None se o mundo/tela não tiver coleta."""
+    def build(scan, html, source, at):
+        from core.game_parser import GameParser
+        data = GameParser(html, scan=scan, dom=False).get_scavenge_data()
+        if not data: return None
+        return ScavengeState(levels=data['levels'], home_units=data['home_units'],
+                             has_rally_point=data['has_rally_point'], source=source, at=at)
+    return _memo(response, "scavenge", build)
+
+# --- CAMPOS DA TELA TRAIN (spec "train" de core/page_extract.py) ---
+
+# Propriedades de cada unidade no objeto JS (chaves sem aspas)
+_UNIT_BLOCK = re.compile(r'(?P<unit>\w+):\s*\{(.*?)\}', re.DOTALL)
+_UNIT_PROP = re.compile(r'(\w+):\s*(\d+|true|false)')
+
+def _unit_costs(units):
+    """Custos das unidades PESQUISADAS/DISPONÍVEIS (units: dict JSON ou trecho JS)."""
+    if not units:
+        return None
+
+    costs = {}
+
+    # Se o jogo entregar JSON puro, lê direto
+    if isinstance(units, dict):
+        for u_name, props in units.items():
+            if not isinstance(props, dict) or props.get('requirements_met') is False:
+                continue
+            costs[u_name] = {p: int(props.get(p) or 0) for p in ('wood', 'stone', 'iron', 'pop')}
+        return costs
+
+    for match in _UNIT_BLOCK.finditer(units):
+        props = dict(_UNIT_PROP.findall(match.group(2)))
+
+        # Se não estiver pesquisada ou faltar edifício, ignora essa unidade
+        if props.get('requirements_met') == 'false':
+            continue
+
+        costs[match.group('unit')] = {
+            p: int(props[p]) if props.get(p, '').isdigit() else 0
+            for p in ('wood', 'stone', 'iron', 'pop')
+        }
+
+    return costs
+
+def _current_troops(troops):
+    """Quantidade atual de tropas (links 'set_max': <a id="spear_0_a" ...>(123)</a>)."""
+    return {unit: int(amount) for unit, amount in troops}
+
+def _queue_counts(queues):
+    """Ordens TOTAIS (Ativa + Fila de Espera) para cada edifício."""
+    counts = {'barracks': 0, 'stable': 0, 'garage': 0}
+    for building in counts:
+        block = queues.get(building)
+        if block:
+            # Ordens em ESPERA (IDs trainorder_X) + ordem ATIVA (<tr class="lit">)
+            counts[building] = block['orders'] + (1 if block['active'] else 0)
+    return counts
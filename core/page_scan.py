@@ -0,0 +1,244 @@
+# ARQUIVO: core/page_scan.py
+import re
+import json
+import time
+
+# Marcadores lidos de toda resposta. Cada um começa por um literal, o que deixa
+# o sre usar a busca rápida pelo prefixo; uma alternância única com todos eles
+# perde essa busca e testa a expressão em cada posição (~18 ms num overview de
+# 185 KB contra ~0,1 ms assim, medido com tools/parser_bench.py).
+_CSRF_META = re.compile(r'name="csrf-token" content="([a-f0-9]+)"')
+_CSRF_JS = re.compile(r'csrf_token\s*=\s*[\'"]([a-f0-9]+)[\'"]')
+_CSRF_JSON = re.compile(r'"csrf":"([^"]*)"')
+_GAME_DATA = re.compile(r'TribalWars\.updateGameData\s*\(')
+_ORDER_COUNT = re.compile(r'BuildingMain\.order_count\s*=\s*(\d+);')
+
+# Sinais de segurança: (âncora, marcadores completos que contêm a âncora, veredito).
+# Marcadores com um pedaço em comum dividem a mesma busca; captcha vem antes
+# de sessão expirada (se os dois aparecerem, vale o captcha).
+SECURITY_MARKERS = (
+    ("bot-protect", ("bot-protection-row", "bot-protection-blur", 'data-bot-protect="forced"'), "captcha"),
+    ("recaptcha", ("g-recaptcha", "recaptcha-token"), "captcha"),
+    ('id="bot_check"', ('id="bot_check"',), "captcha"),
+    ("Proteção contra Bots", ("Proteção contra Bots",), "captcha"),
+    ("Inicia a verificação", ("Inicia a verificação",), "captcha"),
+    ("sso/login", ("sso/login",), "session_expired"),
+    ('id="login_form"', ('id="login_form"',), "session_expired"),
+)
+
+def _compile_security(encode):
+    return tuple(
+        (encode(anchor), tuple((encode(m), encode(m).find(encode(anchor))) for m in markers), verdict)
+        for anchor, markers, verdict in SECURITY_MARKERS
+    )
+
+_SECURITY_BYTES = _compile_security(lambda s: s.encode("utf-8"))
+_SECURITY_TEXT = _compile_security(lambda s: s)
+
+def scan_security(content):
+    """
+    'captcha', 'session_expired' ou None. Aceita os bytes crus da resposta
+    (sem decodificar) ou o texto; para no primeiro marcador confirmado.
+    """
+    if not content:
+        return None
+    table = _SECURITY_BYTES if isinstance(content, (bytes, bytearray)) else _SECURITY_TEXT
+    for anchor, markers, verdict in table:
+        pos = content.find(anchor)
+        while pos != -1:
+            for marker, offset in markers:
+                if content.startswith(marker, pos - offset):
+                    return verdict
+            pos = content.find(anchor, pos + 1)
+    return None
+
+# Blocos do cabeçalho de toda tela (início, fim), em bytes. Bastam para CSRF,
+# game_data, pontos e ataques chegando: o GET com head_only para de ler a
+# página quando todos chegaram completos (o resto são ~200 KB de HTML).
+HEADER_BLOCKS = (
+    (b"csrf_token", b";"),
+    (b"TribalWars.updateGameData(", b");"),
+    (b'id="rank_points"', b"</span>"),
+    (b'id="incomings_amount"', b"</span>"),
+)
+
+class HeaderWatch:
+    """Acumula os pedaços de um corpo em streaming até os blocos do cabeçalho chegarem."""
+    __slots__ = ("buffer", "pending")
+
+    def __init__(self, blocks=HEADER_BLOCKS):
+        self.buffer = bytearray()
+        self.pending = blocks
+
+    def feed(self, chunk):
+        """Adiciona um pedaço. True quando todos os blocos já estão completos."""
+        self.buffer += chunk
+        self.pending = tuple(b for b in self.pending if not _block_complete(self.buffer, *b))
+        return not self.pending
+
+def _block_complete(buffer, start, end):
+    pos = buffer.find(start)
+    return pos != -1 and buffer.find(end, pos + len(start)) != -1
+
+_decoder = json.JSONDecoder()
+_OPENING = re.compile(r'[\[\{]')
+# Chaves e strings (aspas simples ou duplas) de um literal JS
+_JS_TOKENS = re.compile(r'[{}]|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+
+class PageScan:
+    """Resultado da varredura única de uma resposta (anexado em response.scan)."""
+    __slots__ = ("csrf", "game_data", "order_count", "security", "json", "models", "fields", "at")
+
+    def __init__(self):
+        self.csrf = None
+        self.game_data = None   # dict bruto de TribalWars.updateGameData / "game_data"
+        self.order_count = None # BuildingMain.order_count
+        self.security = None    # None | 'captcha' | 'session_expired'
+        self.json = None        # corpo decodificado, se a resposta for JSON
+        self.models = {}        # modelos tipados já montados (core/page_model.py)
+        self.fields = {}        # campos das specs de tela, por tela (core/page_extract.py)
+        self.at = time.time()   # quando a resposta foi lida
+
+    def village(self):
+        """Valores da aldeia no formato usado pelos managers (ou {} se não houver game_data)."""
+        return flatten_game_data(self.game_data) if self.game_data else {}
+
+def scan_of(response):
+    """Devolve response.scan (calculando e anexando se ainda não existir)."""
+    scan = getattr(response, 'scan', None)
+    if scan is None:
+        scan = scan_page(response.text)
+        response.scan = scan
+    return scan
+
+def scan_page(text, security=None):
+    """
+    Varredura de uma resposta. 'security' é o veredito já calculado sobre os
+    bytes (GameClient); se não vier, é calculado sobre o texto. Página de
+    captcha não é lida além disso.
+    """
+    scan = PageScan()
+    if not text:
+        return scan
+
+    scan.security = security if security is not None else scan_security(text)
+    if scan.security == 'captcha':
+        return scan
+
+    # Respostas AJAX: o game_data vem no próprio JSON
+    stripped = text.lstrip()
+    if stripped[:1] in ('{', '['):
+        try:
+            scan.json = json.loads(text)
+            if isinstance(scan.json, dict):
+                gd = scan.json.get('game_data')
+                if not gd and isinstance(scan.json.get('response'), dict):
+                    gd = scan.json['response'].get('game_data')
+                if isinstance(gd, dict):
+                    scan.game_data = gd
+        except ValueError:
+            pass
+
+    if scan.game_data is None:
+        for m in _GAME_DATA.finditer(text):
+            scan.game_data = _decode_at(text, m.end())
+            if scan.game_data is not None: break
+
+    m = _ORDER_COUNT.search(text)
+    if m: scan.order_count = int(m.group(1))
+
+    # Mesma prioridade de antes: META (Lobby) > JS (Jogo) > JSON
+    for pattern in (_CSRF_META, _CSRF_JS, _CSRF_JSON):
+        m = pattern.search(text)
+        if m and m.group(1):
+            scan.csrf = m.group(1)
+            break
+    return scan
+
+def _decode_at(text, idx):
+    start = text.find('{', idx)
+    if start == -1:
+        return None
+    try:
+        return _decoder.raw_decode(text, start)[0]
+    except ValueError:
+        return None
+
+# --- EXTRAÇÃO DE JSON EMBUTIDO NO HTML ---
+# raw_decode lê o objeto inteiro numa passada linear a partir da abertura e
+# para no fim dele: chaves dentro de strings JSON não confundem a contagem.
+
+def extract_json(text, marker, start=0):
+    """
+    Decodifica o primeiro objeto/array JSON que aparece depois de 'marker'.
+    Ex: extract_json(html, 'new ScavengeScreen(') -> dict. None se não achar.
+    """
+    idx = text.find(marker, start)
+    if idx == -1:
+        return None
+    opening = _OPENING.search(text, idx + len(marker))
+    if not opening:
+        return None
+    try:
+        return _decoder.raw_decode(text, opening.start())[0]
+    except ValueError:
+        return None
+
+def extract_json_var(text, var_name):
+    """Decodifica o JSON atribuído em JS: 'BuildingSmith.techs = {...};'."""
+    match = re.search(rf"{re.escape(var_name)}\s*=\s*(?=[\[\{{])", text)
+    if not match:
+        return None
+    try:
+        return _decoder.raw_decode(text, match.end())[0]
+    except ValueError:
+        return None
+
+def extract_js_source(text, var_name):
+    """
+    Para objetos JS que não são JSON (chaves sem aspas, ex: unit_managers.units):
+    devolve o trecho '{...}' atribuído à variável, com contagem de chaves que
+    ignora strings. None se não achar ou se o objeto não fechar.
+    """
+    match = re.search(rf"{re.escape(var_name)}\s*=\s*(?=\{{)", text)
+    if not match:
+        return None
+    return js_source_at(text, match.end())
+
+def js_source_at(text, start):
+    """Trecho '{...}' balanceado que começa em 'start' (None se não fechar)."""
+    depth = 0
+    for token in _JS_TOKENS.finditer(text, start):
+        if token.group() == '{':
+            depth += 1
+        elif token.group() == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:token.end()]
+    return None
+
+def flatten_game_data(game_data):
+    """Converte o game_data do jogo no dicionário plano usado pelo bot."""
+    village = game_data.get('village', game_data)
+
+    data = {
+        'wood': int(float(village.get('wood', 0))),
+        'stone': int(float(village.get('stone', 0))),
+        'iron': int(float(village.get('iron', 0))),
+        'storage': int(float(village.get('storage_max', 0))),
+        'pop_current': int(float(village.get('pop', 0))),
+        'pop_max': int(float(village.get('pop_max', 0))),
+        'village_id': int(village.get('id', 0)),
+        'buildings': {}
+    }
+
+    # Produção por segundo (ausente em algumas respostas AJAX)
+    for res in ('wood', 'stone', 'iron'):
+        try: data[f'{res}_prod'] = float(village.get(f'{res}_prod') or 0)
+        except (TypeError, ValueError): data[f'{res}_prod'] = 0.0
+
+    for b_name, b_level in (village.get('buildings') or {}).items():
+        try: data['buildings'][b_name] = int(b_level)
+        except: data['buildings'][b_name] = 0
+
+    return data
@@ -1,15 +1,22 @@
 # ARQUIVO: core/request_engine.py
 from curl_cffi import requests
 import time
-import random
-import re
+import threading
+from urllib.parse import urlsplit
 from bs4 import BeautifulSoup
+from core.request_pacer import request_pacer
+from core.fleet_scheduler import Stopped, pause, stop_requested
+from core.metrics import metrics, endpoint_key
+from core.cassette import wrap_session
+from core.page_scan import scan_page, scan_security, HeaderWatch
+from core.page_cache import PageCache
+from core.page_model import VillageState
+from core.ajax_client import AjaxClient
 
 class GameClient:
     def __init__(self, account_data):
         self.account = account_data
-        # Impersonate Chrome 120 para bypass de fingerprint
-        self.session = requests.Session(impersonate="chrome120")
+        self.session = self._create_session()
         
         session_data = account_data.get('session', {})
         if not session_data:
@@ -25,9 +32,22 @@ class GameClient:
         # Domínio base para cookies (ex: .tribalwars.com.pt)
         self.base_domain = f".tribalwars.com.{self.server_code}"
 
+        # Servidor alternativo (ex: tools/stand_in_server.py para teste de carga)
+        if account_data.get('base_url'):
+            self.base_url = account_data['base_url'].rstrip('/')
+            self.lobby_url = account_data.get('lobby_url', self.base_url).rstrip('/')
+            self.base_domain = urlsplit(self.base_url).hostname
+
         # 🟢 NOVO: Configura Proxy se disponível
+        self.proxy_label = "direct" # Chave do proxy na telemetria
         self._setup_proxy(account_data)
 
+        # Cache curto de telas (core/page_cache.py), invalidado por POST/ações
+        self.page_cache = PageCache(self.proxy_label)
+
+        # Chamadas AJAX do jogo (core/ajax_client.py)
+        self.ajax = AjaxClient(self)
+
         # 1. Carregamento e Correção de Escopo de Cookies
         cookies_list = session_data.get('cookies', [])
         for cookie in cookies_list:
@@ -64,6 +84,72 @@ class GameClient:
 
         self.csrf_token = None
 
+        # Captcha/sessão expirada vistos em QUALQUER resposta: (veredito, tela).
+        # Com captcha, o cliente recusa novas requisições até o próximo ensure_connection.
+        self.security_alert = None
+
+        # Estado da aldeia mantido a partir do game_data de cada resposta
+        # (telas e AJAX), aplicado conforme as respostas chegam
+        self.village = None
+
+        # Controle de uso (ClientPool): o mesmo cliente pode ser compartilhado
+        # entre o worker e os módulos de cluster, então serializamos a sessão.
+        self._lock = threading.RLock()
+        self.last_used = time.time()
+        self.last_connected = 0
+
+    def _create_session(self):
+        # Impersonate Chrome 120 para bypass de fingerprint
+        # (wrap_session grava/reproduz o tráfego se houver cassette ativa)
+        return wrap_session(requests.Session(impersonate="chrome120"))
+
+    def _send(self, method, url, head_only=False, **kwargs):
+        """Ponto único de saída HTTP (serializado por cliente)."""
+        with self._lock:
+            self.last_used = time.time()
+            self.page_cache.invalidate_url(method, url)
+            started = time.perf_counter()
+            try:
+                if head_only:
+                    response = self._read_head(getattr(self.session, method)(url, stream=True, **kwargs))
+                else:
+                    response = getattr(self.session, method)(url, **kwargs)
+            except Exception:
+                self._record(url, started, None)
+                raise
+            self._record(url, started, response)
+            return response
+
+    def _read_head(self, response):
+        """
+        Lê o corpo em streaming só até os blocos do cabeçalho (page_scan.HEADER_BLOCKS)
+        e encerra a transferência: o resto da página não é baixado nem decodificado.
+        response.partial indica que o corpo foi cortado. Sem streaming (cassette),
+        a resposta já vem inteira.
+        """
+        if getattr(response, 'queue', None) is None: return response
+        watch = HeaderWatch()
+        for chunk in response.iter_content():
+            if watch.feed(chunk):
+                response.close()
+                response.partial = True
+                break
+        response.content = bytes(watch.buffer)
+        return response
+
+    def _record(self, url, started, response):
+        """Registra a requisição na telemetria (core/metrics.py)."""
+        latency = time.perf_counter() - started
+        if response is None:
+            metrics.record(url, self.proxy_label, latency, error=True)
+            return
+        metrics.record(
+            url, self.proxy_label, latency,
+            size=len(response.content),
+            status=response.status_code,
+            redirected=bool(getattr(response, 'redirect_count', 0))
+        )
+
     def _setup_proxy(self, account_data):
         """Configura proxy com segurança máxima (Fail-Safe)"""
         pid = account_data.get('proxy_id')
@@ -88,6 +174,7 @@ class GameClient:
                     "http": proxy_url,
                     "https": proxy_url
                 }
+                self.proxy_label = f"{proxy['ip']}:{proxy['port']}"
                 print(f"[ENGINE] 🛡️ Proxy blindado configurado: {proxy['ip']}")
                     
             except Exception as e:
@@ -147,35 +234,36 @@ class GameClient:
 
     def ensure_connection(self):
         """Verifica conexão com 3 tentativas antes de desistir."""
-        check_url = f"{self.base_url}/game.php?screen=overview"
-        
-        headers_game = self.headers.copy()
-        headers_game["Sec-Fetch-Site"] = "same-origin"
-        headers_game["Referer"] = f"{self.base_url}/game.php"
+        self.security_alert = None # O overview abaixo é varrido de novo
+        check_url = self._build_url("overview")
+        headers_game = self._game_headers(f"{self.base_url}/game.php")
         
         max_retries = 3
         
         for attempt in range(1, max_retries + 1):
+            if stop_requested(): return False # Conta parada: não insiste na reconexão
             try:
                 # Timeout aumentado um pouco para tolerar lags do proxy
-                response = self.session.get(check_url, headers=headers_game, timeout=20)
+                response = self._send("get", check_url, headers=headers_game, timeout=20)
                 
                 # Verificações de falha de sessão
                 if self.world_id not in response.url:
                     print(f"[ENGINE] ⚠️ Redirecionado incorretamente. Tentativa {attempt}/{max_retries}...")
                     if self._reenter_world(): return True
-                    time.sleep(2)
+                    if not pause(2): return False
                     continue 
                 
-                if "session_expired" in response.url or "login.php" in response.url:
+                if self._is_session_lost(response):
                      print(f"[ENGINE] ⚠️ Sessão expirada. Tentando recuperar ({attempt}/{max_retries})...")
                      if self._reenter_world(): return True
-                     time.sleep(2)
+                     if not pause(2): return False
                      continue
 
                 # Sucesso
                 if "game.php" in response.url:
-                    self._extract_csrf(response.text)
+                    self._process_response(response)
+                    self.page_cache.put("overview", None, response) # O worker lê o overview logo em seguida
+                    self.last_connected = time.time()
                     return True
                 
                 # Se chegou aqui mas não é game.php, tenta reentrar
@@ -183,7 +271,7 @@ class GameClient:
 
             except Exception as e:
                 print(f"[ENGINE] ❌ Erro de conexão na tentativa {attempt}: {e}")
-                time.sleep(3) # Espera 3 segundos antes de tentar de novo
+                if not pause(3): return False # Espera 3 segundos antes de tentar de novo (ou a parada da conta)
 
         # Se falhou 3 vezes
         return False
@@ -191,46 +279,32 @@ class GameClient:
     def _reenter_world(self):
         """Reconexão via Lobby com simulação de clique humano."""
         print(f"[ENGINE] Tentando recuperar sessão via Lobby...")
+        metrics.incr("reenter", self.proxy_label, "reentries")
         
         try:
             # 1. Acessa Lobby
-            headers_lobby = self.headers.copy()
-            headers_lobby["Referer"] = "https://www.google.com/"
-            headers_lobby["Sec-Fetch-Site"] = "none"
-            
-            resp_lobby = self.session.get(self.lobby_url, headers=headers_lobby)
+            resp_lobby = self._send("get", self.lobby_url, headers=self._lobby_headers())
             
             if "login.php" in resp_lobby.url:
                 print(f"[ENGINE] ❌ SESSÃO INVÁLIDA. Necessário login manual.")
                 return False
 
-            self._extract_csrf(resp_lobby.text)
+            self._process_response(resp_lobby, lobby=True)
 
             # 2. Busca Link do Mundo
-            soup = BeautifulSoup(resp_lobby.text, 'html.parser')
-            target_href = None
-            
-            links = soup.find_all('a', href=True)
-            for link in links:
-                if f"play/{self.world_id}" in link['href']:
-                    target_href = link['href']
-                    break
+            final_url = self._find_world_link(resp_lobby.text)
             
-            if target_href:
-                final_url = f"{self.lobby_url}{target_href}" if target_href.startswith('/') else target_href
-
-                time.sleep(random.uniform(1.2, 2.5))
+            if final_url:
+                self._pace("reenter")
                 
                 # 3. Clique com Referer do Lobby (Crucial)
-                headers_enter = self.headers.copy()
-                headers_enter["Referer"] = resp_lobby.url 
-                headers_enter["Sec-Fetch-Site"] = "same-site"
-                
-                resp_enter = self.session.get(final_url, headers=headers_enter)
+                resp_enter = self._send("get", final_url, headers=self._enter_headers(resp_lobby.url))
                 
                 if "game.php" in resp_enter.url:
                     print(f"[ENGINE] ✅ Sessão recuperada com sucesso!")
-                    self._extract_csrf(resp_enter.text)
+                    self._process_response(resp_enter)
+                    self._clear_session_alert()
+                    self.last_connected = time.time()
                     return True
                 else:
                     print(f"[ENGINE] ❌ Falha na recuperação automática.")
@@ -243,32 +317,36 @@ class GameClient:
             print(f"[ENGINE ERROR] Erro no re-login: {e}")
             return False
 
-    def safe_get(self, screen, params=None, extra_headers=None):
-        url = f"{self.base_url}/game.php?screen={screen}"
-        if params:
-            for k, v in params.items():
-                url += f"&{k}={v}"
-        
-        headers_req = self.headers.copy()
-        headers_req["Referer"] = f"{self.base_url}/game.php"
-        headers_req["Sec-Fetch-Site"] = "same-origin"
-        
+    def safe_get(self, screen, params=None, extra_headers=None, fresh=False, head_only=False):
+        """
+        GET de uma tela. fresh=True ignora o cache (ex: conferir o efeito de uma ação).
+        head_only=True lê só o cabeçalho da página (CSRF, game_data, pontos e ataques
+        chegando); essa resposta cortada não entra no cache.
+        """
+        if self._blocked(screen): return None
+        cached = None if fresh else self.page_cache.get(screen, params)
+        if cached is not None:
+            return cached
+
+        url = self._build_url(screen, params)
         # Injeta headers customizados (para o AJAX funcionar)
-        if extra_headers:
-            headers_req.update(extra_headers)
+        headers_req = self._game_headers(f"{self.base_url}/game.php", extra_headers)
 
         try:
-            time.sleep(random.uniform(0.6, 1.8))
-            response = self.session.get(url, headers=headers_req, timeout=20)
+            self._pace("get")
+            response = self._send("get", url, head_only, headers=headers_req, timeout=20)
             
-            if "session_expired" in response.url or "login.php" in response.url:
+            if self._is_session_lost(response):
                 print("[ENGINE] Sessão caiu durante GET. Recuperando...")
                 if self._reenter_world():
                      self.update_account_session() # Importante atualizar se recuperou
-                     return self.session.get(url, headers=headers_req, timeout=20)
+                     response = self._process_response(self._send("get", url, head_only, headers=headers_req, timeout=20))
+                     if not head_only: self.page_cache.put(screen, params, response)
+                     return response
                 return None
 
-            self._extract_csrf(response.text)
+            self._process_response(response)
+            if not head_only: self.page_cache.put(screen, params, response)
             return response
         except Exception as e:
             print(f"[ENGINE ERROR] GET {screen}: {e}")
@@ -279,81 +357,172 @@ class GameClient:
         NOVO MÉTODO (CORRIGIDO): Acessa uma URL completa extraída do HTML.
         Trata URLs relativas forçando a adição do domínio base.
         """
-        # 1. Se começar com /, adiciona o domínio base (ex: .tribalwars.com.br)
-        if full_url.startswith("/"):
-            # Remove a barra inicial para não duplicar se base_url tiver
-            path = full_url.lstrip("/")
-            full_url = f"{self.base_url}/{path}"
-        
-        # 2. Se NÃO começar com http (e não começou com /), assume que é relativo à pasta atual (game.php?...)
-        elif not full_url.startswith("http"):
-             full_url = f"{self.base_url}/{full_url}"
-
-        headers_req = self.headers.copy()
-        headers_req["Referer"] = f"{self.base_url}/game.php?screen=main"
-        headers_req["Sec-Fetch-Site"] = "same-origin"
+        if self._blocked(full_url): return None
+        full_url = self._absolute_url(full_url)
+        headers_req = self._game_headers(f"{self.base_url}/game.php?screen=main")
         
         try:
-            time.sleep(random.uniform(0.8, 1.5))
-            response = self.session.get(full_url, headers=headers_req, timeout=20)
+            self._pace("absolute")
+            response = self._send("get", full_url, headers=headers_req, timeout=20)
             
-            if "session_expired" in response.url or "login.php" in response.url:
+            if self._is_session_lost(response):
                 print("[ENGINE] Sessão caiu durante GET Absoluto. Recuperando...")
                 if self._reenter_world():
                      self.update_account_session()
-                     return self.session.get(full_url, headers=headers_req, timeout=20)
+                     return self._process_response(self._send("get", full_url, headers=headers_req, timeout=20))
                 return None
 
-            self._extract_csrf(response.text)
+            self._process_response(response)
             return response
         except Exception as e:
             print(f"[ENGINE ERROR] Absolute GET Crash: {e}")
             return None
 
     def safe_post(self, screen, data, params=None, extra_headers=None):
+        if self._blocked(screen): return None
+        url = self._build_url(screen, params)
+        
+        if self.csrf_token:
+            data['h'] = self.csrf_token
+            
+        headers_req = self._game_headers(f"{self.base_url}/game.php", extra_headers)
+
+        try:
+            self._pace("post")
+            response = self._send("post", url, data=data, headers=headers_req)
+            self._process_response(response)
+            return response
+        except Exception as e:
+            print(f"[ENGINE ERROR] POST {screen}: {e}")
+            return None
+
+    # --- RITMO (core/request_pacer.py) ---
+    def _pace(self, kind):
+        """Aguarda o horário reservado para a próxima requisição desta conta."""
+        if getattr(self.session, 'offline', False): return # Replay: sem rede, sem pausa
+        if not request_pacer.wait(self.account.get('id'), self.account.get('proxy_id'), kind):
+            raise Stopped("conta parada")
+
+    def space(self, kind):
+        """
+        Pausa humana sem bloquear: apenas atrasa a PRÓXIMA requisição da conta.
+        Retorna o intervalo sorteado (para log).
+        """
+        return request_pacer.defer(self.account.get('id'), kind)
+
+    # --- AUXILIARES (compartilhados com o AsyncGameClient) ---
+
+    def _build_url(self, screen, params=None):
         url = f"{self.base_url}/game.php?screen={screen}"
         if params:
             for k, v in params.items():
                 url += f"&{k}={v}"
+        return url
+
+    def _absolute_url(self, full_url):
+        # 1. Se começar com /, adiciona o domínio base (ex: .tribalwars.com.br)
+        if full_url.startswith("/"):
+            # Remove a barra inicial para não duplicar se base_url tiver
+            path = full_url.lstrip("/")
+            return f"{self.base_url}/{path}"
         
-        if self.csrf_token:
-            data['h'] = self.csrf_token
-            
+        # 2. Se NÃO começar com http (e não começou com /), assume que é relativo à pasta atual (game.php?...)
+        if not full_url.startswith("http"):
+            return f"{self.base_url}/{full_url}"
+
+        return full_url
+
+    def _game_headers(self, referer, extra_headers=None):
         headers_req = self.headers.copy()
-        headers_req["Referer"] = f"{self.base_url}/game.php"
+        headers_req["Referer"] = referer
         headers_req["Sec-Fetch-Site"] = "same-origin"
-        
         if extra_headers:
             headers_req.update(extra_headers)
+        return headers_req
+
+    def _lobby_headers(self):
+        headers_lobby = self.headers.copy()
+        headers_lobby["Referer"] = "https://www.google.com/"
+        headers_lobby["Sec-Fetch-Site"] = "none"
+        return headers_lobby
+
+    def _enter_headers(self, lobby_url):
+        headers_enter = self.headers.copy()
+        headers_enter["Referer"] = lobby_url
+        headers_enter["Sec-Fetch-Site"] = "same-site"
+        return headers_enter
+
+    def _is_session_lost(self, response):
+        return "session_expired" in response.url or "login.php" in response.url
 
+    def _find_world_link(self, lobby_html):
+        """Procura no Lobby o link 'play/<mundo>' e devolve a URL absoluta."""
+        soup = BeautifulSoup(lobby_html, 'html.parser')
+        for link in soup.find_all('a', href=True):
+            if f"play/{self.world_id}" in link['href']:
+                target_href = link['href']
+                return f"{self.lobby_url}{target_href}" if target_href.startswith('/') else target_href
+        return None
+
+    def _process_response(self, response, lobby=False):
+        """
+        Varredura única de cada resposta (core/page_scan.py): CSRF, game_data,
+        BuildingMain.order_count e sinais de segurança ficam em response.scan
+        para os managers consumirem sem reprocessar o HTML.
+        Os sinais de segurança são procurados nos bytes crus, antes de tudo.
+        lobby=True: lobby/seleção de mundo do _reenter_world, que são telas de
+        login/SSO por natureza (os marcadores de sessão expirada não valem ali).
+        """
         try:
-            time.sleep(random.uniform(1.0, 2.5))
-            response = self.session.post(url, data=data, headers=headers_req)
-            self._extract_csrf(response.text)
-            return response
+            security = scan_security(response.content)
+            if lobby and security == 'session_expired': security = None
+            scan = scan_page(response.text, security)
+            response.scan = scan
+            if security: self._flag_security(security, response.url)
+            self._set_csrf(scan.csrf, response.url)
+            self._merge_state(scan, response.url)
         except Exception as e:
-            print(f"[ENGINE ERROR] POST {screen}: {e}")
-            return None
+            print(f"[ENGINE ERROR] Falha ao processar resposta: {e}")
+        return response
 
-    def _extract_csrf(self, html):
-        try:
-            # Token META (Lobby)
-            match_meta = re.search(r'name="csrf-token" content="([a-f0-9]+)"', html)
-            if match_meta:
-                self.csrf_token = match_meta.group(1)
-                return
-
-            # Token JS (Jogo)
-            match_js = re.search(r'csrf_token\s*=\s*[\'"]([a-f0-9]+)[\'"]', html)
-            if match_js:
-                self.csrf_token = match_js.group(1)
-                return
-            
-            # Token JSON
-            if '"csrf":"' in html:
-                start = html.find('"csrf":"') + 8
-                end = html.find('"', start)
-                token = html[start:end]
-                if token: self.csrf_token = token
-        except:
-            pass
\ No newline at end of file
+    def _merge_state(self, scan, url):
+        """Aplica o game_data (mesmo parcial) da resposta ao estado da aldeia."""
+        if not isinstance(scan.game_data, dict): return
+        if self.village is None:
+            self.village = VillageState()
+        self.village.merge(scan.game_data, endpoint_key(url), scan.at)
+
+    def state_age(self):
+        """Segundos desde a última atualização do estado (None se ainda não houver)."""
+        if self.village is None or not self.village.village_id: return None
+        return time.time() - self.village.at
+
+    def _clear_session_alert(self):
+        """Reentrada no mundo deu certo: a sessão expirada que a motivou já não vale."""
+        if self.security_alert and self.security_alert[0] == 'session_expired':
+            self.security_alert = None
+
+    def _flag_security(self, verdict, url):
+        """Registra captcha/sessão expirada (o worker confere após cada etapa)."""
+        if self.security_alert and self.security_alert[0] == 'captcha': return
+        self.security_alert = (verdict, endpoint_key(url))
+        print(f"[ENGINE] ⛔ {verdict} detectado em {self.security_alert[1]}")
+
+    def _blocked(self, target):
+        """
+        Com captcha ativo, nenhuma requisição sai (nem a dos managers no meio do
+        ciclo). O mesmo vale para o ciclo de uma conta parada (fleet_scheduler).
+        """
+        if stop_requested():
+            print(f"[ENGINE] Requisição cancelada ({target}): conta parada")
+            return True
+        if self.security_alert and self.security_alert[0] == 'captcha':
+            print(f"[ENGINE] Requisição bloqueada ({target}): captcha pendente")
+            return True
+        return False
+
+    def _set_csrf(self, token, url=None):
+        if token and token != self.csrf_token:
+            if self.csrf_token and url:
+                metrics.incr(endpoint_key(url), self.proxy_label, "csrf_refreshes")
+            self.csrf_token = token
@@ -0,0 +1,105 @@
+# ARQUIVO: core/request_pacer.py
+import time
+import random
+import threading
+from core.settings_manager import global_settings
+from core.fleet_scheduler import pause, stop_requested
+
+# Espaçamento mínimo (segundos, intervalo aleatório) entre requisições da mesma conta.
+# Os tipos "de requisição" valem antes de cada chamada; os demais são pausas extras
+# que os managers pedem via client.space() e só atrasam a PRÓXIMA requisição.
+# Pode ser sobrescrito por 'pacing_rules' nas configurações globais.
+DEFAULT_RULES = {
+    # Requisições
+    "get": (0.6, 1.8),
+    "absolute": (0.8, 1.5),
+    "post": (1.0, 2.5),
+    "reenter": (1.2, 2.5),
+    # Pausas do ciclo
+    "phase": (0.8, 1.5),
+    "phase_quests": (1.2, 2.0),
+    "phase_final": (1.0, 1.0),
+    "task": (2.5, 5.5),
+    # Pausas dos managers
+    "daily_bonus": (1.0, 1.0),
+    "quest": (0.5, 1.0),
+    "reward": (0.8, 1.5),
+    "recruit": (1.0, 1.0),
+    "research": (0.5, 1.5),
+    "scavenge_unlock": (1.0, 1.0),
+    "scavenge_squad": (0.8, 1.5),
+    "cluster_accept_check": (2.0, 2.0),
+    "cluster_accept": (1.5, 1.5),
+}
+
+class ProxyBucket:
+    """Token bucket (GCRA) por proxy: 'rate' req/s com rajada de até 'burst'."""
+    def __init__(self, rate, burst):
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.tat = 0.0 # Theoretical Arrival Time
+
+    def reserve(self, at):
+        ready = max(at, self.tat - self.tolerance)
+        self.tat = max(self.tat, ready) + self.interval
+        return ready
+
+class RequestPacer:
+    """
+    Agenda central de espaçamento das requisições (por conta e por proxy).
+    reserve() não dorme: devolve quantos segundos faltam para o horário reservado,
+    então o chamador pode adiantar outro trabalho antes de esperar.
+    """
+    def __init__(self):
+        self._accounts = {}
+        self._proxies = {}
+        self._lock = threading.Lock()
+
+    def gap(self, kind):
+        rules = global_settings.get("pacing_rules") or {}
+        low, high = rules.get(kind) or DEFAULT_RULES[kind]
+        return random.uniform(low, high)
+
+    def reserve(self, account_id, proxy_id, kind):
+        """Reserva o próximo horário livre e retorna o atraso (segundos) até ele."""
+        now = time.monotonic()
+        gap = self.gap(kind)
+        with self._lock:
+            slot = self._accounts.setdefault(account_id, {"last": 0.0, "hold": 0.0})
+            ready = max(now, slot["last"] + gap, slot["hold"])
+
+            bucket = self._proxy_bucket(proxy_id)
+            ready = bucket.reserve(ready)
+
+            slot["last"] = ready
+        return ready - now
+
+    def wait(self, account_id, proxy_id, kind):
+        """
+        Versão bloqueante (threads): dorme só o que faltar da reserva. False se
+        a conta do ciclo atual foi parada (a pausa acaba na hora).
+        """
+        delay = self.reserve(account_id, proxy_id, kind)
+        if delay > 0:
+            return pause(delay)
+        return not stop_requested()
+
+    def defer(self, account_id, kind):
+        """Empurra a próxima requisição da conta em 'gap' segundos, sem bloquear."""
+        gap = self.gap(kind)
+        with self._lock:
+            slot = self._accounts.setdefault(account_id, {"last": 0.0, "hold": 0.0})
+            slot["hold"] = max(slot["hold"], time.monotonic() + gap)
+        return gap
+
+    def _proxy_bucket(self, proxy_id):
+        # Contas sem proxy compartilham o mesmo IP real
+        key = proxy_id if proxy_id and proxy_id != "none" else "direct"
+        bucket = self._proxies.get(key)
+        if not bucket:
+            bucket = ProxyBucket(global_settings.get("proxy_rate"), global_settings.get("proxy_burst"))
+            self._proxies[key] = bucket
+        return bucket
+
+# Instância global
+request_pacer = RequestPacer()
@@ -22,7 +22,36 @@ DEFAULT_SETTINGS = {
     "max_interval": 5,
     "farm_priority": False,
     "storage_priority": False,
-    "reserve_for_building": True
+    "reserve_for_building": True,
+    # Pool de clientes HTTP (segundos)
+    "client_idle_ttl": 900,
+    "client_revalidate": 300,
+    # Threads que executam os ciclos da frota (core/fleet_scheduler.py). As
+    # pausas humanas entre módulos liberam a thread, mas o espaçamento entre
+    # requisições não (~12s de thread por ciclo com as regras padrão): o pool
+    # cresce sob demanda de 'scheduler_workers' até 'scheduler_max_workers', e
+    # a frota roda no máximo scheduler_max_workers / 12 ciclos por segundo
+    # (~5/s com 64; o fleet_bench mostra o teto medido em 'paced_ceiling')
+    "scheduler_workers": 8,
+    "scheduler_max_workers": 64,
+    # Espaçamento de requisições (ver core/request_pacer.py)
+    "pacing_rules": {},
+    "proxy_rate": 2.0,
+    "proxy_burst": 3,
+    # Cache de telas dentro do ciclo (segundos, 0 = desligado)
+    "page_cache_ttl": 30,
+    # Baixa as telas dos módulos no início da fase 2 sem esperar uma resposta
+    # para enviar a próxima (o espaçamento do request_pacer continua valendo:
+    # só a latência de rede é sobreposta)
+    "prefetch_screens": False,
+    # Idade máxima (segundos) do estado da aldeia montado a partir das respostas
+    # AJAX para pular o overview final do ciclo (0 = sempre baixa o overview)
+    "state_max_age": 120,
+    # Segundos até um módulo sem nada a fazer (pesquisas concluídas, metas de
+    # tropas atingidas) voltar a conferir a tela (0 = confere em todo ciclo)
+    "module_idle_recheck": 3600,
+    # Parser de HTML do GameParser: auto | selectolax | lxml | bs4
+    "html_backend": "auto"
 }
 
 class SettingsManager:
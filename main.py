@@ -32,6 +32,7 @@ def start_version_watchdog(page: ft.Page):
         # Verifica se o launcher existe
         if os.path.exists(LAUNCHER_NAME):
             subprocess.Popen([LAUNCHER_NAME])
+            bot_controller.shutdown(timeout=10)
             page.window_destroy()
             os._exit(0)
         else:
@@ -209,6 +210,15 @@ def main(page: ft.Page):
     page.window_min_width = 1100
     page.window_min_height = 700
 
+    # --- FECHAMENTO: para a frota (tempo limitado) antes de destruir a janela ---
+    def ao_fechar_janela(e):
+        if e.data == "close":
+            bot_controller.shutdown(timeout=10)
+            page.window_destroy()
+
+    page.window_prevent_close = True
+    page.on_window_event = ao_fechar_janela
+
     # --- INICIA O VIGILANTE DE VERSÃO ---
     start_version_watchdog(page)
 
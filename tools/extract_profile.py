@@ -0,0 +1,66 @@
+# ARQUIVO: tools/extract_profile.py
+"""
+Tempo por campo das specs de tela (core/page_extract.py): localizar a âncora
+e montar o valor (decodificar JSON, contar trecho...) de cada campo:
+
+    python tools/extract_profile.py
+    python tools/extract_profile.py --dir paginas_salvas/   # <tela>*.html reais
+
+Sem --dir, usa as telas do servidor local.
+"""
+import os
+import sys
+import glob
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.page_extract import SCREENS, extract_text
+from core.metrics import metrics
+from tools import stand_in_server as game
+
+def stand_in_pages():
+    v = game.Village("profile", 1001)
+    v.train_queue["barracks"] = [{"amount": 20}, {"amount": 5}]
+    return {
+        "overview": [game.render_overview(v)],
+        "main": [game.render_main(v)],
+        "train": [game.render_train(v)],
+        "smith": [game.render_smith(v)],
+        "place": [game.render_scavenge(v)],
+        "buddies": [game.render_buddies(v)],
+    }
+
+def load_dir(path):
+    pages = {}
+    for screen in SCREENS:
+        files = sorted(glob.glob(os.path.join(path, f"{screen}*.html")))
+        for file in files:
+            with open(file, encoding="utf-8", errors="replace") as f:
+                pages.setdefault(screen, []).append(f.read())
+    return pages
+
+def main():
+    ap = argparse.ArgumentParser(description="Tempo por campo das specs de tela")
+    ap.add_argument("--dir", help="Pasta com páginas reais (<tela>*.html)")
+    ap.add_argument("--number", type=int, default=200, help="Repetições por página")
+    args = ap.parse_args()
+
+    pages = load_dir(args.dir) if args.dir else stand_in_pages()
+
+    metrics.reset()
+    for screen, htmls in pages.items():
+        for html in htmls:
+            for _ in range(args.number):
+                extract_text(html, screen)
+
+    for screen, fields in metrics.snapshot()["fields"].items():
+        size = sum(len(h) for h in pages[screen]) // len(pages[screen]) // 1024
+        total = sum(stats["ms_total"] for stats in fields.values()) / next(iter(fields.values()))["count"]
+        print(f"{screen} ({size} KB): {total * 1000:.1f} µs")
+        for name, stats in sorted(fields.items(), key=lambda kv: -kv[1]["ms_total"]):
+            print(f"   {name:18} {stats['ms_total'] / stats['count'] * 1000:9.1f} µs")
+
+if __name__ == "__main__":
+    main()
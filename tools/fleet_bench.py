@@ -0,0 +1,219 @@
+# ARQUIVO: tools/fleet_bench.py
+"""
+Teste de carga da frota contra o servidor local (tools/stand_in_server.py).
+Mede ciclos/s, CPU por ciclo e memória Python (tracemalloc) por conta, além
+do estado da aldeia guardado como dicionário plano vs VillageState (slots):
+
+    python tools/fleet_bench.py --accounts 10 100 1000 --workers 32
+
+Sem --server, um servidor local é iniciado em um subprocesso (para que a CPU
+do servidor não entre na medição do bot). As pausas humanas são zeradas.
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import subprocess
+import threading
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.settings_manager import global_settings
+from core.request_pacer import DEFAULT_RULES
+from core.request_engine import GameClient
+from core.async_request_engine import prefetch_pages
+from core.metrics import metrics
+from core.fleet_scheduler import FleetScheduler
+from core import module_due
+from core.game_parser import GameParser
+from core.page_model import VillageState, current_village
+from core.page_scan import scan_of
+from core.features.reward_manager import RewardManager
+from core.features.build_manager import BuildManager
+from core.features.recruit_manager import RecruitManager
+from core.features.scavenge_manager import ScavengeManager
+from core.features.research_manager import ResearchManager
+
+def make_account(idx, server_url, world):
+    return {
+        "id": f"bench-{idx}",
+        "username": f"bench{idx}",
+        "world": world,
+        "server": "BR",
+        "base_url": f"{server_url}/{world}",
+        "lobby_url": f"{server_url}/lobby",
+        "proxy_id": "none",
+        "status": "running",
+        "session": {"cookies": [{"name": "sid", "value": f"bench{idx}", "domain": "localhost"}]},
+        "build_queue": [{"key": "main"}],
+        "recruit_targets": {"spear": {"total": 1000, "batch": 20, "limit_queue": 3}},
+        "research_priority": ["axe", "light"],
+    }
+
+VERBOSE = False
+
+def log(msg, type="info"):
+    if VERBOSE: print(f"[{type.upper()}] {msg}")
+
+def run_cycle(client, acc):
+    """Mesmas fases do BotController._worker, sem pausas nem gravação em disco."""
+    resp = client.safe_get("overview")
+    if not resp: return False
+    parser = GameParser(resp.text, scan=getattr(resp, "scan", None))
+    if parser.check_security(): return False
+    village = client.village if client.village and client.village.village_id else current_village(resp, parser)
+
+    rewards = RewardManager(client, log)
+    rewards.handle_daily_bonus(parser, village)
+    rewards.handle_new_quests(parser, village)
+    managers = {"build": BuildManager(client, log), "recruit": RecruitManager(client, log),
+                "scavenge": ScavengeManager(client, log), "research": ResearchManager(client, log)}
+    managers = {k: m for k, m in managers.items() if not module_due.pending(acc, k)}
+    if global_settings.get("prefetch_screens"):
+        prefetch_pages(client, [r for r in (m.page_request(acc, village) for m in managers.values()) if r])
+    for key, mgr in managers.items():
+        mgr.execute(acc, village)
+        module_due.record(acc, key, mgr.wake_at)
+        if client.security_alert: # Mesma parada do worker (captcha em qualquer resposta)
+            log(f"⛔ {client.security_alert[0]} em {client.security_alert[1]}", "error")
+            return False
+
+    # Overview final só com o estado velho (mesma regra do worker)
+    state_age = client.state_age()
+    max_age = global_settings.get("state_max_age")
+    if state_age is not None and max_age and state_age <= max_age and client.village.points is not None:
+        return True
+    resp = client.safe_get("overview", head_only=True)
+    if resp:
+        parser = GameParser(resp.text, scan=getattr(resp, "scan", None))
+        current_village(resp, parser)
+        parser.get_points()
+        parser.get_incoming_attacks()
+    return True
+
+def state_memory(clients):
+    """Bytes por conta do estado da aldeia: dicionário plano (antigo game_data) vs VillageState."""
+    pages = [c.safe_get("overview") for c in clients]
+    flats = [scan_of(r).village() for r in pages if r]
+    if not flats: return 0, 0
+
+    def measure(build):
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        kept = [build(f) for f in flats]
+        size = (tracemalloc.get_traced_memory()[0] - base) / len(kept)
+        tracemalloc.stop()
+        return size
+
+    # Os edifícios são o mesmo dicionário nos dois formatos: mede só o envelope
+    as_dict = measure(lambda f: {k: v for k, v in f.items() if k != 'buildings'} | {'buildings': f['buildings']})
+    as_slots = measure(lambda f: VillageState.from_flat(f, "overview"))
+    return as_dict, as_slots
+
+def bench(n_accounts, server_url, scheduler, cycles, world):
+    accounts = [make_account(i, server_url, world) for i in range(n_accounts)]
+
+    tracemalloc.start()
+    base_mem = tracemalloc.get_traced_memory()[0]
+    clients = [GameClient(acc) for acc in accounts]
+    for c in clients:
+        c.ensure_connection()
+    mem_per_account = (tracemalloc.get_traced_memory()[0] - base_mem) / n_accounts
+    tracemalloc.stop()
+    state_dict, state_slots = state_memory(clients)
+
+    # Mesmo agendamento do BotController: cada conta reagenda o próprio ciclo
+    ok = [0]
+    peak_threads = [0]
+    finished = threading.Semaphore(0)
+    lock = threading.Lock()
+    def job(i, left):
+        success = run_cycle(clients[i], accounts[i])
+        with lock:
+            ok[0] += success
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+        if left > 1: scheduler.schedule(i, lambda: job(i, left - 1))
+        else: finished.release()
+
+    metrics.reset()
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for i in range(n_accounts):
+        scheduler.schedule(i, lambda i=i: job(i, cycles))
+    for _ in range(n_accounts):
+        finished.acquire()
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+
+    total = n_accounts * cycles
+    screens = metrics.snapshot()["screens"].values()
+    requests = sum(s["count"] for s in screens) / total
+
+    # Teto da frota com o ritmo padrão (desligado aqui): o espaçamento entre as
+    # requisições segura o worker, as pausas humanas entre módulos não
+    low, high = DEFAULT_RULES["get"]
+    hold = requests * (low + high) / 2
+    limit = max(scheduler.max_workers or global_settings.get("scheduler_max_workers"), scheduler.workers or 0)
+    return {
+        "accounts": n_accounts,
+        "cycles": total,
+        "ok": ok[0],
+        "wall_s": round(wall, 2),
+        "cycles_per_s": round(total / wall, 2),
+        "cpu_ms_per_cycle": round(cpu / total * 1000, 1),
+        "requests_per_cycle": round(requests, 1),
+        "cache_hits_per_cycle": round(sum(s["cache_hits"] for s in screens) / total, 1),
+        "kb_per_cycle": round(sum(s["bytes_total"] for s in screens) / total / 1024, 1),
+        "threads": peak_threads[0],
+        "paced_hold_s_per_cycle": round(hold, 1),
+        "paced_ceiling": round(limit / hold, 2) if hold else None, # ciclos/s com o pool no teto
+        "py_kb_per_account": round(mem_per_account / 1024, 1),
+        "state_bytes_dict": round(state_dict),
+        "state_bytes_slots": round(state_slots),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Teste de carga da frota contra o servidor local")
+    ap.add_argument("--accounts", type=int, nargs="+", default=[10, 100])
+    ap.add_argument("--workers", type=int, default=32, help="Workers iniciais do FleetScheduler (o pool cresce até scheduler_max_workers)")
+    ap.add_argument("--cycles", type=int, default=1)
+    ap.add_argument("--server", help="URL de um stand_in_server já rodando")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--world", default="br1")
+    ap.add_argument("--verbose", action="store_true", help="Mostra o log dos managers")
+    ap.add_argument("--prefetch", action="store_true", help="Liga o prefetch paralelo das telas (prefetch_screens)")
+    ap.add_argument("--state-max-age", type=float, help="Sobrescreve state_max_age (0 = overview final em todo ciclo)")
+    ap.add_argument("--captcha-on", nargs="*", default=[], help="Telas em que o servidor local responde com captcha")
+    ap.add_argument("--latency", type=float, default=0, help="Milissegundos de latência do servidor local")
+    args = ap.parse_args()
+
+    global VERBOSE
+    VERBOSE = args.verbose
+
+    # Sem pausas humanas e sem limite de proxy no benchmark
+    global_settings.settings["pacing_rules"] = {k: (0, 0) for k in DEFAULT_RULES}
+    global_settings.settings["proxy_rate"] = 1e6
+    global_settings.settings["proxy_burst"] = 1e6
+    global_settings.settings["prefetch_screens"] = args.prefetch
+    if args.state_max_age is not None:
+        global_settings.settings["state_max_age"] = args.state_max_age
+
+    proc = None
+    server_url = args.server
+    if not server_url:
+        proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "tools", "stand_in_server.py"), "--port", str(args.port),
+                                 "--captcha-on", *args.captcha_on, "--latency", str(args.latency)],
+                                stdout=subprocess.DEVNULL)
+        server_url = f"http://localhost:{args.port}"
+        time.sleep(1.0)
+
+    try:
+        scheduler = FleetScheduler(args.workers) # Um só pool para todas as rodadas
+        for n in args.accounts:
+            print(json.dumps(bench(n, server_url.rstrip("/"), scheduler, args.cycles, args.world)))
+    finally:
+        if proc: proc.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# ARQUIVO: tools/json_extract_bench.py
+"""
+Micro-benchmark do extrator de JSON embutido (core/page_scan.extract_json)
+contra o extrator antigo do GameParser (caractere a caractere com
+json_str += char) e a regex não-gulosa ({.*?}); dos managers:
+
+    python tools/json_extract_bench.py
+    python tools/json_extract_bench.py --dir paginas_salvas/  # place*.html / smith*.html reais
+
+Sem --dir, usa as telas de coleta e ferreiro do servidor local.
+"""
+import os
+import re
+import sys
+import glob
+import json
+import timeit
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.page_scan import extract_json, extract_json_var
+from tools import stand_in_server as game
+
+def legacy_extract(text, start_marker):
+    """Cópia do antigo GameParser._extract_json_payload (referência)."""
+    start_idx = text.find(start_marker)
+    if start_idx == -1: return None
+    subset = text[start_idx:]
+    match = re.search(r'[\[\{]', subset)
+    if not match: return None
+    json_start = start_idx + match.start()
+    opening_char = text[json_start]
+    closing_char = '}' if opening_char == '{' else ']'
+    brace_count = 0
+    json_str = ""
+    started = False
+    for i in range(json_start, len(text)):
+        char = text[i]
+        if char == opening_char:
+            brace_count += 1
+            started = True
+        elif char == closing_char:
+            brace_count -= 1
+        json_str += char
+        if started and brace_count == 0:
+            break
+    try: return json.loads(json_str)
+    except: return None
+
+def legacy_var(text, var_name):
+    """Cópia da antiga regex não-gulosa dos managers (referência)."""
+    match = re.search(rf"{re.escape(var_name)}\s*=\s*({{.*?}});", text, re.DOTALL)
+    if not match: return None
+    try: return json.loads(match.group(1))
+    except: return None
+
+# (nome, função antiga, função nova, marcador, tela)
+CASES = [
+    ("scavenge: var village", legacy_extract, extract_json, "var village =", "place"),
+    ("scavenge: ScavengeScreen", legacy_extract, extract_json, "new ScavengeScreen(", "place"),
+    ("smith: BuildingSmith.techs", legacy_var, extract_json_var, "BuildingSmith.techs", "smith"),
+    ("main: BuildingMain.buildings", legacy_var, extract_json_var, "BuildingMain.buildings", "main"),
+]
+
+def stand_in_pages():
+    v = game.Village("bench", 1001)
+    return {"place": [game.render_scavenge(v)], "smith": [game.render_smith(v)], "main": [game.render_main(v)]}
+
+def load_dir(path):
+    pages = {"place": [], "smith": [], "main": []}
+    for screen in pages:
+        for file in sorted(glob.glob(os.path.join(path, f"{screen}*.html"))):
+            with open(file, encoding="utf-8", errors="replace") as f:
+                pages[screen].append(f.read())
+    return pages
+
+def main():
+    ap = argparse.ArgumentParser(description="Micro-benchmark do extrator de JSON embutido")
+    ap.add_argument("--dir", help="Pasta com páginas reais (place*.html, smith*.html, main*.html)")
+    ap.add_argument("--number", type=int, default=200, help="Repetições por medição")
+    args = ap.parse_args()
+
+    pages = load_dir(args.dir) if args.dir else stand_in_pages()
+
+    for name, old, new, marker, screen in CASES:
+        for html in pages.get(screen, []):
+            if old(html, marker) != new(html, marker):
+                print(f"⚠️ {name}: resultados diferentes entre antigo e novo")
+            t_old = timeit.timeit(lambda: old(html, marker), number=args.number) / args.number
+            t_new = timeit.timeit(lambda: new(html, marker), number=args.number) / args.number
+            print(f"{name:32} {len(html) // 1024:5d} KB   antigo {t_old * 1e6:9.1f} µs   "
+                  f"novo {t_new * 1e6:8.1f} µs   {t_old / t_new:6.1f}x")
+
+if __name__ == "__main__":
+    main()
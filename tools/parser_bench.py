@@ -0,0 +1,193 @@
+# ARQUIVO: tools/parser_bench.py
+"""
+Regressão do parser sobre o corpus (tools/parser_corpus/). Roda todos os
+métodos do GameParser e os extratores dos managers em cada página e mede
+tempo (melhor de N), pico de memória (tracemalloc) e hash do resultado:
+
+    python tools/parser_bench.py                 # compara com a baseline
+    python tools/parser_bench.py --update        # grava a baseline nova
+    python tools/parser_bench.py --no-time       # só hashes (outra máquina/CI)
+
+Sai com código 1 se algum resultado mudar ou ficar mais lento que a baseline
+(--tolerance vezes e pelo menos --min-us a mais). Antes de um release, rode
+na mesma máquina em que a baseline foi gravada.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import tracemalloc
+from dataclasses import is_dataclass, asdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.game_parser import GameParser
+from core.page_scan import scan_page
+from core.page_extract import SCREENS, extract_text
+from core import page_model
+from core.features.cluster.accepter import ClusterAccepter
+from tools.parser_corpus import CORPUS_DIR
+from tools.parser_parity import METHODS
+
+BASELINE_FILE = os.path.join(CORPUS_DIR, "baseline.json")
+
+# URL de cada captura (prefixo do arquivo -> tela), para os modelos tipados
+PAGE_URLS = {
+    "place_scavenge": "game.php?village=1001&screen=place&mode=scavenge",
+    "new_quests": "game.php?village=1001&screen=new_quests&ajax=quest_popup",
+}
+
+class CorpusResponse:
+    """Resposta mínima (url + text) para os extratores que recebem a resposta."""
+    def __init__(self, name, text):
+        prefix = name.rsplit(".", 1)[0]
+        screen = next((k for k in PAGE_URLS if prefix.startswith(k)), prefix.split("_")[0])
+        self.url = "https://br1.tribalwars.com.br/" + PAGE_URLS.get(screen, f"game.php?village=1001&screen={screen}")
+        self.text = text
+
+def scan_result(text):
+    scan = scan_page(text)
+    return {"csrf": scan.csrf, "game_data": scan.game_data,
+            "order_count": scan.order_count, "security": scan.security}
+
+def _parser_method(name, args):
+    return lambda page, text: getattr(GameParser(text), name)(*args)
+
+def _screen_fields(screen):
+    return lambda page, text: extract_text(text, screen)
+
+def _model(builder):
+    return lambda page, text: builder(CorpusResponse(page, text))
+
+# (nome, função(página, texto)): cada chamada monta objetos novos
+EXTRACTORS = [(f"GameParser.{name}{args if args else ''}", _parser_method(name, args)) for name, args in METHODS]
+EXTRACTORS += [
+    ("page_scan.scan_page", lambda page, text: scan_result(text)),
+    *[(f"page_extract.{screen}", _screen_fields(screen)) for screen in SCREENS],
+    ("page_model.village_state", _model(page_model.village_state)),
+    ("page_model.build_queue", _model(page_model.build_queue)),
+    ("page_model.unit_catalog", _model(page_model.unit_catalog)),
+    ("page_model.scavenge_state", _model(page_model.scavenge_state)),
+    ("ClusterAccepter._extract_pending_invites",
+     lambda page, text: ClusterAccepter(print)._extract_pending_invites(CorpusResponse(page, text))),
+]
+
+def load_corpus():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html")) + glob.glob(os.path.join(CORPUS_DIR, "*.json"))):
+        name = os.path.basename(path)
+        if name == os.path.basename(BASELINE_FILE): continue
+        with open(path, encoding="utf-8", newline="") as f:
+            pages[name] = f.read()
+    return pages
+
+def result_hash(value):
+    if is_dataclass(value):
+        # 'at' é o horário da leitura: muda a cada execução
+        value = {k: v for k, v in asdict(value).items() if k != "at"}
+    data = json.dumps(value, sort_keys=True, default=repr, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:12]
+
+def call(fn, page, text):
+    try:
+        return fn(page, text)
+    except Exception as e:
+        return f"EXCEPTION {type(e).__name__}: {e}"
+
+def measure(fn, page, text, repeat):
+    result = call(fn, page, text)
+
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        call(fn, page, text)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    call(fn, page, text)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return {"hash": result_hash(result), "us": round(best * 1e6, 1), "peak_kb": round(peak / 1024, 1)}
+
+def run(pages, repeat):
+    results = {}
+    for page, text in pages.items():
+        for name, fn in EXTRACTORS:
+            results[f"{page}::{name}"] = measure(fn, page, text, repeat)
+    return results
+
+def remeasure(key, pages, repeat):
+    """Mede de novo uma entrada suspeita (ruído de CPU/GC não reprova o release)."""
+    page, name = key.split("::", 1)
+    fn = dict(EXTRACTORS)[name]
+    return measure(fn, page, pages[page], repeat)
+
+def compare(results, baseline, tolerance, min_us, check_time, pages, repeat):
+    failures = 0
+    for key, base in baseline.items():
+        got = results.get(key)
+        if got is None:
+            failures += 1
+            print(f"❌ {key}: sumiu do corpus/extratores")
+            continue
+        if got["hash"] != base["hash"]:
+            failures += 1
+            print(f"❌ {key}: resultado mudou ({base['hash']} -> {got['hash']})")
+        elif check_time and is_slower(got, base, tolerance, min_us):
+            got = results[key] = remeasure(key, pages, repeat * 4)
+            if not is_slower(got, base, tolerance, min_us): continue
+            failures += 1
+            print(f"🐢 {key}: {base['us']:.0f} µs -> {got['us']:.0f} µs ({got['us'] / base['us']:.1f}x)")
+    for key in results.keys() - baseline.keys():
+        print(f"🆕 {key}: fora da baseline (rode com --update)")
+    return failures
+
+def is_slower(got, base, tolerance, min_us):
+    return got["us"] > base["us"] * tolerance and got["us"] - base["us"] > min_us
+
+def main():
+    ap = argparse.ArgumentParser(description="Regressão do parser sobre o corpus de páginas")
+    ap.add_argument("--update", action="store_true", help="Grava a baseline com os resultados atuais")
+    ap.add_argument("--repeat", type=int, default=5, help="Execuções por medição (vale a melhor)")
+    ap.add_argument("--tolerance", type=float, default=2.0, help="Quantas vezes mais lento reprova")
+    ap.add_argument("--min-us", type=float, default=250, help="Diferença mínima (µs) para reprovar por tempo")
+    ap.add_argument("--no-time", action="store_true", help="Compara só os hashes")
+    ap.add_argument("--top", type=int, default=10, help="Quantas medições mais lentas mostrar")
+    args = ap.parse_args()
+
+    pages = load_corpus()
+    if not pages:
+        print("Corpus vazio: rode 'python tools/parser_corpus.py build' antes.")
+        return 1
+
+    results = run(pages, args.repeat)
+
+    print(f"⏱️ {len(results)} medições ({len(pages)} páginas x {len(EXTRACTORS)} extratores). Mais lentas:")
+    for key, r in sorted(results.items(), key=lambda kv: -kv[1]["us"])[:args.top]:
+        print(f"   {r['us']:10.0f} µs {r['peak_kb']:9.0f} KB  {key}")
+
+    if args.update:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f"💾 Baseline gravada: {BASELINE_FILE}")
+        return 0
+
+    if not os.path.exists(BASELINE_FILE):
+        print("Sem baseline: rode com --update para gravar a primeira.")
+        return 1
+    with open(BASELINE_FILE, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    failures = compare(results, baseline, args.tolerance, args.min_us, not args.no_time, pages, args.repeat)
+    print(f"{len(baseline) - failures}/{len(baseline)} medições dentro da baseline")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
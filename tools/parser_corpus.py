@@ -0,0 +1,140 @@
+# ARQUIVO: tools/parser_corpus.py
+"""
+Corpus de páginas do parser (tools/parser_corpus/): uma captura por tela que o
+bot lê, usado por tools/parser_bench.py.
+
+    python tools/parser_corpus.py build                     # telas do servidor local
+    python tools/parser_corpus.py import gravacao.jsonl     # capturas reais (cassette)
+
+'build' gera as telas de forma determinística (mesmo conteúdo a cada execução).
+'import' lê uma cassette gravada (core/cassette.py), anonimiza nome/ID do
+jogador, tokens CSRF e hashes 'h=' e salva uma página por tela
+(<tela>_real.html / .json). Confira o arquivo antes de commitar.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.metrics import endpoint_key
+from tools import stand_in_server as game
+
+CORPUS_DIR = os.path.join(ROOT, "tools", "parser_corpus")
+
+# Instante fixo das telas geradas (filas e coletas com horário)
+FIXED_NOW = 1_700_000_000
+
+INVITES = ('<h3>Amigos</h3><table class="vis"><tr><th>Nome</th></tr></table>'
+           '<h3>Convites em aberto</h3><table class="vis"><tr><th>Nome</th><th>Ação</th></tr>'
+           '<tr><td><a href="/game.php?screen=info_player&amp;id=101">\n  Jogador &amp; Cia\n</a></td>'
+           '<td><a class="btn btn-confirm-yes" href="/game.php?screen=buddies&amp;action=approve_buddy&amp;buddy_id=7001&amp;h=0000">Aceitar</a> '
+           '<a class="btn" href="/game.php?screen=buddies&amp;action=reject_buddy&amp;buddy_id=7001&amp;h=0000">Recusar</a></td></tr>'
+           '<tr><td><a href="/game.php?screen=info_player&amp;id=102">Outro</a></td>'
+           '<td><a href="/game.php?screen=buddies&amp;action=approve_buddy&amp;buddy_id=7002&amp;h=0000">Aceitar</a></td></tr>'
+           '</table>')
+
+def stand_in_pages():
+    """Telas do servidor local, em estado vazio e ocupado."""
+    random.seed(0)
+    v = game.Village("jogador", 1001)
+    v.csrf = "0000abcd"
+    pages = {
+        "overview.html": game.render_overview(v),
+        "main.html": game.render_main(v),
+        "train.html": game.render_train(v),
+        "place_scavenge.html": game.render_scavenge(v),
+        "smith.html": game.render_smith(v),
+        "buddies.html": game.render_buddies(v),
+        "buddies_invites.html": game.page(v, "buddies", INVITES),
+        "daily_bonus.html": game.page(v, "daily_bonus",
+            '<script>DailyBonus.init({"chests":[{"day":1,"is_locked":false,"is_collected":true},'
+            '{"day":2,"is_locked":false,"is_collected":false}]});</script>', "buddies"),
+        "new_quests.json": game.js({
+            "response": {"dialog": f'<div class="quest-popup"><script>RewardSystem.setRewards({game.js(v.rewards)});</script></div>'},
+            "game_data": v.game_data("overview")}),
+        "captcha.html": game.page(v, "overview", '<div class="bot-protection-row">Proteção contra Bots</div>'),
+        "session_expired.html": ('<!DOCTYPE html><html><body><form id="login_form" action="/page/auth">'
+                                 '<a href="https://www.tribalwars.com.br/sso/login">Entrar</a></form></body></html>'),
+    }
+
+    # Mesmas telas com filas, tropas em treino, coletas em andamento e bônus coletado
+    v.train_queue["barracks"] = [{"amount": 20}, {"amount": 15}, {"amount": 5}]
+    v.train_queue["stable"] = [{"amount": 4}]
+    v.build_queue = [FIXED_NOW + 600, FIXED_NOW + 1200]
+    v.scavenge["1"]["scavenging_squad"] = {"unit_counts": {"spear": 100}, "return_time": FIXED_NOW + 1800}
+    v.quests["1020"]["finished"] = True
+    v.bonus_collected = True
+    pages["overview_busy.html"] = game.render_overview(v)
+    pages["main_queued.html"] = game.render_main(v)
+    pages["train_queued.html"] = game.render_train(v)
+    pages["place_scavenge_busy.html"] = game.render_scavenge(v)
+    return pages
+
+# --- ANONIMIZAÇÃO DAS CAPTURAS REAIS ---
+
+_CSRF = [
+    (re.compile(r'(name="csrf-token" content=")[a-f0-9]+'), r'\g<1>0000abcd'),
+    (re.compile(r'(csrf_token\s*=\s*[\'"])[a-f0-9]+'), r'\g<1>0000abcd'),
+    (re.compile(r'("csrf"\s*:\s*")[^"]*'), r'\g<1>0000abcd'),
+]
+_HASH = re.compile(r'((?:[?&]|&amp;)h=)[0-9a-f]+')
+
+def anonymize(text):
+    for pattern, repl in _CSRF:
+        text = pattern.sub(repl, text)
+    text = _HASH.sub(r'\g<1>0000', text)
+
+    # Nome e ID do jogador vêm do próprio game_data da página
+    m = re.search(r'"player"\s*:\s*\{"id"\s*:\s*"?(\d+)"?\s*,\s*"name"\s*:\s*"([^"]+)"', text)
+    if m:
+        player_id, name = m.groups()
+        text = text.replace(name, "jogador")
+        text = re.sub(rf'\b{player_id}\b', "900001", text)
+    return text
+
+def import_cassette(path):
+    """Uma página por tela da cassette (a última gravada), anonimizada."""
+    pages = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip(): continue
+            entry = json.loads(line)
+            if entry.get("status") != 200 or not entry.get("body"): continue
+            body = entry["body"]
+            ext = "json" if body.lstrip()[:1] in ("{", "[") else "html"
+            name = endpoint_key(entry["final_url"]).replace("/", "_")
+            pages[f"{name}_real.{ext}"] = anonymize(body)
+    return pages
+
+def save(pages):
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    for name, text in sorted(pages.items()):
+        with open(os.path.join(CORPUS_DIR, name), "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        print(f"💾 {name} ({len(text) // 1024} KB)")
+
+def main():
+    ap = argparse.ArgumentParser(description="Corpus de páginas do parser")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build", help="Gera as telas a partir do servidor local")
+    imp = sub.add_parser("import", help="Importa capturas reais de uma cassette (.jsonl)")
+    imp.add_argument("cassette")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        # As telas geradas não dependem do relógio
+        real_time = time.time
+        time.time = lambda: FIXED_NOW
+        try: save(stand_in_pages())
+        finally: time.time = real_time
+    else:
+        save(import_cassette(args.cassette))
+
+if __name__ == "__main__":
+    main()
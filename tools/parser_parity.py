@@ -0,0 +1,142 @@
+# ARQUIVO: tools/parser_parity.py
+"""
+Paridade dos backends de HTML do GameParser (core/game_parser.py).
+Roda todos os métodos públicos do parser em cada página do corpus com cada
+backend instalado (selectolax, lxml) e compara com o resultado do bs4:
+
+    python tools/parser_parity.py
+    python tools/parser_parity.py --dir paginas_salvas/   # + páginas reais (*.html)
+
+Sai com código 1 se algum backend divergir.
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.game_parser import GameParser, HTML_BACKENDS
+from tools import stand_in_server as game
+
+# Métodos públicos comparados (nome, argumentos)
+METHODS = [
+    ("check_security", ()),
+    ("check_daily_bonus", ()),
+    ("get_daily_bonus_day", ()),
+    ("get_game_data_from_json", ()),
+    ("get_village_data", ()),
+    ("get_points", ()),
+    ("get_incoming_attacks", ()),
+    ("get_quests", ()),
+    ("get_new_quest_rewards", ()),
+    ("get_troop_data", ()),
+    ("get_train_form_action", ()),
+    ("get_scavenge_data", ()),
+    ("get_building_queue_count", ("barracks",)),
+    ("get_building_queue_count", ("stable",)),
+    ("get_building_queue_count", ("garage",)),
+]
+
+def stand_in_pages():
+    """Telas do servidor local em estados variados (filas, tropas, bônus...)."""
+    v = game.Village("parity", 1001)
+    pages = {
+        "overview": game.render_overview(v),
+        "main": game.render_main(v),
+        "train": game.render_train(v),
+        "place_scavenge": game.render_scavenge(v),
+        "smith": game.render_smith(v),
+        "buddies": game.render_buddies(v),
+    }
+
+    v.train_queue["barracks"] = [{"amount": 20}, {"amount": 15}, {"amount": 5}]
+    v.train_queue["stable"] = [{"amount": 4}]
+    v.build_queue = [time.time() + 600, time.time() + 1200]
+    v.scavenge["1"]["scavenging_squad"] = {"unit_counts": {"spear": 100}, "return_time": int(time.time()) + 1800}
+    v.bonus_collected = True
+    pages["train_queued"] = game.render_train(v)
+    pages["main_queued"] = game.render_main(v)
+    pages["place_busy"] = game.render_scavenge(v)
+    pages["overview_no_bonus"] = game.render_overview(v)
+    return pages
+
+def edge_pages():
+    """Casos de borda: segurança, sessão, ataques, popups AJAX e HTML malformado."""
+    queue_row = ('<div class="trainqueue_wrap" id="trainqueue_wrap_barracks"><table>'
+                 '<tr class="lit"><td><div class="unit_sprite unit_sprite_smaller spear"></div>12 Lanceiros</td></tr>'
+                 '<tr class="sortable_row"><td><div class="unit_sprite unit_sprite_smaller axe"></div>7 Bárbaros</td></tr>'
+                 '</table></div>')
+    return {
+        "captcha_row": '<html><body><div class="bot-protection-row">x</div></body></html>',
+        "captcha_blur": '<html><body><div class="content bot-protection-blur"></div></body></html>',
+        "captcha_body": '<html><body data-bot-protect="forced"><p>ok</p></body></html>',
+        "captcha_bot_check": '<html><body><div id="bot_check"></div></body></html>',
+        "session_form": '<html><body><form id="login_form" action="/login"></form></body></html>',
+        "session_sso": '<html><body><a href="https://www.tribalwars.com.br/sso/login">Entrar</a></body></html>',
+        "incomings": ('<html><body><span id="incomings_amount"> 3 </span><span id="rank_points">1.234</span>'
+                      '<span id="wood">1.500</span><span id="stone">2.000</span><span id="iron">900</span>'
+                      '<span id="storage">24.000</span><span id="pop_current_label">120</span>'
+                      '<span id="pop_max_label">240</span></body></html>'),
+        "train_sprites": f'<html><body>{queue_row}<form id="train_form" action="/train?x=1&amp;y=2"></form></body></html>',
+        "malformed": ('<html><body><div id="wood">77<span id="stone">88</div><table><tr class="lit">'
+                      '<td>3 x<td>4<tr class="sortable_row"><td>9 y</table><p>sem fechar'),
+        "daily_bonus": ('<script>DailyBonus.init({"chests":[{"day":1,"is_locked":false,"is_collected":true},'
+                        '{"day":2,"is_locked":false,"is_collected":false}]});</script>'),
+        "quest_popup_json": ('{"response":{"dialog":"<div class=\\"reward-system\\">RewardSystem.claimReward(5001)</div>"},'
+                             '"game_data":{"village":{"id":1,"wood":10,"stone":20,"iron":30,"storage_max":100,'
+                             '"pop":5,"pop_max":50,"buildings":{"main":"3"}}}}'),
+        "empty": "",
+        "plain_text": "Erro interno",
+    }
+
+def load_dir(path):
+    pages = {}
+    for file in sorted(glob.glob(os.path.join(path, "*.html"))):
+        with open(file, encoding="utf-8", errors="replace") as f:
+            pages[os.path.basename(file)] = f.read()
+    return pages
+
+def run_methods(html, backend):
+    parser = GameParser(html, backend=backend)
+    results = {}
+    for name, args in METHODS:
+        label = f"{name}{args if args else ''}"
+        try:
+            results[label] = getattr(parser, name)(*args)
+        except Exception as e:
+            results[label] = f"EXCEPTION {type(e).__name__}: {e}"
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description="Paridade dos backends de HTML do GameParser")
+    ap.add_argument("--dir", help="Pasta com páginas reais salvas (*.html)")
+    args = ap.parse_args()
+
+    pages = stand_in_pages()
+    pages.update(edge_pages())
+    if args.dir: pages.update(load_dir(args.dir))
+
+    backends = [b for b in HTML_BACKENDS if b != "bs4"]
+    if not backends:
+        print("Nenhum backend em C instalado (selectolax/lxml): nada a comparar.")
+        return 0
+
+    failures = 0
+    for page_name, html in pages.items():
+        expected = run_methods(html, "bs4")
+        for backend in backends:
+            got = run_methods(html, backend)
+            for label, value in expected.items():
+                if got[label] != value:
+                    failures += 1
+                    print(f"❌ {page_name} [{backend}] {label}\n   bs4: {value!r}\n   {backend}: {got[label]!r}")
+
+    checks = len(pages) * len(backends) * len(METHODS)
+    print(f"{checks - failures}/{checks} verificações iguais ao bs4 ({len(pages)} páginas, backends: {', '.join(backends)})")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+# ARQUIVO: tools/stand_in_server.py
+"""
+Servidor local que imita os endpoints do Tribal Wars usados pelo bot.
+Serve para teste de carga da frota sem tocar no jogo real:
+
+    python tools/stand_in_server.py --port 8765
+    python tools/stand_in_server.py --captcha-on train   # captcha nas respostas da tela train
+    python tools/stand_in_server.py --latency 150       # 150 ms antes de cada resposta
+
+Contas apontadas para ele usam 'base_url' = http://localhost:8765/<mundo>
+e 'lobby_url' = http://localhost:8765/lobby (ver tools/fleet_bench.py).
+Cada conta (cookie 'sid') ganha uma aldeia simulada com recursos, fila de
+construção, tropas, coletas e pesquisas.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+BUILDINGS = ["main", "barracks", "stable", "garage", "smith", "place", "market",
+             "wood", "stone", "iron", "farm", "storage", "hide", "wall"]
+
+UNITS = {
+    "spear": {"wood": 50, "stone": 30, "iron": 10, "pop": 1},
+    "sword": {"wood": 30, "stone": 30, "iron": 70, "pop": 1},
+    "axe": {"wood": 60, "stone": 30, "iron": 40, "pop": 1},
+    "spy": {"wood": 50, "stone": 50, "iron": 20, "pop": 2},
+    "light": {"wood": 125, "stone": 100, "iron": 250, "pop": 4},
+    "heavy": {"wood": 200, "stone": 150, "iron": 600, "pop": 6},
+    "ram": {"wood": 300, "stone": 200, "iron": 200, "pop": 5},
+    "catapult": {"wood": 320, "stone": 400, "iron": 100, "pop": 8},
+}
+
+SCAVENGE_OPTIONS = {
+    "1": {"name": "Coletores Preguiçosos", "unlock_cost": {"wood": 25, "stone": 30, "iron": 25}},
+    "2": {"name": "Coletores Humildes", "unlock_cost": {"wood": 250, "stone": 300, "iron": 250}},
+    "3": {"name": "Coletores Espertos", "unlock_cost": {"wood": 1000, "stone": 1200, "iron": 1000}},
+    "4": {"name": "Grandes Coletores", "unlock_cost": {"wood": 10000, "stone": 12000, "iron": 10000}},
+}
+
+# Tamanho aproximado das páginas reais (bytes)
+PAGE_SIZES = {"overview": 190_000, "main": 160_000, "train": 130_000,
+              "place": 110_000, "smith": 95_000, "buddies": 70_000}
+
+FILLER_ROW = ('<tr class="row_a"><td class="lit-item"><a href="/game.php?screen=info_village&amp;id={i}">'
+              'Aldeia de exemplo {i} (500|500) K55</a></td><td class="lit-item">{i}</td>'
+              '<td class="lit-item"><span class="icon header wood"></span>1.234</td></tr>\n')
+
+def js(obj):
+    # O jogo serializa JSON compacto (sem espaços): "wood":1512
+    return json.dumps(obj, separators=(",", ":"))
+
+def filler(size):
+    rows, total, i = [], 0, 0
+    while total < size:
+        row = FILLER_ROW.format(i=i)
+        rows.append(row)
+        total += len(row)
+        i += 1
+    return '<table class="vis filler">' + "".join(rows) + "</table>"
+
+class Village:
+    """Estado simulado de uma conta/aldeia."""
+    def __init__(self, sid, village_id):
+        self.sid = sid
+        self.id = village_id
+        self.player_id = 900000 + village_id
+        self.csrf = "%08x" % random.getrandbits(32)
+        self.res = {"wood": 5000.0, "stone": 5000.0, "iron": 5000.0}
+        self.prod = 0.5 # por segundo, por recurso
+        self.storage = 20000
+        self.pop_max = 2400
+        self.buildings = {b: 1 for b in BUILDINGS}
+        self.buildings.update({"main": 10, "barracks": 5, "farm": 12, "storage": 12, "smith": 3, "place": 1})
+        self.build_queue = [] # finish timestamps
+        self.home = {"spear": 300, "sword": 100, "axe": 200, "spy": 10, "light": 50, "heavy": 0, "ram": 0, "catapult": 0}
+        self.train_queue = {"barracks": [], "stable": [], "garage": []}
+        self.scavenge = {k: {"is_locked": k != "1", "unlock_time": None, "scavenging_squad": None} for k in SCAVENGE_OPTIONS}
+        self.techs = {u: 1 if u in ("spear", "sword") else 0 for u in UNITS}
+        self.quests = {"1010": {"finished": True, "closed": False}, "1020": {"finished": False, "closed": False}}
+        self.rewards = [{"id": 5001, "status": "unlocked", "building": "main", "reward": {"wood": 100, "stone": 100, "iron": 100}}]
+        self.bonus_collected = False
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def tick(self):
+        now = time.time()
+        for r in self.res:
+            self.res[r] = min(self.storage, self.res[r] + self.prod * (now - self.updated))
+        self.updated = now
+        self.build_queue = [t for t in self.build_queue if t > now]
+        for opt in self.scavenge.values():
+            squad = opt["scavenging_squad"]
+            if squad and squad["return_time"] <= now:
+                for u, q in squad["unit_counts"].items():
+                    self.home[u] = self.home.get(u, 0) + q
+                opt["scavenging_squad"] = None
+            if opt["unlock_time"] and opt["unlock_time"] <= now:
+                opt["unlock_time"] = None
+                opt["is_locked"] = False
+
+    def pop(self):
+        return sum(self.home.values()) + 300
+
+    def can_pay(self, cost):
+        return all(self.res[r] >= cost.get(r, 0) for r in self.res)
+
+    def pay(self, cost):
+        for r in self.res:
+            self.res[r] -= cost.get(r, 0)
+
+    def game_data(self, screen):
+        return {
+            "player": {"id": self.player_id, "name": self.sid, "points": sum(self.buildings.values()) * 10,
+                       "rank": 1, "incomings": 0, "premium": False},
+            "village": {"id": self.id, "name": f"Aldeia {self.id}",
+                        "wood": round(self.res["wood"], 2), "stone": round(self.res["stone"], 2), "iron": round(self.res["iron"], 2),
+                        "wood_prod": self.prod, "stone_prod": self.prod, "iron_prod": self.prod,
+                        "storage_max": self.storage, "pop": self.pop(), "pop_max": self.pop_max,
+                        "buildings": {b: str(l) for b, l in self.buildings.items()}},
+            "csrf": self.csrf,
+            "screen": screen,
+            "features": {"Premium": {"possible": True, "active": False}}
+        }
+
+# --- RENDERIZAÇÃO ---
+
+def page(v, screen, body, size_key=None):
+    gd = js(v.game_data(screen))
+    header = (
+        '<!DOCTYPE html><html><head><title>Tribal Wars</title>'
+        f'<script>var csrf_token = \'{v.csrf}\';</script></head>'
+        f'<body id="ds_body" class="scrollableMenu">'
+        f'<span id="wood">{int(v.res["wood"])}</span><span id="stone">{int(v.res["stone"])}</span>'
+        f'<span id="iron">{int(v.res["iron"])}</span><span id="storage">{v.storage}</span>'
+        f'<span id="pop_current_label">{v.pop()}</span><span id="pop_max_label">{v.pop_max}</span>'
+        f'<span id="rank_points">{sum(v.buildings.values()) * 10}</span>'
+        '<span id="incomings_amount">0</span>'
+        f'<script>TribalWars.updateGameData({gd});</script>'
+    )
+    html = header + body
+    pad = PAGE_SIZES.get(size_key or screen, 0) - len(html)
+    if pad > 0:
+        html += filler(pad)
+    return html + "</body></html>"
+
+def render_overview(v):
+    quests = js(v.quests)
+    bonus = "" if v.bonus_collected else "<script>DailyBonus.init({});</script>"
+    return page(v, "overview", f'<script>Quests.setQuestData({quests});</script>{bonus}')
+
+def render_main(v):
+    buildings = {}
+    for b, lvl in v.buildings.items():
+        cost = {"wood": 100 * (lvl + 1), "stone": 90 * (lvl + 1), "iron": 80 * (lvl + 1)}
+        buildings[b] = dict(cost, id=b, level=str(lvl), error=None if v.can_pay(cost) else "Recursos insuficientes")
+    orders = "".join(f'<tr class="buildorder_{i}"><td><span data-endtime="{int(t)}"></span></td></tr>' for i, t in enumerate(v.build_queue))
+    body = (f'<table id="build_queue">{orders}</table>'
+            f'<script>BuildingMain.buildings = {js(buildings)};\n'
+            f'BuildingMain.order_count = {len(v.build_queue)};</script>')
+    return page(v, "main", body)
+
+def render_train(v):
+    units_js = ", ".join(
+        f'{u}: {{wood: {c["wood"]}, stone: {c["stone"]}, iron: {c["iron"]}, pop: {c["pop"]}, '
+        f'requirements_met: {"true" if v.techs.get(u) or u in ("spear",) else "false"}}}'
+        for u, c in UNITS.items())
+    rows = "".join(
+        f'<tr><td><input class="recruit_unit" name="{u}" /></td><td></td>'
+        f'<td>{q}/{q}</td><td><a id="{u}_0_a" href="#">({q})</a></td></tr>'
+        for u, q in v.home.items())
+    queues = ""
+    for building, orders in v.train_queue.items():
+        lines = "".join(
+            (f'<tr class="lit"><td>{o["amount"]} unidades</td></tr>' if i == 0 else
+             f'<tr class="sortable_row" id="trainorder_{i}"><td>{o["amount"]} unidades</td></tr>')
+            for i, o in enumerate(orders))
+        queues += f'<div class="trainqueue_wrap" id="trainqueue_wrap_{building}"><table>{lines}</table></div>'
+    body = (f'{queues}<form id="train_form" action="/game.php?village={v.id}&amp;screen=train&amp;action=train&amp;mode=train">'
+            f'<table>{rows}</table></form><script>unit_managers.units = {{{units_js}}};</script>')
+    return page(v, "train", body)
+
+def render_scavenge(v):
+    village = {"village_id": v.id, "has_rally_point": True,
+               "unit_counts_home": {u: q for u, q in v.home.items() if u not in ("ram", "catapult")},
+               "options": v.scavenge}
+    body = (f'<script>var village = {js(village)};\n'
+            f'var screen = new ScavengeScreen({js(SCAVENGE_OPTIONS)}, village);</script>')
+    return page(v, "place", body)
+
+def render_smith(v):
+    available = {}
+    for u, c in UNITS.items():
+        level = v.techs.get(u, 0)
+        available[u] = {"id": u, "name": u.capitalize(), "level": str(level),
+                        "can_research": level == 0 and v.can_pay(c),
+                        "wood": str(c["wood"] * 10), "stone": str(c["stone"] * 10), "iron": str(c["iron"] * 10)}
+    return page(v, "smith", f'<script>BuildingSmith.techs = {js({"available": available})};</script>')
+
+def render_buddies(v):
+    body = ('<h3>Amigos</h3><table class="vis"><tr><th>Nome</th></tr>'
+            '<tr><td><a href="/game.php?screen=info_player&amp;id=849038049">\n  Amigo\n</a></td></tr></table>'
+            '<h3>Convites em aberto</h3><table class="vis"><tr><th>Nome</th><th>Ação</th></tr></table>')
+    return page(v, "buddies", body)
+
+# --- SERVIDOR ---
+
+class StandInGame:
+    def __init__(self, captcha_on=(), latency=0.0):
+        self.villages = {}
+        self.latency = latency # Segundos antes de cada resposta (simula a rede até o jogo)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.captcha_on = set(captcha_on) # Telas que respondem com a proteção contra bots
+
+    def village(self, sid):
+        with self.lock:
+            v = self.villages.get(sid)
+            if not v:
+                v = self.villages[sid] = Village(sid, 1000 + len(self.villages))
+            return v
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    game = None
+
+    def log_message(self, *args):
+        pass
+
+    def _sid(self):
+        for part in self.headers.get("Cookie", "").split(";"):
+            if "=" in part:
+                k, val = part.strip().split("=", 1)
+                if k == "sid": return val
+        return "anon"
+
+    def _send(self, status, body, ctype="text/html; charset=UTF-8", location=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        if location: self.send_header("Location", location)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, obj):
+        self._send(200, js(obj), "application/json")
+
+    def do_GET(self):
+        self._dispatch("GET", {})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length).decode("utf-8") if length else ""
+        form = {k: vals[0] for k, vals in parse_qs(raw).items()}
+        self._dispatch("POST", form)
+
+    def _dispatch(self, method, form):
+        self.game.requests += 1
+        if self.game.latency: time.sleep(self.game.latency)
+        parts = urlsplit(self.path)
+        query = {k: vals[0] for k, vals in parse_qs(parts.query).items()}
+        segments = [s for s in parts.path.split("/") if s]
+
+        # Lobby e reentrada
+        if segments[:1] == ["lobby"]:
+            if len(segments) >= 4 and segments[1:3] == ["page", "play"]:
+                return self._send(302, "", location=f"/{segments[3]}/game.php?screen=overview")
+            return self._send(200, '<html><head><meta name="csrf-token" content="0a0b0c0d"></head><body>'
+                                   '<a href="/page/play/br1">Mundo 1</a><a href="/page/play/pt1">Mundo 1</a></body></html>')
+
+        if not segments or segments[-1] != "game.php":
+            return self._send(404, "not found")
+
+        v = self.game.village(self._sid())
+        with v.lock:
+            v.tick()
+            if method == "POST" and form.get("h", query.get("h")) != v.csrf:
+                return self._json({"error": "Token inválido"})
+            return self._screen(v, method, query, form, "/".join(segments[:-1]))
+
+    def _screen(self, v, method, q, form, world):
+        screen = q.get("screen", "overview")
+        action = q.get("ajaxaction") or q.get("ajax") or q.get("action")
+
+        if screen in self.game.captcha_on:
+            return self._send(200, page(v, screen, '<div class="bot-protection-row">Proteção contra Bots</div>'))
+
+        if screen == "main" and action == "upgrade_building":
+            cost = {"wood": 100 * (v.buildings[form["id"]] + 1), "stone": 90 * (v.buildings[form["id"]] + 1), "iron": 80 * (v.buildings[form["id"]] + 1)}
+            if len(v.build_queue) >= 2 or not v.can_pay(cost):
+                return self._json({"error": ["Não é possível construir agora."]})
+            v.pay(cost)
+            start = max([time.time()] + v.build_queue)
+            v.build_queue.append(start + 600)
+            v.buildings[form["id"]] += 1
+            return self._json({"response": {"success": "Construção adicionada"}, "game_data": v.game_data("main")})
+
+        if screen == "scavenge_api" and action == "send_squads":
+            responses, idx = [], 0
+            while f"squad_requests[{idx}][option_id]" in form:
+                prefix = f"squad_requests[{idx}]"
+                opt = v.scavenge.get(form[f"{prefix}[option_id]"])
+                counts = {u: int(form.get(f"{prefix}[candidate_squad][unit_counts][{u}]", 0)) for u in v.home}
+                ok = opt and not opt["is_locked"] and not opt["scavenging_squad"] and all(v.home[u] >= c for u, c in counts.items())
+                if ok:
+                    for u, c in counts.items(): v.home[u] -= c
+                    opt["scavenging_squad"] = {"unit_counts": counts, "return_time": int(time.time()) + 1800}
+                responses.append({"village_id": v.id, "success": bool(ok), "error": None if ok else "Opção indisponível"})
+                idx += 1
+            return self._json({"squad_responses": responses, "game_data": v.game_data("place")})
+
+        if screen == "scavenge_api" and action == "start_unlock":
+            opt_id = str(form.get("option_id"))
+            cost = SCAVENGE_OPTIONS[opt_id]["unlock_cost"]
+            if not v.can_pay(cost): return self._json({"error": ["Recursos insuficientes"]})
+            v.pay(cost)
+            v.scavenge[opt_id]["unlock_time"] = int(time.time()) + 900
+            return self._json({"response": {"success": True}, "game_data": v.game_data("place")})
+
+        if screen == "train" and action == "train" and method == "POST":
+            for u, c in UNITS.items():
+                amount = int(form.get(u, 0) or 0)
+                if amount > 0:
+                    building = "stable" if u in ("spy", "light", "heavy") else "garage" if u in ("ram", "catapult") else "barracks"
+                    v.pay({r: c[r] * amount for r in ("wood", "stone", "iron")})
+                    v.train_queue[building].append({"unit": u, "amount": amount})
+            return self._send(302, "", location=f"/{world}/game.php?village={v.id}&screen=train")
+
+        if screen == "smith" and action == "research":
+            tech = form.get("tech_id")
+            if v.techs.get(tech): return self._json({"error": "Já pesquisado"})
+            v.techs[tech] = 1
+            return self._json({"response": {"tech_list": list(v.techs)}, "game_data": v.game_data("smith")})
+
+        if screen == "api" and action == "quest_complete":
+            quest = v.quests.get(q.get("quest"))
+            if quest: quest["closed"] = True
+            return self._json({"response": {"success": True}, "game_data": v.game_data("overview")})
+
+        if screen == "new_quests":
+            if action == "claim_reward":
+                v.rewards = [r for r in v.rewards if str(r["id"]) != str(form.get("reward_id"))]
+                return self._json({"response": {"success": True}, "game_data": v.game_data("overview")})
+            dialog = f'<div class="quest-popup"><script>RewardSystem.setRewards({js(v.rewards)});</script></div>'
+            return self._json({"response": {"dialog": dialog}, "game_data": v.game_data("overview")})
+
+        if screen == "daily_bonus":
+            if method == "POST":
+                v.bonus_collected = True
+                return self._json({"response": {"success": True}})
+            return self._send(200, page(v, "daily_bonus",
+                '<script>DailyBonus.init({"chests":[{"day":1,"is_locked":false,"is_collected":false}]});</script>', "buddies"))
+
+        if screen == "buddies":
+            return self._send(200, render_buddies(v))
+
+        renderers = {"overview": render_overview, "main": render_main, "train": render_train, "smith": render_smith}
+        if screen == "place" and q.get("mode") == "scavenge":
+            return self._send(200, render_scavenge(v))
+        return self._send(200, renderers.get(screen, render_overview)(v))
+
+def serve(port, host="127.0.0.1", captcha_on=(), latency=0.0):
+    """Sobe o servidor em uma thread e devolve (server, game)."""
+    game = StandInGame(captcha_on, latency)
+    handler = type("BoundHandler", (Handler,), {"game": game})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, game
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Servidor local que imita o Tribal Wars")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--captcha-on", nargs="*", default=[], help="Telas que respondem com captcha (ex: train scavenge_api)")
+    ap.add_argument("--latency", type=float, default=0, help="Milissegundos antes de cada resposta")
+    args = ap.parse_args()
+    server, game = serve(args.port, captcha_on=args.captcha_on, latency=args.latency / 1000)
+    print(f"[STAND-IN] Servindo em http://localhost:{args.port} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"[STAND-IN] {len(game.villages)} aldeias | {game.requests} requisições")
+    except KeyboardInterrupt:
+        server.shutdown()
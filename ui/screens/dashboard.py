@@ -9,6 +9,7 @@ from ui.views.recruitment_view import RecruitmentView
 from ui.views.groups.view import GroupsView
 from ui.views.settings_view import SettingsView
 from ui.views.research_tab import ResearchTab
+from ui.views.telemetry_view import TelemetryView
 
 import ui.styles as st
 from ui.views.cluster_view import ClusterView
@@ -52,6 +53,7 @@ def DashboardScreen(page: ft.Page, user_data=None):
     btn_research = ft.TextButton("Pesquisa", icon=ft.Icons.SCIENCE_ROUNDED, data="research", style=style_inactive)
     btn_groups = ft.TextButton("Grupos", icon=ft.Icons.FOLDER_OPEN_ROUNDED, data="groups", style=style_inactive)
     btn_cluster = ft.TextButton("Cluster", icon=ft.Icons.HUB_ROUNDED, data="cluster", style=style_inactive)
+    btn_telemetry = ft.TextButton("Telemetria", icon=ft.Icons.INSIGHTS_ROUNDED, data="telemetry", style=style_inactive)
 
     btn_settings = ft.IconButton(
         icon=ft.Icons.TUNE_ROUNDED, 
@@ -65,7 +67,7 @@ def DashboardScreen(page: ft.Page, user_data=None):
         aba = e.control.data
         
         # Reset visual dos botões
-        for btn in [btn_home, btn_proxies, btn_build, btn_recruit, btn_groups, btn_cluster, btn_research]:
+        for btn in [btn_home, btn_proxies, btn_build, btn_recruit, btn_groups, btn_cluster, btn_research, btn_telemetry]:
             btn.style = style_inactive
             if btn.data == aba: 
                 btn.style = style_active
@@ -80,6 +82,8 @@ def DashboardScreen(page: ft.Page, user_data=None):
             views_cache[aba] = ProxiesView(page)
         elif aba == "groups":
             views_cache[aba] = GroupsView(page)
+        elif aba == "telemetry":
+            views_cache[aba] = TelemetryView(page)
 
         # 2. USAR CACHE para o resto
         if aba not in views_cache:
@@ -114,6 +118,7 @@ def DashboardScreen(page: ft.Page, user_data=None):
     btn_research.on_click = mudar_aba
     btn_groups.on_click = mudar_aba
     btn_cluster.on_click = mudar_aba
+    btn_telemetry.on_click = mudar_aba
     
     # --- LOGOUT CORRIGIDO ---
     def logout(e):
@@ -149,7 +154,7 @@ def DashboardScreen(page: ft.Page, user_data=None):
             
             # 2. MENU CENTRAL
             ft.Row(
-                [btn_home, btn_proxies, btn_build, btn_recruit, btn_research, btn_groups, btn_cluster], 
+                [btn_home, btn_proxies, btn_build, btn_recruit, btn_research, btn_groups, btn_cluster, btn_telemetry], 
                 spacing=5
             ),
             
@@ -0,0 +1,98 @@
+import flet as ft
+from core.metrics import metrics
+import ui.styles as st
+
+def TelemetryView(page: ft.Page):
+
+    def header(text):
+        return ft.DataColumn(ft.Text(text, weight="bold", size=11, color=st.COLOR_TEXT_DIM))
+
+    def fmt_s(value):
+        return f"{value:.2f}s" if value is not None else "-"
+
+    def make_table(first_col):
+        return ft.DataTable(
+            width=float("inf"),
+            heading_row_color=st.COLOR_SURFACE,
+            heading_row_height=40,
+            data_row_min_height=36,
+            data_row_max_height=36,
+            divider_thickness=0,
+            column_spacing=20,
+            columns=[
+                header(first_col), header("REQ"), header("P50"), header("P90"), header("P99"),
+                header("KB MÉDIO"), header("ERROS"), header("REDIR"), header("REENTRADAS"), header("CSRF"), header("CACHE")
+            ],
+            rows=[]
+        )
+
+    table_screens = make_table("TELA / AÇÃO")
+    table_proxies = make_table("PROXY")
+
+    def fill(table, data):
+        table.rows.clear()
+        for key, s in sorted(data.items(), key=lambda kv: -kv[1]['count']):
+            color = st.COLOR_ERROR if s['errors'] else "white"
+            table.rows.append(ft.DataRow(cells=[
+                ft.DataCell(ft.Text(key, size=12, color=color, weight="bold")),
+                ft.DataCell(ft.Text(str(s['count']), size=12)),
+                ft.DataCell(ft.Text(fmt_s(s['p50']), size=12)),
+                ft.DataCell(ft.Text(fmt_s(s['p90']), size=12)),
+                ft.DataCell(ft.Text(fmt_s(s['p99']), size=12)),
+                ft.DataCell(ft.Text(f"{s['bytes_avg'] / 1024:.1f}", size=12)),
+                ft.DataCell(ft.Text(str(s['errors']), size=12, color=color)),
+                ft.DataCell(ft.Text(str(s['redirects']), size=12)),
+                ft.DataCell(ft.Text(str(s['reentries']), size=12)),
+                ft.DataCell(ft.Text(str(s['csrf_refreshes']), size=12)),
+                ft.DataCell(ft.Text(f"{s['cache_hits']}/{s['cache_hits'] + s['cache_misses']}", size=12)),
+            ]))
+
+    def refresh(e=None):
+        snap = metrics.snapshot()
+        fill(table_screens, snap['screens'])
+        fill(table_proxies, snap['proxies'])
+        page.update()
+
+    def export(e):
+        try:
+            path = metrics.dump_json()
+            page.snack_bar = ft.SnackBar(ft.Text(f"Telemetria salva em {path}"), bgcolor=st.COLOR_SUCCESS)
+        except Exception as ex:
+            page.snack_bar = ft.SnackBar(ft.Text(f"Erro ao exportar: {ex}"), bgcolor=st.COLOR_ERROR)
+        page.snack_bar.open = True
+        page.update()
+
+    def reset(e):
+        metrics.reset()
+        refresh()
+
+    def card(title, table):
+        return ft.Container(
+            bgcolor=st.COLOR_SURFACE, padding=20, border_radius=10, border=ft.border.all(1, st.COLOR_BORDER),
+            content=ft.Column([
+                ft.Text(title, weight="bold", size=16, color=st.COLOR_ACCENT),
+                ft.Row([table], scroll="auto")
+            ])
+        )
+
+    snap = metrics.snapshot()
+    fill(table_screens, snap['screens'])
+    fill(table_proxies, snap['proxies'])
+
+    return ft.Container(
+        padding=30,
+        content=ft.Column([
+            ft.Row([
+                ft.Row([ft.Icon(ft.Icons.INSIGHTS_ROUNDED, size=28, color=st.COLOR_ACCENT), ft.Text("Telemetria de Requisições", size=22, weight="bold", color="white")], spacing=10),
+                ft.Row([
+                    st.get_button_style("Atualizar", refresh, icon=ft.Icons.REFRESH),
+                    st.get_button_style("Exportar JSON", export, icon=ft.Icons.DOWNLOAD, is_primary=False),
+                    st.get_button_style("Zerar", reset, icon=ft.Icons.DELETE_OUTLINE, is_primary=False),
+                ], spacing=10)
+            ], alignment="spaceBetween"),
+            ft.Divider(color="transparent", height=20),
+            card("Por Tela / Ação", table_screens),
+            ft.Divider(color="transparent", height=10),
+            card("Por Proxy", table_proxies),
+        ], expand=True, scroll="auto")
+    )